@@ -7,7 +7,7 @@ import {
 import { getAuthHeaders } from '@/api/auth/auth';
 import { BASE_API_URL } from '@/config';
 
-export async function getChats(params?: { limit?: number; offset?: number }) {
+export async function getChats(params?: { limit?: number; cursor?: string }) {
 	const { data } = await listChats({
 		query: params,
 		headers: getAuthHeaders(),
@@ -49,34 +49,132 @@ export async function deleteChatById(chatId: string) {
 }
 
 
+export interface StreamSource {
+    title: string;
+    url: string;
+    score: number;
+}
+
+export interface StreamUsage {
+    promptTokens?: number | null;
+    completionTokens?: number | null;
+    latencyMs?: number | null;
+    ttftMs?: number | null;
+    cached: boolean;
+}
+
+export interface StreamDone {
+    messageId: string;
+    truncated: boolean;
+}
+
 export interface StreamReplyOptions {
     chatId: string;
     content: string;
     onChunk: (chunk: string) => void;
+    onSources?: (sources: StreamSource[]) => void;
+    onUsage?: (usage: StreamUsage) => void;
+    onDone?: (done: StreamDone) => void;
     signal?: AbortSignal;
     retry?: boolean;
 }
 
+interface ServerSentEvent {
+    id?: string;
+    event: string;
+    data: string;
+}
+
+function parseEvent(block: string): ServerSentEvent | null {
+	const event: ServerSentEvent = { event: 'message', data: '' };
+	const data: string[] = [];
+	for (const line of block.split('\n')) {
+		if (!line || line.startsWith(':')) continue;
+		const sep = line.indexOf(':');
+		const field = sep === -1 ? line : line.slice(0, sep);
+		const value = sep === -1 ? '' : line.slice(sep + 1).replace(/^ /, '');
+		if (field === 'event') event.event = value;
+		else if (field === 'data') data.push(value);
+		else if (field === 'id') event.id = value;
+	}
+	if (!data.length) return null;
+	event.data = data.join('\n');
+	return event;
+}
+
+const RESUME_ATTEMPTS = 3;
+const RESUME_DELAY_MS = 1000;
+
+function streamHeaders(extra: Record<string, string> = {}): Record<string, string> {
+	return {
+		'Accept': 'text/event-stream',
+		'Authorization': getAuthHeaders().Authorization || '',
+		...extra,
+	};
+}
+
+/**
+ * Read SSE events from a response until the body ends.
+ * Returns the id of the last event seen.
+ */
+async function readEvents(
+	response: Response,
+	onEvent: (event: ServerSentEvent) => void,
+	lastEventId: number,
+): Promise<number> {
+	const reader = response.body?.getReader();
+	if (!reader) {
+		throw new Error('No response body');
+	}
+
+	const decoder = new TextDecoder();
+	let buffer = '';
+
+	try {
+		while (true) {
+			const { done, value } = await reader.read();
+			if (done) break;
+
+			buffer += decoder.decode(value, { stream: true });
+			const blocks = buffer.split('\n\n');
+			buffer = blocks.pop() || '';
+
+			for (const block of blocks) {
+				const event = parseEvent(block);
+				if (!event) continue;
+				if (event.id) lastEventId = Number(event.id);
+				onEvent(event);
+			}
+		}
+	} finally {
+		reader.releaseLock();
+	}
+	return lastEventId;
+}
+
 /**
- * Consume stream from /chat/{chat_id}/stream.
+ * Consume the SSE stream from /chat/{chat_id}/stream.
  * Bypasses HeyAPI wrapper to access raw ReadableStream.
+ *
+ * If the connection drops before `done`, the reply is resumed from
+ * /chat/{chat_id}/stream/{message_id} with `Last-Event-ID`: the server
+ * replays the missed events, no second answer is generated.
  */
 export async function streamReply({
 	chatId,
 	content,
 	onChunk,
+	onSources,
+	onUsage,
+	onDone,
 	signal,
 	retry = false,
 }: StreamReplyOptions): Promise<void> {
-	const authHeaders = getAuthHeaders();
 	const url = `${BASE_API_URL}/chat/${chatId}/stream${retry ? '?retry=true' : ''}`;
 
 	const response = await fetch(url, {
 		method: 'POST',
-		headers: {
-			'Content-Type': 'application/json',
-			'Authorization': authHeaders.Authorization || '',
-		},
+		headers: streamHeaders({ 'Content-Type': 'application/json' }),
 		body: JSON.stringify({ content }),
 		signal,
 	});
@@ -85,30 +183,55 @@ export async function streamReply({
 		throw new Error(`Stream failed: ${response.status}`);
 	}
 
-	const reader = response.body?.getReader();
-	if (!reader) {
-		throw new Error('No response body');
-	}
-
-	const decoder = new TextDecoder();
-	let buffer = '';
+	let finished = false;
+	const dispatch = (event: ServerSentEvent) => {
+		const payload = JSON.parse(event.data);
+		switch (event.event) {
+			case 'token':
+				onChunk(payload.text);
+				break;
+			case 'sources':
+				onSources?.(payload.sources);
+				break;
+			case 'usage':
+				onUsage?.(payload);
+				break;
+			case 'done':
+				finished = true;
+				onDone?.(payload);
+				break;
+			case 'error':
+				finished = true;
+				throw new Error(payload.detail || 'Stream failed');
+		}
+	};
 
+	const messageId = response.headers.get('X-Message-Id');
+	let lastEventId = 0;
 	try {
-		while (true) {
-			const { done, value } = await reader.read();
-			if (done) break;
-
-			buffer += decoder.decode(value, { stream: true });
-			const lines = buffer.split('\n');
-			buffer = lines.pop() || '';
+		lastEventId = await readEvents(response, dispatch, lastEventId);
+	} catch (error) {
+		if (finished || signal?.aborted || !messageId) throw error;
+	}
 
-			for (const line of lines) {
-				if (line.trim()) {
-					onChunk(line);
-				}
-			}
+	for (let attempt = 1; !finished && messageId && attempt <= RESUME_ATTEMPTS; attempt++) {
+		if (signal?.aborted) return;
+		await new Promise((resolve) => setTimeout(resolve, RESUME_DELAY_MS));
+		try {
+			const resumed = await fetch(`${BASE_API_URL}/chat/${chatId}/stream/${messageId}`, {
+				headers: streamHeaders({ 'Last-Event-ID': String(lastEventId) }),
+				signal,
+			});
+			// The reply is gone from the server buffer: reload the chat instead
+			if (resumed.status === 404) break;
+			if (!resumed.ok) continue;
+			lastEventId = await readEvents(resumed, dispatch, lastEventId);
+		} catch (error) {
+			if (finished || signal?.aborted || attempt === RESUME_ATTEMPTS) throw error;
 		}
-	} finally {
-		reader.releaseLock();
 	}
-}
\ No newline at end of file
+
+	if (!finished && !signal?.aborted) {
+		throw new Error('Stream interrupted');
+	}
+}
@@ -4,7 +4,7 @@ import { deleteChatById, getChats, streamReply, updateChatTitle } from '@/api/ch
 import { type ChatDetail, type MessageOut } from '@/api/client';
 
 
-export function useChats(params?: { limit?: number; offset?: number }) {
+export function useChats(params?: { limit?: number; cursor?: string }) {
 	return useQuery({
 		queryKey: ['chats', params ?? {}],
 		queryFn: () => getChats(params),
@@ -34,6 +34,14 @@ export type ChatDetail = {
      * Createdat
      */
     createdAt: string;
+    /**
+     * Messagecount
+     */
+    messageCount?: number;
+    /**
+     * Lastmessageat
+     */
+    lastMessageAt?: string | null;
     /**
      * Messages
      */
@@ -60,6 +68,14 @@ export type ChatOut = {
      * Createdat
      */
     createdAt: string;
+    /**
+     * Messagecount
+     */
+    messageCount?: number;
+    /**
+     * Lastmessageat
+     */
+    lastMessageAt?: string | null;
 };
 
 /**
@@ -135,6 +151,10 @@ export type MessageOut = {
      * Completiontokens
      */
     completionTokens?: number | null;
+    /**
+     * Truncated
+     */
+    truncated?: boolean;
 };
 
 /**
@@ -203,9 +223,11 @@ export type ListChatsData = {
          */
         limit?: number;
         /**
-         * Offset
+         * Cursor
+         *
+         * X-Next-Cursor of the previous page
          */
-        offset?: number;
+        cursor?: string | null;
     };
     url: '/chats';
 };
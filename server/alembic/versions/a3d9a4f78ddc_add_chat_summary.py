@@ -0,0 +1,34 @@
+"""Add chat summary
+
+Revision ID: a3d9a4f78ddc
+Revises: 4d2669e90489
+Create Date: 2026-10-19 12:45:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a3d9a4f78ddc"
+down_revision: Union[str, Sequence[str], None] = "4d2669e90489"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("chats", sa.Column("summary", sa.Text(), nullable=True))
+    op.add_column(
+        "chats",
+        sa.Column("summary_until", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("chats", "summary_until")
+    op.drop_column("chats", "summary")
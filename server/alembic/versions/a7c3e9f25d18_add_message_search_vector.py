@@ -0,0 +1,48 @@
+"""Add full-text search vector on messages
+
+Revision ID: a7c3e9f25d18
+Revises: f2c8d6a41e90
+Create Date: 2026-10-19 19:30:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a7c3e9f25d18"
+down_revision: Union[str, Sequence[str], None] = "f2c8d6a41e90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Stored generated column: filled for existing rows by the table rewrite
+    op.add_column(
+        "messages",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('english', content)", persisted=True),
+        ),
+    )
+    op.create_index(
+        "ix_messages_search_vector",
+        "messages",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_messages_search_vector", table_name="messages", postgresql_using="gin"
+    )
+    op.drop_column("messages", "search_vector")
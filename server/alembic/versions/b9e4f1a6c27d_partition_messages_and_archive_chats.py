@@ -0,0 +1,183 @@
+"""Partition messages by month and add chat archives
+
+Revision ID: b9e4f1a6c27d
+Revises: a7c3e9f25d18
+Create Date: 2026-10-19 20:45:00.000000+00:00
+
+Rebuilds `messages` as a table range-partitioned on created_at, with one
+partition per month from the oldest message to three months ahead plus a
+default partition, and copies the rows over. The copy runs inside the
+migration transaction: plan a maintenance window on large databases.
+Later partitions are created by `python -m maintenance partitions`.
+"""
+
+import uuid
+import zlib
+from datetime import date, datetime, UTC
+from typing import Sequence, Union
+
+import orjson
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b9e4f1a6c27d"
+down_revision: Union[str, Sequence[str], None] = "a7c3e9f25d18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+_ROLE = postgresql.ENUM(
+    "USER", "ASSISTANT", "SYSTEM", name="messagerole", create_type=False
+)
+COLUMNS = (
+    "id, chat_id, role, content, created_at, latency_ms, prompt_tokens, "
+    "completion_tokens, truncated"
+)
+
+
+def _month_start(day: date, offset: int = 0) -> date:
+    index = day.year * 12 + day.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_messages_table(*constraints, **kwargs) -> None:
+    op.create_table(
+        "messages",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("chat_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "role",
+            _ROLE,
+            nullable=False,
+        ),
+        sa.Column("content", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("latency_ms", sa.Integer(), nullable=True),
+        sa.Column("prompt_tokens", sa.Integer(), nullable=True),
+        sa.Column("completion_tokens", sa.Integer(), nullable=True),
+        sa.Column("truncated", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('english', content)", persisted=True),
+        ),
+        sa.ForeignKeyConstraint(["chat_id"], ["chats.id"]),
+        *constraints,
+        **kwargs,
+    )
+    op.create_index(
+        "ix_messages_chat_id_created_at",
+        "messages",
+        ["chat_id", "created_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_messages_search_vector",
+        "messages",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def _set_aside_messages_table() -> None:
+    """Rename the current table and free the names of its indexes."""
+    op.drop_index("ix_messages_search_vector", table_name="messages")
+    op.drop_index("ix_messages_chat_id_created_at", table_name="messages")
+    op.rename_table("messages", "messages_old")
+    op.execute(
+        "ALTER TABLE messages_old RENAME CONSTRAINT messages_pkey TO messages_old_pkey"
+    )
+
+
+def _copy_and_drop_old_messages() -> None:
+    op.execute(f"INSERT INTO messages ({COLUMNS}) SELECT {COLUMNS} FROM messages_old")
+    op.drop_table("messages_old")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _set_aside_messages_table()
+    _create_messages_table(
+        # The partition key must be part of the primary key
+        sa.PrimaryKeyConstraint("id", "created_at", name="messages_pkey"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+
+    oldest = (
+        op.get_bind()
+        .execute(sa.text("SELECT min(created_at) FROM messages_old"))
+        .scalar()
+    )
+    today = datetime.now(UTC).date()
+    month = _month_start(oldest.astimezone(UTC).date() if oldest else today)
+    last = _month_start(today, MONTHS_AHEAD)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE messages_p{month:%Y%m} PARTITION OF messages FOR VALUES "
+            f"FROM ('{month} 00:00:00+00') TO ('{_month_start(month, 1)} 00:00:00+00')"
+        )
+        month = _month_start(month, 1)
+    # Safety net for rows outside the created months (kept empty by maintenance)
+    op.execute("CREATE TABLE messages_default PARTITION OF messages DEFAULT")
+
+    _copy_and_drop_old_messages()
+
+    op.add_column(
+        "chats", sa.Column("archived_at", sa.DateTime(timezone=True), nullable=True)
+    )
+    op.create_table(
+        "chat_archives",
+        sa.Column("chat_id", sa.Uuid(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("message_count", sa.Integer(), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(["chat_id"], ["chats.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("chat_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Archived messages are restored into the plain table
+    archives = (
+        op.get_bind()
+        .execute(sa.text("SELECT chat_id, payload FROM chat_archives"))
+        .all()
+    )
+    op.drop_table("chat_archives")
+    op.drop_column("chats", "archived_at")
+
+    _set_aside_messages_table()
+    _create_messages_table(sa.PrimaryKeyConstraint("id", name="messages_pkey"))
+    _copy_and_drop_old_messages()
+    if archives:
+        rows = [
+            {
+                **message,
+                "id": uuid.UUID(message["id"]),
+                "chat_id": uuid.UUID(message["chat_id"]),
+                # Archives hold enum values, the column stores enum names
+                "role": message["role"].upper(),
+                "created_at": datetime.fromisoformat(message["created_at"]),
+            }
+            for _, payload in archives
+            for message in orjson.loads(zlib.decompress(payload))
+        ]
+        messages = sa.table(
+            "messages",
+            sa.column("id", sa.Uuid()),
+            sa.column("chat_id", sa.Uuid()),
+            sa.column("role", _ROLE),
+            sa.column("content", sa.String()),
+            sa.column("created_at", sa.DateTime(timezone=True)),
+            sa.column("latency_ms", sa.Integer()),
+            sa.column("prompt_tokens", sa.Integer()),
+            sa.column("completion_tokens", sa.Integer()),
+            sa.column("truncated", sa.Boolean()),
+        )
+        op.bulk_insert(messages, rows)
@@ -0,0 +1,32 @@
+"""Add message truncated flag
+
+Revision ID: c81f0b2d6e47
+Revises: a3d9a4f78ddc
+Create Date: 2026-10-19 14:10:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c81f0b2d6e47"
+down_revision: Union[str, Sequence[str], None] = "a3d9a4f78ddc"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "messages",
+        sa.Column("truncated", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("messages", "truncated")
@@ -0,0 +1,36 @@
+"""Add (chat_id, created_at, id) index on messages
+
+Revision ID: d5a7e3c19b42
+Revises: c81f0b2d6e47
+Create Date: 2026-10-19 16:20:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d5a7e3c19b42"
+down_revision: Union[str, Sequence[str], None] = "c81f0b2d6e47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_messages_chat_id_created_at",
+        "messages",
+        ["chat_id", "created_at", "id"],
+        unique=False,
+    )
+    # Covered by the leading column of the composite index
+    op.drop_index(op.f("ix_messages_chat_id"), table_name="messages")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f("ix_messages_chat_id"), "messages", ["chat_id"], unique=False)
+    op.drop_index("ix_messages_chat_id_created_at", table_name="messages")
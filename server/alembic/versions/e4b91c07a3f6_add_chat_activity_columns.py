@@ -0,0 +1,75 @@
+"""Add denormalized chat activity columns
+
+Revision ID: e4b91c07a3f6
+Revises: d5a7e3c19b42
+Create Date: 2026-10-19 17:05:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e4b91c07a3f6"
+down_revision: Union[str, Sequence[str], None] = "d5a7e3c19b42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column in ("message_count", "total_prompt_tokens", "total_completion_tokens"):
+        op.add_column(
+            "chats",
+            sa.Column(column, sa.Integer(), nullable=False, server_default="0"),
+        )
+    op.add_column(
+        "chats", sa.Column("last_message_at", sa.DateTime(timezone=True), nullable=True)
+    )
+
+    # Backfill from the existing messages; empty chats count from creation
+    op.execute(
+        """
+        UPDATE chats
+        SET message_count = activity.message_count,
+            last_message_at = activity.last_message_at,
+            total_prompt_tokens = activity.total_prompt_tokens,
+            total_completion_tokens = activity.total_completion_tokens
+        FROM (
+            SELECT chat_id,
+                   count(*) AS message_count,
+                   max(created_at) AS last_message_at,
+                   coalesce(sum(prompt_tokens), 0) AS total_prompt_tokens,
+                   coalesce(sum(completion_tokens), 0) AS total_completion_tokens
+            FROM messages
+            GROUP BY chat_id
+        ) AS activity
+        WHERE chats.id = activity.chat_id
+        """
+    )
+    op.execute(
+        "UPDATE chats SET last_message_at = created_at WHERE last_message_at IS NULL"
+    )
+    op.alter_column("chats", "last_message_at", nullable=False)
+
+    op.create_index(
+        "ix_chats_user_id_last_message_at",
+        "chats",
+        ["user_id", "last_message_at", "id"],
+        unique=False,
+    )
+    # Covered by the leading column of the composite index
+    op.drop_index(op.f("ix_chats_user_id"), table_name="chats")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f("ix_chats_user_id"), "chats", ["user_id"], unique=False)
+    op.drop_index("ix_chats_user_id_last_message_at", table_name="chats")
+    op.drop_column("chats", "last_message_at")
+    op.drop_column("chats", "total_completion_tokens")
+    op.drop_column("chats", "total_prompt_tokens")
+    op.drop_column("chats", "message_count")
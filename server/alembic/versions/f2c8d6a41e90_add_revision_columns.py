@@ -0,0 +1,37 @@
+"""Add chat and chat-list revision columns
+
+Revision ID: f2c8d6a41e90
+Revises: e4b91c07a3f6
+Create Date: 2026-10-19 18:10:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f2c8d6a41e90"
+down_revision: Union[str, Sequence[str], None] = "e4b91c07a3f6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "chats",
+        sa.Column("revision", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "users",
+        sa.Column("chats_revision", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("users", "chats_revision")
+    op.drop_column("chats", "revision")
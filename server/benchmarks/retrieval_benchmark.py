@@ -0,0 +1,327 @@
+"""
+Offline retrieval benchmark: quality (recall@k, MRR) and latency/throughput
+of the FAISS retrieval path, written as JSON so runs can be compared.
+
+By default it chunks and indexes the fixture corpus in a temporary directory
+with DocumentEmbedder, so chunking changes are measured too. Pass --data-dir
+to benchmark an already built index instead.
+
+    cd server
+    python -m benchmarks.retrieval_benchmark --output bench.json
+    python -m benchmarks.retrieval_benchmark --encoder hashing --baseline bench.json
+
+The sentence-transformers encoder must already be in the local HF cache
+(downloads are disabled); `--encoder hashing` needs no model at all.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, UTC
+from pathlib import Path
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+import numpy as np  # noqa: E402
+
+from core.metrics import percentile  # noqa: E402
+from core.settings import settings  # noqa: E402
+from scraper.embedder import DocumentEmbedder  # noqa: E402
+from scraper.retrieval import RetrievalService  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Chunks fetched per page of the largest k, so the top k pages survive
+# the collapsing of chunks from the same URL
+CHUNKS_PER_PAGE = 4
+
+
+class HashingEncoder:
+    """
+    Deterministic bag-of-words encoder (unigrams + bigrams, feature hashing).
+    Only meant to exercise the pipeline offline; quality numbers from it are
+    not comparable with a real embedding model.
+    """
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def _bucket(self, feature: str) -> int:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little") % self.dimension
+
+    def encode(
+        self,
+        texts: list[str],
+        normalize_embeddings: bool = False,
+        show_progress_bar: bool = False,
+    ) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype="float32")
+        for row, text in enumerate(texts):
+            tokens = TOKEN_RE.findall(text.lower())
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                vectors[row, self._bucket(feature)] += 1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms == 0, 1.0, norms)
+        return vectors
+
+
+def load_encoder(kind: str, model_name: str):
+    if kind == "hashing":
+        return HashingEncoder()
+
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+def build_fixture_index(docs_path: Path, encoder, chunk_size: int) -> Path:
+    """Chunk and index the fixture corpus into a temporary data dir."""
+    data_dir = Path(tempfile.mkdtemp(prefix="docstral-bench-"))
+    shutil.copy(docs_path, data_dir / "mistral_docs.json")
+
+    embedder = DocumentEmbedder(data_dir=data_dir, model=encoder, chunk_size=chunk_size)
+    embedder.create_embeddings()
+    embedder.save_index()
+    return data_dir
+
+
+def summarize(values_ms: list[float]) -> dict:
+    ordered = sorted(values_ms)
+    return {
+        "mean_ms": statistics.fmean(ordered) if ordered else None,
+        "p50_ms": percentile(ordered, 50),
+        "p95_ms": percentile(ordered, 95),
+        "p99_ms": percentile(ordered, 99),
+    }
+
+
+async def evaluate_quality(
+    service: RetrievalService, queries: list[dict], ks: list[int]
+) -> dict:
+    max_k = max(ks)
+    batch = await service.search_batch(
+        [q["query"] for q in queries], top_k=max_k * CHUNKS_PER_PAGE
+    )
+
+    recall = {k: [] for k in ks}
+    reciprocal_ranks = []
+    per_query = []
+    for labelled, hits in zip(queries, batch.results):
+        relevant = set(labelled["relevant"])
+
+        # Rank pages, not chunks: the first chunk of a URL sets its rank
+        ranked_urls = list(dict.fromkeys(hit.url for hit in hits))
+        for k in ks:
+            found = relevant.intersection(ranked_urls[:k])
+            recall[k].append(len(found) / len(relevant))
+
+        rank = next(
+            (i for i, url in enumerate(ranked_urls, 1) if url in relevant), None
+        )
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        per_query.append({"query": labelled["query"], "first_relevant_rank": rank})
+
+    return {
+        **{f"recall@{k}": statistics.fmean(v) for k, v in recall.items()},
+        "mrr": statistics.fmean(reciprocal_ranks),
+        "queries": per_query,
+    }
+
+
+def measure_latency(
+    service: RetrievalService, queries: list[str], top_k: int, rounds: int
+) -> dict:
+    """Single-query encode and index search latency, measured separately."""
+    snapshot = service._snapshot
+    encode_ms, search_ms = [], []
+    for _ in range(rounds):
+        for query in queries:
+            start = time.perf_counter()
+            embedding = service.embedder.encode(
+                [query], normalize_embeddings=True
+            ).astype("float32")
+            encoded = time.perf_counter()
+            snapshot.index.search(embedding, top_k)
+            searched = time.perf_counter()
+            encode_ms.append((encoded - start) * 1000)
+            search_ms.append((searched - encoded) * 1000)
+
+    start = time.perf_counter()
+    service.embedder.encode(queries, normalize_embeddings=True)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        "encode": summarize(encode_ms),
+        "search": summarize(search_ms),
+        "batch_encode": {
+            "queries": len(queries),
+            "total_ms": batch_ms,
+            "per_query_ms": batch_ms / len(queries),
+        },
+    }
+
+
+async def measure_throughput(
+    service: RetrievalService,
+    queries: list[str],
+    top_k: int,
+    concurrency: int,
+    total_requests: int,
+) -> dict:
+    """End-to-end RetrievalService.search QPS with `concurrency` callers."""
+    latencies = []
+    counter = iter(range(total_requests))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            await service.search(queries[i % len(queries)], top_k=top_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "qps": total_requests / elapsed,
+        **summarize(latencies),
+    }
+
+
+def compare(current: dict, baseline: dict) -> list[str]:
+    """Human-readable deltas for the headline numbers."""
+    lines = []
+    for key, value in current["quality"].items():
+        if key != "queries" and key in baseline.get("quality", {}):
+            lines.append(f"{key:>12}: {baseline['quality'][key]:.3f} -> {value:.3f}")
+    for part in ("encode", "search"):
+        for stat in ("p50_ms", "p95_ms"):
+            old = baseline.get("latency", {}).get(part, {}).get(stat)
+            new = current["latency"][part][stat]
+            if old is not None and new is not None:
+                lines.append(f"{part} {stat:>6}: {old:.2f} -> {new:.2f}")
+    old_qps = {t["concurrency"]: t["qps"] for t in baseline.get("throughput", [])}
+    for row in current["throughput"]:
+        if row["concurrency"] in old_qps:
+            lines.append(
+                f"qps@{row['concurrency']:<4}: "
+                f"{old_qps[row['concurrency']]:.1f} -> {row['qps']:.1f}"
+            )
+    return lines
+
+
+async def run(args: argparse.Namespace) -> dict:
+    with open(args.queries, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+
+    encoder = load_encoder(args.encoder, args.model)
+
+    temp_dir = None
+    data_dir = args.data_dir
+    if data_dir is None:
+        temp_dir = data_dir = build_fixture_index(args.docs, encoder, args.chunk_size)
+
+    try:
+        service = RetrievalService(data_dir=data_dir, embedder=encoder)
+        service.start()
+        if not await service.wait_ready(timeout=600):
+            raise RuntimeError(f"RetrievalService failed to load ({service.state})")
+
+        query_texts = [q["query"] for q in queries]
+        quality = await evaluate_quality(service, queries, args.k)
+        latency = measure_latency(service, query_texts, max(args.k), args.rounds)
+        throughput = [
+            await measure_throughput(
+                service, query_texts, max(args.k), c, args.requests
+            )
+            for c in args.concurrency
+        ]
+
+        return {
+            "meta": {
+                "timestamp": datetime.now(UTC).isoformat(),
+                "encoder": args.encoder,
+                "model": args.model if args.encoder != "hashing" else None,
+                "corpus": str(args.docs) if args.data_dir is None else None,
+                "data_dir": str(args.data_dir) if args.data_dir else None,
+                "index_version": service.version,
+                "index_type": type(service._snapshot.index).__name__,
+                "chunks": len(service.chunks),
+                "chunk_size": args.chunk_size if args.data_dir is None else None,
+                "queries": len(queries),
+            },
+            "quality": quality,
+            "latency": latency,
+            "throughput": throughput,
+        }
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def parse_args() -> argparse.Namespace:
+    def int_list(value: str) -> list[int]:
+        return [int(v) for v in value.split(",") if v]
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--docs", type=Path, default=FIXTURES_DIR / "docs.json")
+    parser.add_argument("--queries", type=Path, default=FIXTURES_DIR / "queries.json")
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=None,
+        help="Benchmark an existing index directory instead of the fixture corpus",
+    )
+    parser.add_argument(
+        "--encoder",
+        choices=["sentence-transformer", "hashing"],
+        default="sentence-transformer",
+    )
+    parser.add_argument("--model", default=settings.SENTENCE_TRANSFORMER_MODEL)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--k", type=int_list, default=[1, 3, 5, 10])
+    parser.add_argument("--concurrency", type=int_list, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    return parser.parse_args()
+
+
+def main() -> None:
+    logging.basicConfig(
+        level=logging.WARNING,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    args = parse_args()
+    results = asyncio.run(run(args))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output, encoding="utf-8")
+        print(f"Results written to {args.output}")
+    else:
+        print(output)
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        print("\n".join(compare(results, baseline)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,11 @@
 import hashlib
-from datetime import datetime, UTC
 from fastapi import Depends, HTTPException, status, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlmodel import Session, select
+from sqlmodel import select
 
-from core.db import get_session
+from core.db import async_session_factory
 from core.settings import settings
+from core.token_cache import get_last_used_recorder, get_token_cache
 from models import User
 from models.token import UserToken
 
@@ -16,33 +16,34 @@ def hash_token(token: str) -> str:
     return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    session: Session = Depends(get_session),
-) -> type[User]:
-    token = credentials.credentials
-    hashed = hash_token(token)
-
-    token_row = session.exec(select(UserToken).where(UserToken.token == hashed)).first()
-    if not token_row:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or missing token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    user = session.get(User, token_row.user_id)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    token_row.last_used_at = datetime.now(UTC)
-    session.add(token_row)
-    session.commit()
-
+) -> User:
+    """
+    Resolve the bearer token to its user. Lookups are cached (see
+    core.token_cache) and `last_used_at` is written in background batches.
+    """
+    hashed = hash_token(credentials.credentials)
+
+    token_cache = get_token_cache()
+    user = await token_cache.get(hashed)
+    if user is None:
+        async with async_session_factory() as session:
+            statement = (
+                select(User)
+                .join(UserToken, UserToken.user_id == User.id)
+                .where(UserToken.token == hashed)
+            )
+            user = (await session.exec(statement)).first()
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or missing token",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        await token_cache.set(hashed, user)
+
+    get_last_used_recorder().record(hashed)
     return user
 
 
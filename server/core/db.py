@@ -1,4 +1,7 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
 from core.settings import settings
 
 engine = create_engine(
@@ -9,6 +12,17 @@ engine = create_engine(
     max_overflow=10,
 )
 
+# Async engine for the streaming routes (psycopg picks its async mode here)
+async_engine = create_async_engine(
+    settings.database_url,
+    pool_pre_ping=True,
+    pool_size=5,
+    max_overflow=10,
+)
+async_session_factory = async_sessionmaker(
+    async_engine, class_=AsyncSession, expire_on_commit=False
+)
+
 
 def get_session():
     with Session(engine) as session:
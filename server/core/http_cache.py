@@ -0,0 +1,77 @@
+"""
+Conditional GET support for chat reads.
+
+ETags are derived from the version stamps in `repositories.revisions`, so a
+request can be answered with 304 after a single indexed lookup, without
+loading any message. Serialized bodies are kept in a small per-worker LRU
+keyed by the same ETag: a bumped stamp changes the key, stale bodies are
+never served and simply age out.
+"""
+
+import hashlib
+from collections import OrderedDict
+
+from core.metrics import metrics
+from core.settings import settings
+
+metrics.register_gauge(
+    "http_cache.hit_rate",
+    lambda: metrics.ratio("http_cache.hit", "http_cache.lookups"),
+)
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag over the version stamp and whatever shapes the response."""
+    digest = hashlib.sha1(":".join(str(p) for p in parts).encode()).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of `etag` against an If-None-Match header value."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int | None = None):
+        self.max_entries = max_entries or settings.RESPONSE_CACHE_MAX_ENTRIES
+        self._entries: OrderedDict[str, tuple[bytes, dict[str, str]]] = OrderedDict()
+        metrics.register_gauge("http_cache.size", lambda: len(self._entries))
+
+    def get(self, etag: str) -> tuple[bytes, dict[str, str]] | None:
+        metrics.incr("http_cache.lookups")
+        entry = self._entries.get(etag)
+        if entry is None:
+            metrics.incr("http_cache.miss")
+            return None
+        self._entries.move_to_end(etag)
+        metrics.incr("http_cache.hit")
+        return entry
+
+    def set(self, etag: str, body: bytes, headers: dict[str, str]) -> None:
+        self._entries[etag] = (body, headers)
+        self._entries.move_to_end(etag)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+_response_cache_instance: ResponseCache | None = None
+
+
+def set_response_cache(cache: ResponseCache | None):
+    global _response_cache_instance
+    _response_cache_instance = cache
+
+
+def get_response_cache() -> ResponseCache:
+    global _response_cache_instance
+    if _response_cache_instance is None:
+        _response_cache_instance = ResponseCache()
+    return _response_cache_instance
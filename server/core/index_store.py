@@ -0,0 +1,73 @@
+"""
+On-disk layout of the RAG index.
+
+    DATA_DIR/
+        CURRENT                 # name of the active version (atomic pointer)
+        versions/<version>/     # faiss_index.bin, chunks.json, metadata.json
+
+Trees built before versioning (files directly in DATA_DIR) are still served
+as the "legacy" version when no CURRENT pointer exists.
+"""
+
+import os
+import shutil
+from datetime import datetime, UTC
+from pathlib import Path
+
+CURRENT_POINTER = "CURRENT"
+VERSIONS_DIR = "versions"
+LEGACY_VERSION = "legacy"
+
+INDEX_FILE = "faiss_index.bin"
+CHUNKS_FILE = "chunks.json"
+METADATA_FILE = "metadata.json"
+
+
+def resolve_current(data_dir: Path) -> tuple[str, Path]:
+    """Return (version, directory) of the active index."""
+    pointer = data_dir / CURRENT_POINTER
+    if pointer.exists():
+        version = pointer.read_text(encoding="utf-8").strip()
+        if version:
+            return version, data_dir / VERSIONS_DIR / version
+    return LEGACY_VERSION, data_dir
+
+
+def new_version_dir(data_dir: Path) -> tuple[str, Path]:
+    """Create an empty directory for a new index version."""
+    version = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%fZ")
+    path = data_dir / VERSIONS_DIR / version
+    path.mkdir(parents=True, exist_ok=False)
+    return version, path
+
+
+def publish_version(data_dir: Path, version: str) -> None:
+    """Atomically point CURRENT at `version`."""
+    if not (data_dir / VERSIONS_DIR / version).is_dir():
+        raise FileNotFoundError(f"Index version not found: {version}")
+
+    tmp = data_dir / f"{CURRENT_POINTER}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, data_dir / CURRENT_POINTER)
+
+
+def prune_versions(data_dir: Path, keep: int) -> list[str]:
+    """Delete all but the `keep` newest versions, never the current one."""
+    versions_dir = data_dir / VERSIONS_DIR
+    if not versions_dir.is_dir():
+        return []
+
+    current, _ = resolve_current(data_dir)
+    versions = sorted(
+        (p.name for p in versions_dir.iterdir() if p.is_dir()), reverse=True
+    )
+    removed = []
+    for version in versions[keep:]:
+        if version == current:
+            continue
+        shutil.rmtree(versions_dir / version, ignore_errors=True)
+        removed.append(version)
+    return removed
@@ -0,0 +1,105 @@
+import math
+import threading
+from collections import defaultdict, deque
+from typing import Callable
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics: counters, gauges and rolling summaries.
+    Names are dotted strings (e.g. "rag.context.saved_tokens").
+    """
+
+    def __init__(self, window: int = 1024):
+        self._lock = threading.Lock()
+        self._window = window
+        self._counters: dict[str, float] = defaultdict(float)
+        self._gauges: dict[str, float] = {}
+        self._gauge_callbacks: dict[str, Callable[[], float]] = {}
+        self._samples: dict[str, deque[float]] = defaultdict(
+            lambda: deque(maxlen=self._window)
+        )
+        self._totals: dict[str, tuple[int, float]] = defaultdict(lambda: (0, 0.0))
+
+    def incr(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0.0)
+
+    def ratio(self, numerator: str, denominator: str) -> float:
+        """Ratio of two counters, 0 when the denominator is empty."""
+        total = self.counter(denominator)
+        return self.counter(numerator) / total if total else 0.0
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def register_gauge(self, name: str, callback: Callable[[], float]) -> None:
+        """Register a gauge evaluated lazily on snapshot (e.g. queue depth)."""
+        with self._lock:
+            self._gauge_callbacks[name] = callback
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            self._samples[name].append(value)
+            count, total = self._totals[name]
+            self._totals[name] = (count + 1, total + value)
+
+    def count(self, name: str) -> int:
+        """Number of observations recorded for a summary."""
+        with self._lock:
+            return self._totals[name][0] if name in self._totals else 0
+
+    def percentile(self, name: str, q: float) -> float | None:
+        """Percentile (0-100) over the rolling window, None if no samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        return percentile(samples, q)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            callbacks = dict(self._gauge_callbacks)
+            samples = {k: sorted(v) for k, v in self._samples.items()}
+            totals = dict(self._totals)
+
+        for name, callback in callbacks.items():
+            try:
+                gauges[name] = float(callback())
+            except Exception:
+                gauges[name] = math.nan
+
+        summaries = {}
+        for name, values in samples.items():
+            count, total = totals[name]
+            summaries[name] = {
+                "count": count,
+                "sum": total,
+                "avg": total / count if count else 0.0,
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+            }
+
+        return {"counters": counters, "gauges": gauges, "summaries": summaries}
+
+
+def percentile(sorted_values: list[float], q: float) -> float | None:
+    """Linear-interpolated percentile (0-100) of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    if low == high:
+        return sorted_values[low]
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (
+        rank - low
+    )
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,105 @@
+"""
+Streaming NDJSON codec for the bulk export/import endpoints: one JSON
+document per line, optionally gzip-compressed, never held in memory whole.
+"""
+
+import zlib
+from typing import AsyncIterable, AsyncIterator
+
+import orjson
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+GZIP_MEDIA_TYPE = "application/gzip"
+
+# Lines are sent in chunks of about this size rather than one by one
+CHUNK_SIZE = 64 * 1024
+MAX_LINE_BYTES = 16 * 1024 * 1024
+
+
+def ndjson_line(payload) -> bytes:
+    return orjson.dumps(payload) + b"\n"
+
+
+async def chunked(
+    lines: AsyncIterable[bytes], size: int = CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    async for line in lines:
+        buffer += line
+        if len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def gzip_chunks(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def read_lines(
+    chunks: AsyncIterable[bytes], gzipped: bool = False
+) -> AsyncIterator[bytes]:
+    """
+    Split a (possibly gzip-compressed) byte stream into non-empty lines.
+
+    Raises:
+        ValueError: Corrupt gzip data or a line over MAX_LINE_BYTES.
+    """
+    decompressor = zlib.decompressobj(wbits=31) if gzipped else None
+    pending = b""
+    async for chunk in chunks:
+        if decompressor is not None:
+            try:
+                chunk = decompressor.decompress(chunk)
+            except zlib.error as e:
+                raise ValueError(f"Invalid gzip data: {e}") from e
+        *lines, pending = (pending + chunk).split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+        if len(pending) > MAX_LINE_BYTES:
+            raise ValueError(f"Line longer than {MAX_LINE_BYTES} bytes")
+
+    if decompressor is not None:
+        pending += decompressor.flush()
+        if not decompressor.eof:
+            raise ValueError("Truncated gzip data")
+    for line in pending.split(b"\n"):
+        if line.strip():
+            yield line
+
+
+def ndjson_response(
+    lines: AsyncIterable[bytes], filename: str, gzip: bool = False
+) -> StreamingResponse:
+    """Download of `lines` as `<filename>.ndjson`, or `.ndjson.gz` with `gzip`."""
+    chunks = chunked(lines)
+    if gzip:
+        chunks, media_type, filename = (
+            gzip_chunks(chunks),
+            GZIP_MEDIA_TYPE,
+            f"{filename}.ndjson.gz",
+        )
+    else:
+        media_type, filename = NDJSON_MEDIA_TYPE, f"{filename}.ndjson"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def request_lines(request: Request) -> AsyncIterator[bytes]:
+    """Lines of a request body, gunzipped when sent as gzip."""
+    encoding = request.headers.get("content-encoding", "").lower()
+    content_type = request.headers.get("content-type", "")
+    gzipped = encoding == "gzip" or content_type.startswith(GZIP_MEDIA_TYPE)
+    return read_lines(request.stream(), gzipped=gzipped)
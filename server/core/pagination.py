@@ -0,0 +1,45 @@
+"""
+Opaque keyset cursors. A cursor encodes the sort key (timestamp, id) of the
+last row of a page; the next page starts strictly after it.
+"""
+
+import base64
+from datetime import datetime
+from uuid import UUID
+
+
+def encode_cursor(timestamp: datetime, row_id: UUID) -> str:
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """
+    Raises:
+        ValueError: Malformed cursor.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(timestamp), UUID(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def encode_rank_cursor(rank: float, timestamp: datetime, row_id: UUID) -> str:
+    """Cursor of a ranked result list, ordered by (rank, timestamp, id)."""
+    raw = f"{rank!r}|{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, datetime, UUID]:
+    """
+    Raises:
+        ValueError: Malformed cursor.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        rank, timestamp, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return float(rank), datetime.fromisoformat(timestamp), UUID(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
@@ -9,6 +9,8 @@ class Settings(BaseSettings):
     DEBUG: bool = True
     DATA_DIR: DirectoryPath = Path(__file__).parent.parent / "scraper" / "data"
 
+    REDIS_URL: str = "redis://redis:6379"
+
     DB_ENABLED: bool = True
     DB_DRIVER: str = "postgresql+psycopg"
     DB_HOST: str = "db"
@@ -16,8 +18,113 @@ class Settings(BaseSettings):
     DB_USER: str = "postgres"
     DB_NAME: str = "docstral"
     SENTENCE_TRANSFORMER_MODEL: str = "BAAI/bge-small-en-v1.5"
+    # Comma-separated list of self-hosted endpoints (load balanced)
     SELF_HOSTED_LLM_URL: str | None = None
     SELF_HOSTED_API_KEY: str | None = None
+    # Fail over to the Mistral API when every self-hosted endpoint is down
+    LLM_FALLBACK_TO_API: bool = True
+    LLM_EJECT_AFTER_FAILURES: int = 3
+    LLM_EJECT_SECONDS: float = 30.0
+    LLM_HEALTH_CHECK_INTERVAL: float = 10.0
+    LLM_HEALTH_CHECK_TIMEOUT: float = 2.0
+    # Self-hosted backends tried per call on transient failures, before one
+    # last attempt on the fallback (each client already retries
+    # LLM_MAX_RETRIES times)
+    LLM_ROUTER_MAX_ATTEMPTS: int = 2
+    # Admission control for LLM turns, per worker (LLM_MAX_CONCURRENT=0
+    # disables it, LLM_MAX_CONCURRENT_PER_USER=0 lifts the per-user limit)
+    LLM_MAX_CONCURRENT: int = 16
+    LLM_MAX_CONCURRENT_PER_USER: int = 2
+    LLM_MAX_QUEUE: int = 64
+    LLM_QUEUE_TIMEOUT: float = 10.0
+    LLM_SHORT_REQUEST_TOKENS: int = 1000
+    # Retries of transient upstream failures (jittered exponential backoff)
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_DELAY: float = 0.5
+    LLM_RETRY_MAX_DELAY: float = 4.0
+    # Streams that produce nothing within this delay are retried
+    LLM_FIRST_CHUNK_TIMEOUT: float = 20.0
+    # Hedge non-streaming calls slower than this latency percentile
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_PERCENTILE: float = 95.0
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5
+    LLM_BREAKER_RESET_TIMEOUT: float = 30.0
+
+    # SSE: merge token deltas per write, bound buffering for slow clients
+    SSE_COALESCE_MS: float = 20.0
+    SSE_COALESCE_MAX_CHARS: int = 512
+    SSE_MAX_PENDING_CHUNKS: int = 256
+    # Resumable streams: "memory" (single worker) or "redis" (shared)
+    STREAM_BUFFER_BACKEND: str = "memory"
+    STREAM_BUFFER_MAX_EVENTS: int = 4096
+    # How long a finished stream stays replayable, and a hard cap on any stream
+    STREAM_BUFFER_TTL: float = 120.0
+    STREAM_BUFFER_MAX_AGE: float = 3600.0
+    # Generation continues this long without any connected reader
+    STREAM_RESUME_GRACE: float = 15.0
+
+    # RAG context packing
+    RAG_CANDIDATE_K: int = 8
+    RAG_MIN_SCORE: float = 0.5
+    RAG_SCORE_GAP: float = 0.15
+    RAG_CONTEXT_TOKEN_BUDGET: int = 1500
+    RAG_INDEX_KEEP_VERSIONS: int = 3
+    # How long a request waits for retrieval to finish loading before degrading
+    RAG_READY_TIMEOUT: float = 5.0
+    # Start retrieval on the raw user message alongside the first LLM call
+    RAG_SPECULATIVE: bool = False
+    RAG_SPECULATIVE_MIN_SIMILARITY: float = 0.5
+    # Coalesce concurrent searches into one encode + index search (0 disables)
+    RAG_BATCH_WINDOW_MS: float = 2.0
+    RAG_BATCH_MAX_SIZE: int = 32
+    TOOL_CALL_TIMEOUT: float = 10.0
+
+    # Conversation history sent to the LLM (older turns are summarized)
+    HISTORY_TOKEN_BUDGET: int = 3000
+    HISTORY_MIN_RECENT_MESSAGES: int = 2
+    # Most recent messages loaded per turn; older ones are already summarized
+    HISTORY_MAX_MESSAGES: int = 50
+
+    # Semantic cache of answers to standalone first-turn questions (opt-in)
+    ANSWER_CACHE_ENABLED: bool = False
+    ANSWER_CACHE_MAX_ENTRIES: int = 512
+    ANSWER_CACHE_TTL: float = 24 * 3600
+    ANSWER_CACHE_MIN_SIMILARITY: float = 0.95
+
+    # Message inserts are queued and written in batches in the background.
+    # "redis" journals queued rows so they survive a worker crash and other
+    # workers can read them; "memory" is only safe with a single worker
+    WRITE_BEHIND_ENABLED: bool = True
+    WRITE_BEHIND_BACKEND: str = "redis"
+    WRITE_BEHIND_BATCH_SIZE: int = 100
+    WRITE_BEHIND_FLUSH_INTERVAL: float = 0.1
+    WRITE_BEHIND_RETRY_MAX_DELAY: float = 10.0
+    # How often journals left by other (possibly dead) workers are written
+    WRITE_BEHIND_RECOVERY_INTERVAL: float = 60.0
+
+    # Bearer token -> user cache: "redis" (shared by workers, revocations
+    # reach every worker) or "memory" (single worker only)
+    AUTH_CACHE_BACKEND: str = "redis"
+    AUTH_CACHE_TTL: float = 300.0
+    # Local copies when Redis is used: bounds how long a revocation lags
+    AUTH_CACHE_LOCAL_TTL: float = 10.0
+    AUTH_CACHE_MAX_ENTRIES: int = 10_000
+    # token last_used_at is written in batches, at most this stale
+    AUTH_LAST_USED_FLUSH_INTERVAL: float = 30.0
+
+    # `python -m maintenance`: monthly partitions of messages created ahead,
+    # and chats inactive for this many days moved to chat_archives
+    MESSAGES_PARTITION_MONTHS_AHEAD: int = 3
+    ARCHIVE_AFTER_DAYS: int = 180
+    ARCHIVE_BATCH_SIZE: int = 100
+
+    # Serialized chat/chat list bodies kept per worker, keyed by ETag
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+
+    # NDJSON bulk export/import: rows per server-side cursor fetch, and rows
+    # per COPY batch (each batch is committed on its own)
+    BULK_EXPORT_FETCH_SIZE: int = 1000
+    BULK_IMPORT_BATCH_SIZE: int = 5000
 
     MISTRAL_API_KEY: str
     DB_PASSWORD: SecretStr
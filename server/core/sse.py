@@ -0,0 +1,98 @@
+import asyncio
+import contextlib
+from typing import AsyncGenerator, AsyncIterator
+
+import orjson
+
+from core.metrics import metrics
+from schemas.sse import SSEEvent
+
+_END = object()
+
+
+class SSEEncoder:
+    """Frames typed events as Server-Sent Events with increasing ids."""
+
+    def __init__(self, start_id: int = 0):
+        self.last_id = start_id
+
+    def encode(self, event: SSEEvent) -> bytes:
+        self.last_id += 1
+        data = orjson.dumps(event.model_dump(mode="json", by_alias=True))
+        return b"id: %d\nevent: %s\ndata: %s\n\n" % (
+            self.last_id,
+            event.event.encode(),
+            data,
+        )
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def coalesce(
+    source: AsyncIterator[str],
+    window_ms: float,
+    max_chars: int,
+    max_pending: int,
+) -> AsyncGenerator[str, None]:
+    """
+    Merge text chunks arriving within `window_ms` (up to `max_chars`).
+
+    `source` is consumed by a producer task through a queue of at most
+    `max_pending` chunks: when the consumer (a slow client) falls behind, the
+    producer blocks instead of buffering without bound. Closing this
+    generator cancels the producer, which closes `source`.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+    window = window_ms / 1000
+    loop = asyncio.get_running_loop()
+
+    async def produce():
+        try:
+            async with contextlib.aclosing(source) as chunks:
+                async for chunk in chunks:
+                    await queue.put(chunk)
+        except Exception as e:
+            await queue.put(_Failure(e))
+        else:
+            await queue.put(_END)
+
+    producer = asyncio.create_task(produce())
+    try:
+        finished = None
+        while finished is None:
+            item = await queue.get()
+            if item is _END or isinstance(item, _Failure):
+                finished = item
+                break
+
+            parts, size = [item], len(item)
+            deadline = loop.time() + window
+            while size < max_chars:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _END or isinstance(item, _Failure):
+                    finished = item
+                    break
+                parts.append(item)
+                size += len(item)
+
+            metrics.observe("sse.chunks_per_write", len(parts))
+            yield "".join(parts)
+
+        if isinstance(finished, _Failure):
+            raise finished.error
+    finally:
+        producer.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await producer
@@ -0,0 +1,306 @@
+"""
+Server-side buffers of in-progress SSE streams, keyed by stream id (the
+assistant message id), so a client that reconnects with Last-Event-ID gets
+the missed events replayed and then the live tail.
+
+Two implementations: InMemoryStreamBuffer (single worker) and
+RedisStreamBuffer (shared by all workers, a client may reconnect anywhere).
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import AsyncGenerator
+
+import redis.asyncio as redis
+
+from core.metrics import metrics
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class StreamNotFound(Exception):
+    """No buffered stream with this id (finished long ago or never existed)."""
+
+
+class StreamExpired(Exception):
+    """The requested events were already dropped from the bounded buffer."""
+
+
+class StreamBuffer(ABC):
+    """Append-only event log per stream, bounded in size and lifetime."""
+
+    @abstractmethod
+    async def open(self, stream_id: str) -> None: ...
+
+    @abstractmethod
+    async def append(self, stream_id: str, event_id: int, frame: bytes) -> None: ...
+
+    @abstractmethod
+    async def exists(self, stream_id: str) -> bool: ...
+
+    @abstractmethod
+    async def close(self, stream_id: str) -> None:
+        """Mark the stream finished; it stays readable for STREAM_BUFFER_TTL."""
+
+    @abstractmethod
+    def read(self, stream_id: str, after_id: int = 0) -> AsyncGenerator[bytes, None]:
+        """
+        Yield frames with an id greater than `after_id`, then follow the live
+        tail until the stream is closed.
+
+        Raises:
+            StreamNotFound: Unknown or expired stream.
+            StreamExpired: Events after `after_id` are no longer buffered.
+        """
+
+    @abstractmethod
+    async def attach(self, stream_id: str) -> None:
+        """Register a connected reader."""
+
+    @abstractmethod
+    async def detach(self, stream_id: str) -> None: ...
+
+    @abstractmethod
+    async def readers(self, stream_id: str) -> int:
+        """Number of connected readers (across workers for shared buffers)."""
+
+    async def aclose(self) -> None:
+        """Release backend resources."""
+
+
+class _BufferedStream:
+    def __init__(self, max_events: int):
+        self.events: deque[tuple[int, bytes]] = deque(maxlen=max_events)
+        self.closed = False
+        self.readers = 0
+        self.expires_at = time.monotonic() + settings.STREAM_BUFFER_MAX_AGE
+        # Replaced on every change; readers wait on the one they saw
+        self.changed = asyncio.Event()
+
+    def notify(self) -> None:
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class InMemoryStreamBuffer(StreamBuffer):
+    def __init__(self, max_events: int | None = None):
+        self.max_events = max_events or settings.STREAM_BUFFER_MAX_EVENTS
+        self._streams: dict[str, _BufferedStream] = {}
+        metrics.register_gauge("sse.buffer.streams", lambda: len(self._streams))
+
+    def _get(self, stream_id: str) -> _BufferedStream:
+        self._evict()
+        stream = self._streams.get(stream_id)
+        if stream is None:
+            raise StreamNotFound(stream_id)
+        return stream
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for stream_id in [k for k, s in self._streams.items() if s.expires_at < now]:
+            stream = self._streams.pop(stream_id)
+            stream.closed = True
+            stream.notify()
+
+    async def open(self, stream_id: str) -> None:
+        self._evict()
+        self._streams[stream_id] = _BufferedStream(self.max_events)
+
+    async def append(self, stream_id: str, event_id: int, frame: bytes) -> None:
+        stream = self._get(stream_id)
+        stream.events.append((event_id, frame))
+        stream.notify()
+
+    async def exists(self, stream_id: str) -> bool:
+        self._evict()
+        return stream_id in self._streams
+
+    async def close(self, stream_id: str) -> None:
+        stream = self._streams.get(stream_id)
+        if stream is None:
+            return
+        stream.closed = True
+        stream.expires_at = time.monotonic() + settings.STREAM_BUFFER_TTL
+        stream.notify()
+
+    async def read(
+        self, stream_id: str, after_id: int = 0
+    ) -> AsyncGenerator[bytes, None]:
+        stream = self._get(stream_id)
+        cursor = after_id
+        while True:
+            changed = stream.changed
+            events = list(stream.events)
+            if events and events[0][0] > cursor + 1:
+                raise StreamExpired(stream_id)
+            for event_id, frame in events:
+                if event_id > cursor:
+                    cursor = event_id
+                    yield frame
+            if stream.closed:
+                return
+            await changed.wait()
+
+    async def attach(self, stream_id: str) -> None:
+        self._get(stream_id).readers += 1
+
+    async def detach(self, stream_id: str) -> None:
+        stream = self._streams.get(stream_id)
+        if stream is not None:
+            stream.readers = max(0, stream.readers - 1)
+
+    async def readers(self, stream_id: str) -> int:
+        stream = self._streams.get(stream_id)
+        return stream.readers if stream else 0
+
+
+class RedisStreamBuffer(StreamBuffer):
+    """
+    One Redis stream per SSE stream (XADD with approximate MAXLEN), followed
+    with blocking XREAD. A final entry without data marks the end.
+    """
+
+    def __init__(self, url: str | None = None, max_events: int | None = None):
+        self.redis = redis.from_url(url or settings.REDIS_URL)
+        self.max_events = max_events or settings.STREAM_BUFFER_MAX_EVENTS
+
+    @staticmethod
+    def _key(stream_id: str) -> str:
+        return f"docstral:sse:{stream_id}"
+
+    async def open(self, stream_id: str) -> None:
+        key = self._key(stream_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key, f"{key}:readers")
+            pipe.xadd(key, {"id": 0, "data": b""}, maxlen=self.max_events)
+            pipe.expire(key, int(settings.STREAM_BUFFER_MAX_AGE))
+            await pipe.execute()
+
+    async def append(self, stream_id: str, event_id: int, frame: bytes) -> None:
+        await self.redis.xadd(
+            self._key(stream_id),
+            {"id": event_id, "data": frame},
+            maxlen=self.max_events,
+            approximate=True,
+        )
+
+    async def exists(self, stream_id: str) -> bool:
+        return bool(await self.redis.exists(self._key(stream_id)))
+
+    async def close(self, stream_id: str) -> None:
+        key = self._key(stream_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.xadd(key, {"id": -1, "end": 1}, maxlen=self.max_events)
+            pipe.expire(key, int(settings.STREAM_BUFFER_TTL))
+            pipe.expire(f"{key}:readers", int(settings.STREAM_BUFFER_TTL))
+            await pipe.execute()
+
+    async def read(
+        self, stream_id: str, after_id: int = 0
+    ) -> AsyncGenerator[bytes, None]:
+        key = self._key(stream_id)
+        entries = await self.redis.xrange(key)
+        if not entries:
+            raise StreamNotFound(stream_id)
+
+        # Entry 0 is the open marker; if it was trimmed, events may be missing
+        first_id = int(entries[0][1][b"id"])
+        if first_id > 0 and first_id > after_id + 1:
+            raise StreamExpired(stream_id)
+
+        cursor, last_entry = after_id, b"0-0"
+        while True:
+            for entry_id, fields in entries:
+                last_entry = entry_id
+                if b"end" in fields:
+                    return
+                event_id = int(fields[b"id"])
+                if event_id > cursor:
+                    cursor = event_id
+                    yield fields[b"data"]
+
+            result = await self.redis.xread({key: last_entry}, block=1000)
+            if not result:
+                if not await self.redis.exists(key):
+                    return
+                entries = []
+                continue
+            entries = result[0][1]
+            if entries and int(entries[0][1].get(b"id", -1)) > cursor + 1:
+                raise StreamExpired(stream_id)
+
+    async def attach(self, stream_id: str) -> None:
+        key = f"{self._key(stream_id)}:readers"
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.incr(key)
+            pipe.expire(key, int(settings.STREAM_BUFFER_MAX_AGE))
+            await pipe.execute()
+
+    async def detach(self, stream_id: str) -> None:
+        await self.redis.decr(f"{self._key(stream_id)}:readers")
+
+    async def readers(self, stream_id: str) -> int:
+        value = await self.redis.get(f"{self._key(stream_id)}:readers")
+        return max(0, int(value or 0))
+
+    async def aclose(self) -> None:
+        await self.redis.aclose()
+
+
+async def follow(
+    buffer: StreamBuffer, stream_id: str, after_id: int = 0
+) -> AsyncGenerator[bytes, None]:
+    """Read a stream as a connected reader (counted for the resume grace)."""
+    await buffer.attach(stream_id)
+    try:
+        async with contextlib.aclosing(buffer.read(stream_id, after_id)) as frames:
+            async for frame in frames:
+                yield frame
+    finally:
+        await buffer.detach(stream_id)
+
+
+async def cancel_when_abandoned(
+    buffer: StreamBuffer, stream_id: str, task: asyncio.Task
+) -> None:
+    """Cancel `task` once no reader was attached for STREAM_RESUME_GRACE seconds."""
+    idle_since = None
+    while True:
+        await asyncio.sleep(0.5)
+        if await buffer.readers(stream_id) > 0:
+            idle_since = None
+            continue
+        now = time.monotonic()
+        idle_since = idle_since or now
+        if now - idle_since >= settings.STREAM_RESUME_GRACE:
+            logger.info(f"No reader left for stream {stream_id}, cancelling")
+            task.cancel()
+            return
+
+
+def create_stream_buffer() -> StreamBuffer:
+    if settings.STREAM_BUFFER_BACKEND == "redis":
+        logger.info("SSE stream buffer: Redis")
+        return RedisStreamBuffer()
+    logger.info("SSE stream buffer: in-memory")
+    return InMemoryStreamBuffer()
+
+
+_stream_buffer_instance: StreamBuffer | None = None
+
+
+def set_stream_buffer(buffer: StreamBuffer | None):
+    global _stream_buffer_instance
+    _stream_buffer_instance = buffer
+
+
+def get_stream_buffer() -> StreamBuffer:
+    global _stream_buffer_instance
+    if _stream_buffer_instance is None:
+        _stream_buffer_instance = InMemoryStreamBuffer()
+    return _stream_buffer_instance
@@ -0,0 +1,27 @@
+import asyncio
+import logging
+from typing import Coroutine
+
+logger = logging.getLogger(__name__)
+
+# Strong references so fire-and-forget tasks are not garbage collected mid-run
+_background_tasks: set[asyncio.Task] = set()
+
+
+def spawn(coro: Coroutine, name: str | None = None) -> asyncio.Task:
+    """Run `coro` in the background, logging (not raising) its failure."""
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_done)
+    return task
+
+
+def _on_done(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        logger.error(
+            f"Background task {task.get_name()} failed: {error}", exc_info=error
+        )
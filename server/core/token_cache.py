@@ -0,0 +1,210 @@
+"""
+Bearer token cache and batched `last_used_at` tracking, so authenticating a
+request needs no database round-trip on a hit and never writes.
+
+TokenCache maps token hashes to users: an in-process TTL cache, optionally
+backed by Redis so workers share lookups. Revoking a token removes it from
+both tiers; other workers may serve it from their local tier for at most
+AUTH_CACHE_LOCAL_TTL seconds.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, UTC
+
+import orjson
+import redis.asyncio as redis
+from sqlalchemy import bindparam, update
+
+from core.db import async_engine
+from core.metrics import metrics
+from core.settings import settings
+from models import User
+from models.token import UserToken
+
+logger = logging.getLogger(__name__)
+
+metrics.register_gauge(
+    "auth.cache.hit_rate",
+    lambda: metrics.ratio("auth.cache.hit", "auth.cache.lookups"),
+)
+
+
+class TokenCache:
+    def __init__(
+        self,
+        ttl: float | None = None,
+        local_ttl: float | None = None,
+        max_entries: int | None = None,
+        redis_url: str | None = None,
+    ):
+        self.ttl = ttl or settings.AUTH_CACHE_TTL
+        self.max_entries = max_entries or settings.AUTH_CACHE_MAX_ENTRIES
+        self.redis = redis.from_url(redis_url) if redis_url else None
+        self.local_ttl = self.ttl
+        if self.redis is not None:
+            # Keep local copies short so revocations reach the other workers
+            self.local_ttl = min(self.ttl, local_ttl or settings.AUTH_CACHE_LOCAL_TTL)
+        self._entries: OrderedDict[str, tuple[float, User]] = OrderedDict()
+        metrics.register_gauge("auth.cache.size", lambda: len(self._entries))
+
+    @staticmethod
+    def _key(token_hash: str) -> str:
+        return f"docstral:auth:{token_hash}"
+
+    async def get(self, token_hash: str) -> User | None:
+        metrics.incr("auth.cache.lookups")
+        entry = self._entries.get(token_hash)
+        if entry is not None:
+            expires_at, user = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(token_hash)
+                metrics.incr("auth.cache.hit")
+                return user
+            del self._entries[token_hash]
+
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(self._key(token_hash))
+            except Exception as e:
+                logger.warning(f"Auth cache read failed: {e}")
+                raw = None
+            if raw is not None:
+                user = User.model_validate(orjson.loads(raw))
+                self._remember(token_hash, user)
+                metrics.incr("auth.cache.hit")
+                return user
+
+        metrics.incr("auth.cache.miss")
+        return None
+
+    async def set(self, token_hash: str, user: User) -> None:
+        self._remember(token_hash, user)
+        if self.redis is not None:
+            try:
+                await self.redis.set(
+                    self._key(token_hash),
+                    orjson.dumps(user.model_dump(mode="json")),
+                    ex=int(self.ttl),
+                )
+            except Exception as e:
+                logger.warning(f"Auth cache write failed: {e}")
+
+    async def invalidate(self, token_hash: str) -> None:
+        self._entries.pop(token_hash, None)
+        if self.redis is not None:
+            await self.redis.delete(self._key(token_hash))
+
+    def _remember(self, token_hash: str, user: User) -> None:
+        self._entries[token_hash] = (time.monotonic() + self.local_ttl, user)
+        self._entries.move_to_end(token_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def aclose(self) -> None:
+        if self.redis is not None:
+            await self.redis.aclose()
+
+
+class LastUsedRecorder:
+    """
+    Collects token uses in memory and writes `last_used_at` for all of them
+    in one batched UPDATE every AUTH_LAST_USED_FLUSH_INTERVAL seconds.
+    """
+
+    def __init__(self, interval: float | None = None):
+        self.interval = interval or settings.AUTH_LAST_USED_FLUSH_INTERVAL
+        self._pending: dict[str, datetime] = {}
+        self._task: asyncio.Task | None = None
+        metrics.register_gauge("auth.last_used.pending", lambda: len(self._pending))
+
+    def record(self, token_hash: str) -> None:
+        self._pending[token_hash] = datetime.now(UTC)
+
+    def discard(self, token_hash: str) -> None:
+        self._pending.pop(token_hash, None)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="auth-last-used-flush")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Flushing token last_used_at failed: {e}")
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+
+        table = UserToken.__table__
+        statement = (
+            update(table)
+            .where(table.c.token == bindparam("b_token"))
+            .values(last_used_at=bindparam("b_used_at"))
+        )
+        rows = [{"b_token": h, "b_used_at": t} for h, t in pending.items()]
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(statement, rows)
+        except Exception:
+            # Keep the newer timestamps recorded while the flush was running
+            for token_hash, used_at in pending.items():
+                self._pending.setdefault(token_hash, used_at)
+            raise
+        metrics.incr("auth.last_used.flushed", len(rows))
+        return len(rows)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Final token last_used_at flush failed: {e}")
+
+
+def create_token_cache() -> TokenCache:
+    if settings.AUTH_CACHE_BACKEND == "redis":
+        logger.info("Auth token cache: in-process + Redis")
+        return TokenCache(redis_url=settings.REDIS_URL)
+    logger.warning(
+        "Auth token cache: in-process only. A revoked token keeps working on "
+        f"the other workers for up to {settings.AUTH_CACHE_TTL:.0f}s"
+    )
+    return TokenCache()
+
+
+_token_cache_instance: TokenCache | None = None
+_last_used_recorder_instance: LastUsedRecorder | None = None
+
+
+def set_token_cache(cache: TokenCache | None):
+    global _token_cache_instance
+    _token_cache_instance = cache
+
+
+def get_token_cache() -> TokenCache:
+    global _token_cache_instance
+    if _token_cache_instance is None:
+        _token_cache_instance = TokenCache()
+    return _token_cache_instance
+
+
+def set_last_used_recorder(recorder: LastUsedRecorder | None):
+    global _last_used_recorder_instance
+    _last_used_recorder_instance = recorder
+
+
+def get_last_used_recorder() -> LastUsedRecorder:
+    global _last_used_recorder_instance
+    if _last_used_recorder_instance is None:
+        _last_used_recorder_instance = LastUsedRecorder()
+    return _last_used_recorder_instance
@@ -1,5 +1,17 @@
 from .client import LLMClient, set_llm_client, get_llm_client
 from .config import LLMConfig, MistralConfig, SelfHostedConfig
 from .factory import LLMClientFactory
-from .prompt import SYSTEM_PROMPT
+from .router import LLMRouter
+from .resilience import CircuitBreaker, CircuitOpenError, LLMUnavailableError
+from .prompt import SYSTEM_PROMPT, SUMMARY_PROMPT
 from .tools import get_mistral_tools
+from .tokens import count_tokens, count_message_tokens
+from .orchestrator import StreamOrchestrator, merge_usage
+from .history import HistoryManager, HistoryWindow
+from .answer_cache import AnswerCache, set_answer_cache, get_answer_cache
+from .admission import (
+    AdmissionController,
+    AdmissionRejected,
+    set_admission_controller,
+    get_admission_controller,
+)
@@ -0,0 +1,210 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from core.metrics import metrics
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """The request could not get an LLM slot; maps to 429/503 with Retry-After."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    user_id: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class AdmissionTicket:
+    """A granted LLM slot. `release()` is idempotent."""
+
+    def __init__(self, controller: "AdmissionController", user_id: str):
+        self._controller = controller
+        self._user_id = user_id
+        self._granted_at = time.perf_counter()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        metrics.observe(
+            "llm.admission.hold_ms", (time.perf_counter() - self._granted_at) * 1000
+        )
+        self._controller._release(self._user_id)
+
+
+class AdmissionController:
+    """
+    Bounds concurrent LLM turns per worker, globally and per user.
+
+    Requests over the limit wait in a bounded priority queue: short prompts
+    (at most LLM_SHORT_REQUEST_TOKENS) go first, FIFO within a class. A
+    request that cannot be queued, or waits longer than the queue deadline,
+    is rejected with a Retry-After estimate instead of piling up upstream.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int | None = None,
+        max_per_user: int | None = None,
+        max_queue: int | None = None,
+        queue_timeout: float | None = None,
+    ):
+        self.max_concurrent = max_concurrent or settings.LLM_MAX_CONCURRENT
+        # 0 disables the per-user limit
+        self.max_per_user = (
+            settings.LLM_MAX_CONCURRENT_PER_USER
+            if max_per_user is None
+            else max_per_user
+        )
+        self.max_queue = settings.LLM_MAX_QUEUE if max_queue is None else max_queue
+        self.queue_timeout = queue_timeout or settings.LLM_QUEUE_TIMEOUT
+        self._active = 0
+        self._per_user: dict[str, int] = defaultdict(int)
+        self._queue: list[_Waiter] = []
+        self._seq = itertools.count()
+
+        metrics.register_gauge("llm.admission.active", lambda: self._active)
+        metrics.register_gauge("llm.admission.queue_depth", lambda: len(self._queue))
+
+    async def acquire(self, user_id: str, prompt_tokens: int = 0) -> AdmissionTicket:
+        """
+        Wait for an LLM slot.
+
+        Args:
+            user_id: Caller identity for the per-user limit.
+            prompt_tokens: Prompt size, used to prioritize short requests.
+
+        Raises:
+            AdmissionRejected: 503 if the queue is full or the deadline
+                passes, 429 if the user already has too many requests queued.
+        """
+        if self._has_capacity(user_id):
+            self._take(user_id)
+            metrics.observe("llm.admission.wait_ms", 0.0)
+            return AdmissionTicket(self, user_id)
+
+        if len(self._queue) >= self.max_queue:
+            self._reject("queue_full")
+            raise AdmissionRejected(
+                503, "Server busy, retry later", self._retry_after()
+            )
+        if self._over_user_limit(sum(w.user_id == user_id for w in self._queue)):
+            self._reject("user_limit")
+            raise AdmissionRejected(
+                429, "Too many concurrent requests", self._retry_after()
+            )
+
+        priority = 0 if prompt_tokens <= settings.LLM_SHORT_REQUEST_TOKENS else 1
+        waiter = _Waiter(
+            priority,
+            next(self._seq),
+            user_id,
+            asyncio.get_running_loop().create_future(),
+        )
+        heapq.heappush(self._queue, waiter)
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter.future, timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted while timing out or being cancelled: give it back
+                self._release(user_id)
+            self._remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._reject("timeout")
+            raise AdmissionRejected(
+                503, "Server busy, retry later", self._retry_after()
+            ) from None
+        finally:
+            metrics.observe(
+                "llm.admission.wait_ms", (time.perf_counter() - start) * 1000
+            )
+
+        return AdmissionTicket(self, user_id)
+
+    def _has_capacity(self, user_id: str) -> bool:
+        running = self._per_user.get(user_id, 0)
+        return self._active < self.max_concurrent and not self._over_user_limit(running)
+
+    def _over_user_limit(self, count: int) -> bool:
+        return self.max_per_user > 0 and count >= self.max_per_user
+
+    def _take(self, user_id: str) -> None:
+        self._active += 1
+        self._per_user[user_id] += 1
+        metrics.incr("llm.admission.admitted")
+
+    def _release(self, user_id: str) -> None:
+        self._active -= 1
+        self._per_user[user_id] -= 1
+        if self._per_user[user_id] <= 0:
+            del self._per_user[user_id]
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant free slots to waiters in priority order, skipping capped users."""
+        blocked = []
+        while self._queue and self._active < self.max_concurrent:
+            waiter = heapq.heappop(self._queue)
+            if waiter.future.done():
+                continue
+            if self._over_user_limit(self._per_user.get(waiter.user_id, 0)):
+                blocked.append(waiter)
+                continue
+            self._take(waiter.user_id)
+            waiter.future.set_result(None)
+        for waiter in blocked:
+            heapq.heappush(self._queue, waiter)
+
+    def _remove(self, waiter: _Waiter) -> None:
+        if waiter in self._queue:
+            self._queue.remove(waiter)
+            heapq.heapify(self._queue)
+
+    def _reject(self, reason: str) -> None:
+        metrics.incr(f"llm.admission.rejected.{reason}")
+        logger.warning(
+            f"LLM admission rejected ({reason}): "
+            f"active={self._active}, queued={len(self._queue)}"
+        )
+
+    def _retry_after(self) -> int:
+        """Seconds until a slot is likely free, from the median hold time."""
+        hold_ms = metrics.percentile("llm.admission.hold_ms", 50)
+        if hold_ms is None:
+            return math.ceil(self.queue_timeout)
+        waves = (len(self._queue) + 1) / self.max_concurrent
+        return min(60, max(1, math.ceil(hold_ms / 1000 * waves)))
+
+
+_admission_controller_instance: AdmissionController | None = None
+
+
+def set_admission_controller(controller: AdmissionController | None):
+    global _admission_controller_instance
+    _admission_controller_instance = controller
+
+
+def get_admission_controller() -> AdmissionController | None:
+    """The admission controller, or None when limiting is disabled."""
+    return _admission_controller_instance
@@ -0,0 +1,135 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from core.metrics import metrics
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    index_version: str
+    embedding: np.ndarray
+    created_at: float
+
+
+class AnswerCache:
+    """
+    Semantic cache of final answers to standalone first-turn questions.
+
+    Entries are keyed by the normalized embedding of the question; a lookup
+    hits when the best cosine similarity reaches `min_similarity` and the
+    entry was produced with the current index version. Eviction is LRU,
+    bounded by `max_entries`, and entries expire after `ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        ttl: float | None = None,
+        min_similarity: float | None = None,
+    ):
+        self.max_entries = max_entries or settings.ANSWER_CACHE_MAX_ENTRIES
+        self.ttl = ttl or settings.ANSWER_CACHE_TTL
+        self.min_similarity = (
+            settings.ANSWER_CACHE_MIN_SIMILARITY
+            if min_similarity is None
+            else min_similarity
+        )
+        self._entries: OrderedDict[int, CachedAnswer] = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+        metrics.register_gauge("llm.answer_cache.size", lambda: len(self._entries))
+        metrics.register_gauge(
+            "llm.answer_cache.hit_rate",
+            lambda: metrics.ratio("llm.answer_cache.hits", "llm.answer_cache.lookups"),
+        )
+
+    def lookup(self, embedding: np.ndarray, index_version: str) -> CachedAnswer | None:
+        """Return the closest fresh answer for `embedding`, or None."""
+        metrics.incr("llm.answer_cache.lookups")
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            best_key, best_score = None, self.min_similarity
+            for key, entry in self._entries.items():
+                if entry.index_version != index_version:
+                    continue
+                score = float(np.dot(entry.embedding, embedding))
+                if score >= best_score:
+                    best_key, best_score = key, score
+
+            if best_key is None:
+                metrics.incr("llm.answer_cache.misses")
+                return None
+
+            self._entries.move_to_end(best_key)
+            entry = self._entries[best_key]
+
+        metrics.incr("llm.answer_cache.hits")
+        logger.debug(f"Answer cache hit ({best_score:.3f}): {entry.question[:80]}")
+        return entry
+
+    def store(
+        self,
+        question: str,
+        embedding: np.ndarray,
+        answer: str,
+        index_version: str,
+    ) -> None:
+        entry = CachedAnswer(
+            question=question,
+            answer=answer,
+            index_version=index_version,
+            embedding=embedding,
+            created_at=time.monotonic(),
+        )
+        with self._lock:
+            self._entries[self._next_key] = entry
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.incr("llm.answer_cache.evictions")
+        metrics.incr("llm.answer_cache.stores")
+
+    def invalidate(self) -> None:
+        """Drop every entry (e.g. after an index hot-swap)."""
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+        metrics.incr("llm.answer_cache.invalidations")
+        logger.info(f"Answer cache invalidated ({dropped} entries)")
+
+    def _expire(self, now: float) -> None:
+        # Entries are in LRU order, not creation order: scan them all
+        expired = [
+            key
+            for key, entry in self._entries.items()
+            if now - entry.created_at > self.ttl
+        ]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            metrics.incr("llm.answer_cache.expired", len(expired))
+
+
+_answer_cache_instance: AnswerCache | None = None
+
+
+def set_answer_cache(cache: AnswerCache | None):
+    global _answer_cache_instance
+    _answer_cache_instance = cache
+
+
+def get_answer_cache() -> AnswerCache | None:
+    """The answer cache, or None when it is disabled."""
+    return _answer_cache_instance
@@ -1,16 +1,29 @@
+import asyncio
+import json
 import logging
 import time
+from contextlib import aclosing
 from typing import AsyncGenerator
 from mistralai import Mistral
 
+from core.metrics import metrics
+from core.settings import settings
 from schemas.health import LLMMode
 from .config import LLMConfig
+from .resilience import CircuitBreaker, backend_name, backoff_delay, is_retryable
 
 logger = logging.getLogger(__name__)
 
 
 class LLMClient:
-    """Minimal async client for Mistral API and self-hosted models."""
+    """
+    Minimal async client for Mistral API and self-hosted models.
+
+    Transient failures (timeouts, connection errors, 429, 5xx) are retried
+    with jittered backoff; streams only until their first item. Each client
+    has its own circuit breaker, which fails fast with CircuitOpenError
+    while the backend keeps failing.
+    """
 
     def __init__(self, config: LLMConfig, mode: LLMMode):
         self.config: LLMConfig = config
@@ -20,6 +33,8 @@ class LLMClient:
             server_url=config.base_url,
             timeout_ms=int(config.timeout * 1000),
         )
+        self.name = backend_name(config.base_url)
+        self.breaker = CircuitBreaker(self.name)
         logger.info(f"LLM client initialized: {config.model} at {config.base_url}")
 
     async def invoke(
@@ -28,7 +43,11 @@ class LLMClient:
         tools: list[dict] | None = None,
     ) -> tuple[str, dict, list[dict] | None]:
         """
-        Standard completion call.
+        Standard completion call, with retries and optional hedging.
+
+        With LLM_HEDGE_ENABLED, a second identical request is sent once the
+        first is slower than the LLM_HEDGE_PERCENTILE latency of this
+        backend; the first response wins and the other is cancelled.
 
         Args:
             messages: List of message dicts with 'role' and 'content'.
@@ -41,8 +60,82 @@ class LLMClient:
                 - tool_calls: list of tool call dicts or None
 
         Raises:
-            Exception: On API errors.
+            CircuitOpenError: If the backend's circuit breaker is open.
+            Exception: On API errors, once retries are exhausted.
         """
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            self.breaker.check()
+            try:
+                result = await self._invoke_hedged(messages, tools)
+            except Exception as e:
+                if not self._record_error(e, attempt):
+                    raise
+                await asyncio.sleep(backoff_delay(attempt))
+            except BaseException:
+                # Cancelled: neither a success nor a backend failure
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def _invoke_hedged(
+        self, messages: list[dict], tools: list[dict] | None
+    ) -> tuple[str, dict, list[dict] | None]:
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._invoke_once(messages, tools)
+
+        tasks = {asyncio.create_task(self._invoke_once(messages, tools))}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return done.pop().result()
+
+            metrics.incr(f"llm.backend.{self.name}.hedges")
+            hedge = asyncio.create_task(self._invoke_once(messages, tools))
+            tasks.add(hedge)
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            metrics.incr(f"llm.backend.{self.name}.hedges_won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _hedge_delay(self) -> float | None:
+        """Seconds to wait before hedging, None while hedging is off or unprimed."""
+        name = f"llm.backend.{self.name}.invoke_ms"
+        if not settings.LLM_HEDGE_ENABLED or metrics.count(name) < 20:
+            return None
+        return metrics.percentile(name, settings.LLM_HEDGE_PERCENTILE) / 1000
+
+    def _record_error(self, error: Exception, attempt: int) -> bool:
+        """Update the breaker for a failed attempt. Returns whether to retry."""
+        if not is_retryable(error):
+            self.breaker.release()
+            return False
+        self.breaker.record_failure()
+        if attempt >= settings.LLM_MAX_RETRIES:
+            return False
+        metrics.incr(f"llm.backend.{self.name}.retries")
+        logger.warning(
+            f"LLM call failed (attempt {attempt + 1}/{settings.LLM_MAX_RETRIES + 1}), "
+            f"retrying: {error}"
+        )
+        return True
+
+    async def _invoke_once(
+        self, messages: list[dict], tools: list[dict] | None
+    ) -> tuple[str, dict, list[dict] | None]:
         start = time.perf_counter()
 
         try:
@@ -57,6 +150,7 @@ class LLMClient:
             raise
 
         latency_ms = int((time.perf_counter() - start) * 1000)
+        metrics.observe(f"llm.backend.{self.name}.invoke_ms", latency_ms)
 
         choice = response.choices[0]
         content = choice.message.content or ""
@@ -68,7 +162,7 @@ class LLMClient:
                     "id": tc.id,
                     "function": {
                         "name": tc.function.name,
-                        "arguments": tc.function.arguments,
+                        "arguments": _normalize_arguments(tc.function.arguments),
                     },
                 }
                 for tc in choice.message.tool_calls
@@ -92,61 +186,130 @@ class LLMClient:
         self,
         messages: list[dict],
         tools: list[dict] | None = None,
-    ) -> AsyncGenerator[tuple[str, dict | None], None]:
+    ) -> AsyncGenerator[tuple[str, dict | None, list[dict] | None], None]:
         """
-        Streaming completion call.
+        Streaming completion call with tool-call detection.
+
+        Content deltas are forwarded as they arrive. Tool-call deltas are
+        accumulated (by index) and returned once the stream ends, so callers
+        can decide on retrieval without a separate non-streaming call.
 
         Args:
             messages: List of message dicts.
             tools: Optional tool definitions.
 
         Yields:
-            (chunk, usage) tuples where:
-                - chunk: Text content (str)
-                - usage: Usage dict on final chunk, None otherwise
+            (chunk, usage, tool_calls) tuples where:
+                - chunk: Text content (str), empty on the final item
+                - usage: Usage dict on the final item, None otherwise
                   Format: {prompt_tokens, completion_tokens, latency_ms}
+                - tool_calls: Assembled tool calls on the final item if the
+                  model requested any, None otherwise
 
         Example:
-            async for chunk, usage in client.stream(messages):
+            async for chunk, usage, tool_calls in client.stream(messages, tools):
                 print(chunk, end="")
-                if usage:
-                    print(f"\nTokens: {usage['prompt_tokens']}+{usage['completion_tokens']}")
+                if tool_calls:
+                    ...  # execute tools, then stream again
         """
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            self.breaker.check()
+            forwarded = False
+            try:
+                async with aclosing(self._stream_once(messages, tools)) as items:
+                    async for item in items:
+                        forwarded = True
+                        yield item
+            except Exception as e:
+                # Output already forwarded cannot be taken back: no retry
+                if not self._record_error(e, attempt) or forwarded:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt))
+            except BaseException:
+                # Closed by the consumer or cancelled
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                return
+
+    async def _stream_once(
+        self, messages: list[dict], tools: list[dict] | None
+    ) -> AsyncGenerator[tuple[str, dict | None, list[dict] | None], None]:
         start = time.perf_counter()
+        usage_dict = None
+        partial_calls: dict[int, dict] = {}
 
         try:
-            stream = await self.client.chat.stream_async(
-                model=self.config.model,
-                messages=messages,
-                temperature=self.config.temperature,
-                tools=tools,
-            )
+            # A stuck upstream fails fast (and is retried) until it responds
+            async with asyncio.timeout(settings.LLM_FIRST_CHUNK_TIMEOUT) as deadline:
+                stream = await self.client.chat.stream_async(
+                    model=self.config.model,
+                    messages=messages,
+                    temperature=self.config.temperature,
+                    tools=tools,
+                )
+
+                # Closing the stream closes the upstream HTTP response, which
+                # also happens when the consumer stops early (disconnect)
+                async with stream:
+                    async for chunk in stream:
+                        deadline.reschedule(None)
+                        if chunk.data.usage:
+                            latency_ms = int((time.perf_counter() - start) * 1000)
+                            usage_dict = {
+                                "prompt_tokens": chunk.data.usage.prompt_tokens,
+                                "completion_tokens": chunk.data.usage.completion_tokens,
+                                "latency_ms": latency_ms,
+                            }
+
+                        if not chunk.data.choices:
+                            continue
+                        delta = chunk.data.choices[0].delta
 
-            async for chunk in stream:
-                delta = chunk.data.choices[0].delta
-                content = delta.content or ""
-
-                # Check if this is the final chunk with usage
-                usage_dict = None
-                if chunk.data.usage:
-                    latency_ms = int((time.perf_counter() - start) * 1000)
-                    usage_dict = {
-                        "prompt_tokens": chunk.data.usage.prompt_tokens,
-                        "completion_tokens": chunk.data.usage.completion_tokens,
-                        "latency_ms": latency_ms,
-                    }
-                    logger.debug(
-                        f"LLM stream complete: "
-                        f"{usage_dict['prompt_tokens']}+{usage_dict['completion_tokens']} tokens, "
-                        f"{latency_ms}ms"
-                    )
-
-                yield content, usage_dict
+                        for position, tc in enumerate(delta.tool_calls or []):
+                            _accumulate_tool_call(partial_calls, position, tc)
+
+                        content = delta.content or ""
+                        if content:
+                            yield content, None, None
 
         except Exception as e:
             logger.error(f"LLM stream failed: {e}")
             raise
 
+        tool_calls = [partial_calls[i] for i in sorted(partial_calls)] or None
+        if usage_dict:
+            logger.debug(
+                f"LLM stream complete: "
+                f"{usage_dict['prompt_tokens']}+{usage_dict['completion_tokens']} tokens, "
+                f"{usage_dict['latency_ms']}ms, tool_calls={bool(tool_calls)}"
+            )
+        yield "", usage_dict, tool_calls
+
+
+def _normalize_arguments(arguments: dict | str | None) -> str:
+    if isinstance(arguments, dict):
+        return json.dumps(arguments)
+    return arguments or ""
+
+
+def _accumulate_tool_call(partial_calls: dict[int, dict], position: int, tc) -> None:
+    """
+    Merge one streamed tool-call delta. Mistral sends complete calls in one
+    chunk; OpenAI-compatible servers (vLLM) send the id and name first and
+    the arguments in fragments, keyed by index.
+    """
+    index = tc.index if tc.index is not None else position
+    call = partial_calls.setdefault(
+        index, {"id": None, "function": {"name": "", "arguments": ""}}
+    )
+    if tc.id and tc.id != "null":
+        call["id"] = tc.id
+    if tc.function.name:
+        call["function"]["name"] = tc.function.name
+    call["function"]["arguments"] += _normalize_arguments(tc.function.arguments)
+
 
 # Singleton pattern for DI
 _llm_client_instance: LLMClient | None = None
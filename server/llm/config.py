@@ -39,18 +39,31 @@ class SelfHostedConfig(LLMConfig):
 
     @staticmethod
     def from_env() -> "SelfHostedConfig | None":
-        base_url = settings.SELF_HOSTED_LLM_URL
+        configs = SelfHostedConfig.pool_from_env()
+        return configs[0] if configs else None
+
+    @staticmethod
+    def pool_from_env() -> list["SelfHostedConfig"]:
+        """One config per endpoint in the comma-separated SELF_HOSTED_LLM_URL."""
+        urls = [
+            url.strip()
+            for url in (settings.SELF_HOSTED_LLM_URL or "").split(",")
+            if url.strip()
+        ]
         api_key = settings.SELF_HOSTED_API_KEY
 
-        if not base_url or not api_key:
-            return None
+        if not urls or not api_key:
+            return []
 
         model = os.getenv(
             "SELF_HOSTED_MODEL", "mistralai/Mistral-7B-Instruct-v0.3"
         ).strip()
 
-        return SelfHostedConfig(
-            base_url=base_url,
-            model=model,
-            api_key=api_key,
-        )
+        return [
+            SelfHostedConfig(
+                base_url=base_url,
+                model=model,
+                api_key=api_key,
+            )
+            for base_url in urls
+        ]
@@ -1,7 +1,9 @@
 import logging
 import os
+from core.settings import settings
 from .client import LLMClient
 from .config import SelfHostedConfig, MistralConfig
+from .router import LLMRouter
 from schemas.health import LLMMode
 
 logger = logging.getLogger(__name__)
@@ -11,19 +13,40 @@ class LLMClientFactory:
     """Factory to create LLM client based on deployment mode."""
 
     @staticmethod
-    async def create() -> LLMClient:
+    async def create() -> LLMClient | LLMRouter:
         """
         Create LLM client from environment variables.
         Priority: self-hosted > API.
 
+        In self-hosted mode the endpoints of SELF_HOSTED_LLM_URL are wrapped
+        in an LLMRouter (load balancing, health checks, API failover).
+
         Returns:
-            Configured LLMClient instance.
+            Configured LLMClient or LLMRouter instance.
         """
         mode = os.getenv("LLM_MODE", LLMMode.API).strip().lower()
-        if mode == LLMMode.SELF_HOSTED:
-            config = SelfHostedConfig.from_env()
-            logger.info(f"LLM client: Self-hosted mode at {config.base_url}")
-            return LLMClient(config=config, mode=LLMMode.SELF_HOSTED)
+        if mode == LLMMode.SELF_HOSTED.lower():
+            configs = SelfHostedConfig.pool_from_env()
+            if configs:
+                logger.info(
+                    "LLM client: Self-hosted mode at "
+                    + ", ".join(config.base_url for config in configs)
+                )
+                fallback = None
+                if settings.LLM_FALLBACK_TO_API:
+                    fallback = LLMClient(
+                        config=MistralConfig.from_env(), mode=LLMMode.API
+                    )
+                router = LLMRouter(
+                    [
+                        LLMClient(config=config, mode=LLMMode.SELF_HOSTED)
+                        for config in configs
+                    ],
+                    fallback=fallback,
+                )
+                router.start()
+                return router
+            logger.warning("Self-hosted mode without endpoints, using Mistral API")
 
         logger.info("LLM client: Mistral API mode")
         config = MistralConfig.from_env()
@@ -0,0 +1,172 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from core.metrics import metrics
+from core.settings import settings
+from models import MessageRole
+from schemas import MessageOut
+from .client import LLMClient
+from .prompt import SUMMARY_PROMPT
+from .tokens import MESSAGE_OVERHEAD_TOKENS, count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HistoryWindow:
+    """Prompt messages for one turn and what was left out of them."""
+
+    messages: list[dict]
+    # Messages not covered by the stored summary, oldest first
+    pending: list[MessageOut] = field(default_factory=list)
+    # Pending messages that did not fit the budget
+    dropped: int = 0
+    full_tokens: int = 0
+    prompt_tokens: int = 0
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(0, self.full_tokens - self.prompt_tokens)
+
+    @property
+    def needs_summary(self) -> bool:
+        return self.dropped > 0
+
+
+class HistoryManager:
+    """
+    Keeps the conversation sent to the LLM within a token budget.
+
+    The most recent messages are sent verbatim; older ones are replaced by a
+    rolling summary stored on the chat. Once messages overflow the budget the
+    summary is extended with them (after the turn), folding the history down
+    to half the budget so summarization does not run on every turn.
+    """
+
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        token_budget: int | None = None,
+        min_recent: int | None = None,
+    ):
+        self.llm_client = llm_client
+        self.token_budget = token_budget or settings.HISTORY_TOKEN_BUDGET
+        self.min_recent = (
+            settings.HISTORY_MIN_RECENT_MESSAGES if min_recent is None else min_recent
+        )
+
+    def build(
+        self,
+        system_prompt: str,
+        messages: list[MessageOut],
+        summary: str | None = None,
+        summary_until: datetime | None = None,
+    ) -> HistoryWindow:
+        """
+        Build the prompt for the next turn.
+
+        Args:
+            system_prompt: Base system prompt.
+            messages: All chat messages, including the new user message.
+            summary: Stored summary of the messages up to `summary_until`.
+            summary_until: Creation time of the last summarized message.
+
+        Returns:
+            HistoryWindow with the prompt messages and token accounting.
+        """
+        messages = sorted(messages, key=lambda m: m.created_at)
+        pending = [
+            m for m in messages if summary_until is None or m.created_at > summary_until
+        ]
+        if not pending and messages:
+            # Never send a turn without its latest message
+            pending = messages[-1:]
+            summary = None
+
+        recent = self._select_recent(pending, self.token_budget)
+
+        system_content = system_prompt
+        if summary:
+            system_content += f"\n\n## Conversation so far\n{summary}"
+        prompt = [{"role": "system", "content": system_content}]
+        prompt.extend({"role": m.role.value, "content": m.content} for m in recent)
+
+        window = HistoryWindow(
+            messages=prompt,
+            pending=pending,
+            dropped=len(pending) - len(recent),
+            full_tokens=_message_tokens(system_prompt)
+            + sum(_message_tokens(m.content) for m in messages),
+            prompt_tokens=sum(_message_tokens(m["content"]) for m in prompt),
+        )
+
+        metrics.observe("history.prompt_tokens", window.prompt_tokens)
+        metrics.observe("history.saved_tokens", window.saved_tokens)
+        logger.debug(
+            f"History: {len(recent)}/{len(messages)} messages, "
+            f"{window.prompt_tokens} tokens (saved {window.saved_tokens})"
+        )
+        return window
+
+    def messages_to_fold(self, pending: list[MessageOut]) -> list[MessageOut]:
+        """Pending messages to move into the summary, oldest first."""
+        keep = self._select_recent(pending, self.token_budget // 2)
+        return pending[: len(pending) - len(keep)]
+
+    async def summarize(
+        self, summary: str | None, messages: list[MessageOut]
+    ) -> str | None:
+        """
+        Extend `summary` with `messages`.
+
+        Returns:
+            The updated summary, or None if the LLM call failed.
+        """
+        transcript = "\n\n".join(
+            f"{m.role.value.capitalize()}: {m.content}" for m in messages
+        )
+        prompt = [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {
+                "role": "user",
+                "content": f"Existing summary:\n{summary or '(none)'}\n\n"
+                f"New messages:\n{transcript}",
+            },
+        ]
+
+        start = time.perf_counter()
+        try:
+            content, _, _ = await self.llm_client.invoke(prompt)
+        except Exception as e:
+            metrics.incr("history.summary_failures")
+            logger.warning(f"History summarization failed: {e}")
+            return None
+        finally:
+            metrics.observe("history.summary_ms", (time.perf_counter() - start) * 1000)
+
+        metrics.incr("history.summaries")
+        return content.strip() or None
+
+    def _select_recent(
+        self, messages: list[MessageOut], budget: int
+    ) -> list[MessageOut]:
+        """Newest messages that fit `budget` (at least `min_recent` of them)."""
+        selected: list[MessageOut] = []
+        used = 0
+        for message in reversed(messages):
+            cost = _message_tokens(message.content)
+            if used + cost > budget and len(selected) >= max(1, self.min_recent):
+                break
+            selected.append(message)
+            used += cost
+
+        # Start the window on a user turn
+        while len(selected) > 1 and selected[-1].role != MessageRole.USER:
+            selected.pop()
+        return selected[::-1]
+
+
+def _message_tokens(content: str) -> int:
+    return count_tokens(content or "") + MESSAGE_OVERHEAD_TOKENS
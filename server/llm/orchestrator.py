@@ -0,0 +1,321 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from contextlib import aclosing
+from typing import AsyncGenerator
+
+from core.metrics import metrics
+from core.settings import settings
+from scraper.context import ContextBuilder, ContextSource
+from scraper.retrieval import RetrievalService, RetrievedChunk
+from .client import LLMClient
+from .resilience import LLMUnavailableError
+from .tools import get_mistral_tools
+
+logger = logging.getLogger(__name__)
+
+TERM_RE = re.compile(r"[a-z0-9][a-z0-9._-]*")
+STOPWORDS = frozenset(
+    "a an and are can do does for from how i in is it me my of on or the to "
+    "what when where which with you your mistral".split()
+)
+
+DEGRADED_INTRO = (
+    "The assistant is temporarily unavailable, so here are the most relevant "
+    "documentation excerpts for your question:"
+)
+DEGRADED_NO_RESULTS = (
+    "The assistant is temporarily unavailable and no relevant documentation "
+    "was found. Please try again in a moment, or check docs.mistral.ai."
+)
+DEGRADED_EXCERPT_CHARS = 600
+
+metrics.register_gauge(
+    "rag.speculative.hit_rate",
+    lambda: metrics.ratio("rag.speculative.hit", "rag.speculative.started"),
+)
+metrics.register_gauge(
+    "rag.speculative.waste_rate",
+    lambda: (
+        1.0 - metrics.ratio("rag.speculative.hit", "rag.speculative.started")
+        if metrics.counter("rag.speculative.started")
+        else 0.0
+    ),
+)
+
+
+def _terms(text: str) -> set[str]:
+    terms = set()
+    for term in TERM_RE.findall(text.lower()):
+        if term in STOPWORDS:
+            continue
+        for suffix in ("ing", "es", "ed", "s"):
+            if len(term) > len(suffix) + 3 and term.endswith(suffix):
+                term = term[: -len(suffix)]
+                break
+        terms.add(term)
+    return terms
+
+
+def query_similarity(a: str, b: str) -> float:
+    """Jaccard similarity of lightly stemmed content terms (0..1)."""
+    terms_a, terms_b = _terms(a), _terms(b)
+    if not terms_a or not terms_b:
+        return 0.0
+    return len(terms_a & terms_b) / len(terms_a | terms_b)
+
+
+def merge_usage(total: dict | None, usage: dict | None) -> dict | None:
+    """Sum token counts and latency across the LLM calls of one turn."""
+    if not usage:
+        return total
+    if not total:
+        return dict(usage)
+    return {key: total.get(key, 0) + usage.get(key, 0) for key in usage}
+
+
+class StreamOrchestrator:
+    """
+    Runs one assistant turn as a single streaming pass.
+
+    The first call streams with tools enabled: content is forwarded as soon as
+    it arrives, and only if the model assembles a tool call do we execute it
+    and stream a second call with the tool results.
+
+    In speculative mode, retrieval on the raw user message starts alongside
+    the first call. If the model's tool query is close enough to the message
+    the speculative hits are used as is, otherwise they are discarded.
+
+    If no LLM backend is available (circuit open) before any content was
+    sent, the turn degrades to a retrieval-only answer: the top chunks for
+    the user message, with their sources.
+    """
+
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        retrieval_service: RetrievalService | None,
+        context_builder: ContextBuilder | None = None,
+        speculative: bool | None = None,
+    ):
+        self.llm_client = llm_client
+        self.retrieval_service = retrieval_service
+        self.context_builder = context_builder or ContextBuilder()
+        self.speculative = (
+            settings.RAG_SPECULATIVE if speculative is None else speculative
+        )
+        self._speculation: tuple[str, asyncio.Task] | None = None
+        self.usage: dict | None = None
+        self.chunks: list[str] = []
+        self.pending_tool_calls: list[dict] | None = None
+        self.sources: list[ContextSource] = []
+        self.ttft_ms: int | None = None
+        # True when the reply is the retrieval-only fallback, not model output
+        self.degraded = False
+        self._round_content: list[str] = []
+        self._started_at = 0.0
+
+    @property
+    def content(self) -> str:
+        return "".join(self.chunks)
+
+    async def run(self, messages: list[dict]) -> AsyncGenerator[str, None]:
+        """
+        Stream the assistant reply for `messages` (mutated with tool turns).
+
+        Yields:
+            Text chunks. Merged usage is available on `self.usage` afterwards.
+        """
+        self._started_at = time.perf_counter()
+        tools = get_mistral_tools() if self.retrieval_service else None
+        if tools and self.speculative:
+            self._start_speculation(messages)
+
+        # Rounds are closed explicitly so that closing this generator (client
+        # disconnect) closes the upstream stream right away
+        try:
+            async with aclosing(self._stream_round(messages, tools)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+
+            if self.pending_tool_calls:
+                logger.info(f"Tool calls detected: {len(self.pending_tool_calls)}")
+                await self._append_tool_results(messages, self.pending_tool_calls)
+
+                async with aclosing(self._stream_round(messages, None)) as chunks:
+                    async for chunk in chunks:
+                        yield chunk
+        except LLMUnavailableError as e:
+            if self.chunks or not self.retrieval_service:
+                raise
+            logger.warning(f"LLM unavailable, answering from retrieval only: {e}")
+            metrics.incr("llm.degraded_answers")
+            self.degraded = True
+            answer = await self._degraded_answer(messages)
+            self.chunks.append(answer)
+            yield answer
+        finally:
+            self._discard_speculation("rag.speculative.unused")
+
+    async def _stream_round(
+        self, messages: list[dict], tools: list[dict] | None
+    ) -> AsyncGenerator[str, None]:
+        self.pending_tool_calls = None
+        self._round_content = []
+
+        async with aclosing(self.llm_client.stream(messages, tools=tools)) as stream:
+            async for chunk, usage, tool_calls in stream:
+                if chunk:
+                    if self.ttft_ms is None:
+                        self.ttft_ms = int(
+                            (time.perf_counter() - self._started_at) * 1000
+                        )
+                        metrics.observe("llm.ttft_ms", self.ttft_ms)
+                    self.chunks.append(chunk)
+                    self._round_content.append(chunk)
+                    yield chunk
+                if usage:
+                    self.usage = merge_usage(self.usage, usage)
+                if tool_calls and self.retrieval_service:
+                    self.pending_tool_calls = tool_calls
+
+    async def _append_tool_results(
+        self, messages: list[dict], tool_calls: list[dict]
+    ) -> None:
+        """
+        Append the assistant tool-call message and one tool message per call.
+        Calls run concurrently; tool messages keep the order of the calls.
+        """
+        messages.append(
+            {
+                "role": "assistant",
+                "content": "".join(self._round_content),
+                "tool_calls": [
+                    {
+                        "id": tool_call["id"],
+                        "type": "function",
+                        "function": tool_call["function"],
+                    }
+                    for tool_call in tool_calls
+                ],
+            }
+        )
+        results = await asyncio.gather(
+            *(self._execute_with_timeout(tool_call) for tool_call in tool_calls)
+        )
+        for tool_call, content in zip(tool_calls, results):
+            messages.append(
+                {
+                    "role": "tool",
+                    "tool_call_id": tool_call["id"],
+                    "content": content,
+                }
+            )
+
+    async def _execute_with_timeout(self, tool_call: dict) -> str:
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(
+                self.execute_tool_call(tool_call), timeout=settings.TOOL_CALL_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            metrics.incr("llm.tool.timeouts")
+            logger.warning(
+                f"Tool call timed out after {settings.TOOL_CALL_TIMEOUT}s: "
+                f"{tool_call['function']['name']}"
+            )
+            return "The tool timed out. Answer without its results."
+        except Exception as e:
+            metrics.incr("llm.tool.errors")
+            logger.error(f"Tool call failed: {e}", exc_info=True)
+            return "The tool failed. Answer without its results."
+        finally:
+            metrics.observe("llm.tool.latency_ms", (time.perf_counter() - start) * 1000)
+
+    async def execute_tool_call(self, tool_call: dict) -> str:
+        """Run one tool call and return the content of its tool message."""
+        name = tool_call["function"]["name"]
+        if name != "search_documentation":
+            logger.warning(f"Unknown tool requested: {name}")
+            return f"Unknown tool: {name}"
+
+        try:
+            args = json.loads(tool_call["function"]["arguments"] or "{}")
+        except json.JSONDecodeError:
+            logger.warning(f"Invalid tool arguments: {tool_call['function']}")
+            args = {}
+        query = args.get("query", "")
+
+        docs = await self._search(query)
+        packed = self.context_builder.build(docs)
+        known = {source.url for source in self.sources}
+        self.sources.extend(s for s in packed.sources if s.url not in known)
+        return packed.text
+
+    def _start_speculation(self, messages: list[dict]) -> None:
+        user_text = next(
+            (m["content"] for m in reversed(messages) if m["role"] == "user"), ""
+        )
+        if not user_text:
+            return
+        task = asyncio.create_task(
+            self.retrieval_service.search(user_text, top_k=settings.RAG_CANDIDATE_K)
+        )
+        # Discarded tasks may still fail; consume the exception quietly
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._speculation = (user_text, task)
+        metrics.incr("rag.speculative.started")
+
+    def _discard_speculation(self, outcome: str) -> None:
+        if self._speculation is None:
+            return
+        _, task = self._speculation
+        self._speculation = None
+        task.cancel()
+        metrics.incr(outcome)
+
+    async def _search(self, query: str) -> list[RetrievedChunk]:
+        """Search docs, reusing the speculative result when the query matches."""
+        if self._speculation is not None:
+            user_text, task = self._speculation
+            similarity = query_similarity(query, user_text)
+            if similarity >= settings.RAG_SPECULATIVE_MIN_SIMILARITY:
+                self._speculation = None
+                try:
+                    docs = await task
+                except Exception as e:
+                    logger.warning(f"Speculative search failed: {e}")
+                else:
+                    metrics.incr("rag.speculative.hit")
+                    logger.debug(f"Speculative hit ({similarity:.2f}): {query}")
+                    return docs
+            else:
+                logger.debug(f"Speculative miss ({similarity:.2f}): {query}")
+                self._discard_speculation("rag.speculative.miss")
+
+        logger.debug(f"Searching docs: {query}")
+        return await self.retrieval_service.search(
+            query, top_k=settings.RAG_CANDIDATE_K
+        )
+
+    async def _degraded_answer(self, messages: list[dict]) -> str:
+        """Retrieval-only answer built from the top chunks for the user message."""
+        # Not a model query: the speculative search must not count as a hit
+        self._discard_speculation("rag.speculative.unused")
+        user_text = next(
+            (m["content"] for m in reversed(messages) if m["role"] == "user"), ""
+        )
+        docs = self.context_builder.select(await self._search(user_text))
+        if not docs:
+            return DEGRADED_NO_RESULTS
+
+        parts = [DEGRADED_INTRO]
+        for i, doc in enumerate(docs, 1):
+            excerpt = doc.chunk.strip()
+            if len(excerpt) > DEGRADED_EXCERPT_CHARS:
+                excerpt = excerpt[:DEGRADED_EXCERPT_CHARS].rsplit(" ", 1)[0] + " ..."
+            quoted = "\n".join(f"> {line}" for line in excerpt.splitlines())
+            parts.append(f"{i}. [{doc.title}]({doc.url})\n\n{quoted}")
+        return "\n\n".join(parts)
@@ -47,3 +47,14 @@ If the tool returns **no results**:
 - Provide **working code examples** when applicable  
 - Focus on actionable answers  
 - Avoid speculation or off-topic elaboration"""
+
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and Docstral, an assistant for Mistral AI's API documentation.
+
+Update the existing summary with the new messages. Keep:
+- The user's goals, constraints and environment (language, SDK, models in use)
+- Questions asked and the key facts, parameters and code decisions in the answers
+- Documentation URLs that were cited
+- Anything left unresolved
+
+Drop greetings and repetition. Write compact bullet points, at most 250 words. Return only the updated summary."""
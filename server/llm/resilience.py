@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import random
+import re
+import time
+from enum import Enum
+from urllib.parse import urlparse
+
+import httpx
+from mistralai.models import MistralError, NoResponseError
+
+from core.metrics import metrics
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class LLMUnavailableError(RuntimeError):
+    """No LLM backend can take the request right now."""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """The backend's circuit breaker is open."""
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+def backend_name(base_url: str) -> str:
+    """Metric-safe backend name, e.g. "vllm-1_8000" for http://vllm-1:8000."""
+    netloc = urlparse(base_url).netloc or "backend"
+    return re.sub(r"[^A-Za-z0-9_-]", "_", netloc)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Transient upstream failures: timeouts, connection errors, 429 and 5xx."""
+    if isinstance(error, MistralError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(
+        error, (NoResponseError, httpx.TransportError, asyncio.TimeoutError)
+    )
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for retry `attempt` (0-based)."""
+    cap = min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * 2**attempt)
+    return random.uniform(0, cap)
+
+
+class CircuitBreaker:
+    """
+    Per-backend circuit breaker.
+
+    Opens after `failure_threshold` consecutive transient failures and fails
+    fast for `reset_timeout` seconds. Then a single trial call is let through
+    (half-open): success closes the breaker, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int | None = None,
+        reset_timeout: float | None = None,
+    ):
+        self.name = name
+        self.failure_threshold = (
+            failure_threshold or settings.LLM_BREAKER_FAILURE_THRESHOLD
+        )
+        self.reset_timeout = reset_timeout or settings.LLM_BREAKER_RESET_TIMEOUT
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+        metrics.register_gauge(
+            f"llm.breaker.{name}.open", lambda: float(self.state != BreakerState.CLOSED)
+        )
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless a call may go through."""
+        if self.state == BreakerState.CLOSED:
+            return
+        if self.state == BreakerState.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                metrics.incr(f"llm.breaker.{self.name}.rejected")
+                raise CircuitOpenError(f"Circuit open for LLM backend {self.name}")
+            self.state = BreakerState.HALF_OPEN
+            self._trial_in_flight = False
+        if self._trial_in_flight:
+            metrics.incr(f"llm.breaker.{self.name}.rejected")
+            raise CircuitOpenError(f"Circuit half-open for LLM backend {self.name}")
+        self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        if self.state != BreakerState.CLOSED:
+            logger.info(f"Circuit closed for LLM backend {self.name}")
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if (
+            self.state == BreakerState.HALF_OPEN
+            or self.failures >= self.failure_threshold
+        ):
+            if self.state != BreakerState.OPEN:
+                metrics.incr(f"llm.breaker.{self.name}.opened")
+                logger.warning(
+                    f"Circuit opened for LLM backend {self.name} "
+                    f"after {self.failures} failures"
+                )
+            self.state = BreakerState.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """End a call that neither succeeded nor failed (e.g. a client error)."""
+        self._trial_in_flight = False
@@ -0,0 +1,227 @@
+import asyncio
+import contextlib
+import logging
+import time
+from typing import AsyncGenerator
+
+from core.metrics import metrics
+from core.settings import settings
+from schemas.health import LLMMode
+from .client import LLMClient
+from .resilience import LLMUnavailableError, is_retryable
+
+logger = logging.getLogger(__name__)
+
+
+def _can_fail_over(error: Exception) -> bool:
+    """
+    Transient failures and open circuits move on to the next backend. Other
+    errors (bad request, context too long, auth) would fail the same way on
+    every backend and are raised unchanged.
+    """
+    return isinstance(error, LLMUnavailableError) or is_retryable(error)
+
+
+class Backend:
+    """One LLM endpoint with its load and health state."""
+
+    def __init__(self, client: LLMClient, name: str | None = None):
+        self.client = client
+        self.name = name or client.name
+        self.outstanding = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.last_used = 0.0
+
+        prefix = f"llm.backend.{self.name}"
+        metrics.register_gauge(f"{prefix}.outstanding", lambda: self.outstanding)
+        metrics.register_gauge(f"{prefix}.healthy", lambda: float(self.healthy))
+
+    @property
+    def available(self) -> bool:
+        # Ejected backends get one trial request once the ejection expires
+        return self.healthy or time.monotonic() >= self.ejected_until
+
+    def record_success(self, latency_ms: float) -> None:
+        self.consecutive_failures = 0
+        if not self.healthy:
+            logger.info(f"LLM backend {self.name} recovered")
+        self.healthy = True
+        metrics.observe(f"llm.backend.{self.name}.latency_ms", latency_ms)
+
+    def record_failure(self, error: Exception) -> None:
+        self.consecutive_failures += 1
+        metrics.incr(f"llm.backend.{self.name}.errors")
+        logger.warning(
+            f"LLM backend {self.name} failed "
+            f"({self.consecutive_failures} in a row): {error}"
+        )
+        if (
+            not self.healthy
+            or self.consecutive_failures >= settings.LLM_EJECT_AFTER_FAILURES
+        ):
+            self.eject()
+
+    def eject(self) -> None:
+        if self.healthy:
+            metrics.incr(f"llm.backend.{self.name}.ejections")
+            logger.warning(
+                f"LLM backend {self.name} ejected for {settings.LLM_EJECT_SECONDS}s"
+            )
+        self.healthy = False
+        self.ejected_until = time.monotonic() + settings.LLM_EJECT_SECONDS
+
+
+class LLMRouter:
+    """
+    Spreads LLM calls over a pool of self-hosted endpoints.
+
+    Same interface as LLMClient. Each call goes to the available backend with
+    the fewest outstanding requests. Backends are ejected after consecutive
+    failures (passive) or a failed probe of their models endpoint (active),
+    and come back after a successful probe or trial request. When every
+    self-hosted backend is down, calls fail over to the fallback client
+    (the Mistral API).
+    """
+
+    def __init__(self, clients: list[LLMClient], fallback: LLMClient | None = None):
+        if not clients:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = [Backend(client) for client in clients]
+        self.fallback = Backend(fallback, name="mistral-api") if fallback else None
+        self.config = clients[0].config
+        self.mode = LLMMode.SELF_HOSTED
+        self._health_task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start active health checks on the running event loop."""
+        if self._health_task is None and settings.LLM_HEALTH_CHECK_INTERVAL > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self) -> None:
+        if self._health_task:
+            self._health_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._health_task
+
+    def _pick(self, exclude: set[str], error: Exception | None = None) -> Backend:
+        """
+        The least loaded available self-hosted backend not in `exclude`, up to
+        LLM_ROUTER_MAX_ATTEMPTS of them per call; then the fallback, once.
+        `error` is the failure of the previous attempt, if any.
+        """
+        self_hosted_tried = sum(b.name in exclude for b in self.backends)
+        candidates = []
+        if self_hosted_tried < settings.LLM_ROUTER_MAX_ATTEMPTS:
+            candidates = [
+                b for b in self.backends if b.available and b.name not in exclude
+            ]
+        if candidates:
+            backend = min(candidates, key=lambda b: (b.outstanding, b.last_used))
+        elif self.fallback and self.fallback.name not in exclude:
+            metrics.incr("llm.router.failovers")
+            logger.warning("No self-hosted LLM backend left, using Mistral API")
+            backend = self.fallback
+        elif error is not None:
+            raise LLMUnavailableError(
+                f"LLM call failed on {len(exclude)} backends: {error}"
+            ) from error
+        else:
+            raise LLMUnavailableError("No healthy LLM backend available")
+
+        backend.last_used = time.monotonic()
+        metrics.incr(f"llm.backend.{backend.name}.requests")
+        return backend
+
+    async def invoke(
+        self,
+        messages: list[dict],
+        tools: list[dict] | None = None,
+    ) -> tuple[str, dict, list[dict] | None]:
+        """LLMClient.invoke on the least loaded backend, retried on the next one."""
+        tried: set[str] = set()
+        error = None
+        while True:
+            backend = self._pick(tried, error)
+            backend.outstanding += 1
+            start = time.perf_counter()
+            try:
+                result = await backend.client.invoke(messages, tools=tools)
+            except Exception as e:
+                if not _can_fail_over(e):
+                    raise
+                backend.record_failure(e)
+                tried.add(backend.name)
+                error = e
+                continue
+            finally:
+                backend.outstanding -= 1
+
+            backend.record_success((time.perf_counter() - start) * 1000)
+            return result
+
+    async def stream(
+        self,
+        messages: list[dict],
+        tools: list[dict] | None = None,
+    ) -> AsyncGenerator[tuple[str, dict | None, list[dict] | None], None]:
+        """
+        LLMClient.stream on the least loaded backend.
+
+        A backend failing before its first item is retried on the next one;
+        once output has been forwarded the error is raised to the caller.
+        """
+        tried: set[str] = set()
+        error = None
+        while True:
+            backend = self._pick(tried, error)
+            backend.outstanding += 1
+            start = time.perf_counter()
+            forwarded = False
+            try:
+                async with contextlib.aclosing(
+                    backend.client.stream(messages, tools=tools)
+                ) as items:
+                    async for item in items:
+                        forwarded = True
+                        yield item
+            except Exception as e:
+                if not _can_fail_over(e):
+                    raise
+                backend.record_failure(e)
+                if forwarded:
+                    raise
+                tried.add(backend.name)
+                error = e
+                continue
+            finally:
+                backend.outstanding -= 1
+
+            backend.record_success((time.perf_counter() - start) * 1000)
+            return
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.LLM_HEALTH_CHECK_INTERVAL)
+            await asyncio.gather(*(self._probe(b) for b in self.backends))
+
+    async def _probe(self, backend: Backend) -> None:
+        timeout_ms = int(settings.LLM_HEALTH_CHECK_TIMEOUT * 1000)
+        start = time.perf_counter()
+        try:
+            await backend.client.client.models.list_async(timeout_ms=timeout_ms)
+        except Exception as e:
+            metrics.incr(f"llm.backend.{backend.name}.probe_failures")
+            if backend.healthy:
+                logger.warning(f"LLM backend {backend.name} failed health check: {e}")
+            backend.eject()
+            return
+
+        metrics.observe(
+            f"llm.backend.{backend.name}.probe_ms", (time.perf_counter() - start) * 1000
+        )
+        if not backend.healthy:
+            logger.info(f"LLM backend {backend.name} passed health check")
+        backend.healthy = True
+        backend.consecutive_failures = 0
@@ -0,0 +1,46 @@
+import logging
+from functools import lru_cache
+
+from mistral_common.tokens.tokenizers.mistral import MistralTokenizer
+
+logger = logging.getLogger(__name__)
+
+# Role markers and separators added per message by the chat template
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    """
+    Local Tekken tokenizer (ships with mistral-common, no download).
+    Returns None if it cannot be loaded; counts then fall back to an estimate.
+    """
+    try:
+        return MistralTokenizer.v3(is_tekken=True).instruct_tokenizer.tokenizer
+    except Exception as e:
+        logger.warning(f"Local tokenizer unavailable, estimating tokens: {e}")
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap prompt-token estimate (~4 characters per token)."""
+    if not text:
+        return 0
+    return max(1, (len(text) + 3) // 4)
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Count tokens with the local tokenizer. Exact usage comes back from the LLM."""
+    if not text:
+        return 0
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return estimate_tokens(text)
+    return len(tokenizer.encode(text, bos=False, eos=False))
+
+
+def count_message_tokens(messages: list[dict]) -> int:
+    return sum(
+        count_tokens(m.get("content") or "") + MESSAGE_OVERHEAD_TOKENS for m in messages
+    )
@@ -1,3 +1,5 @@
+import asyncio
+import signal
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
@@ -7,37 +9,112 @@ import redis.asyncio as redis
 import logging
 
 from core.logging import setup_logging
-from llm import set_llm_client, LLMClientFactory
-from routers import chats_router, health_router, auth_router
-
+from core.settings import settings
+from core.stream_buffer import create_stream_buffer, set_stream_buffer
+from core.tasks import spawn
+from core.token_cache import (
+    LastUsedRecorder,
+    create_token_cache,
+    set_last_used_recorder,
+    set_token_cache,
+)
+from llm import (
+    AdmissionController,
+    AnswerCache,
+    LLMClientFactory,
+    LLMRouter,
+    set_admission_controller,
+    set_answer_cache,
+    set_llm_client,
+)
+from llm.tokens import get_tokenizer
+from routers import (
+    chats_router,
+    health_router,
+    auth_router,
+    search_router,
+    admin_router,
+)
+
+from repositories.write_behind import create_write_queue, set_write_queue
 from scraper.retrieval import RetrievalService, set_retrieval_service
 
 logger = logging.getLogger(__name__)
 
 
+def _install_reload_signal(retrieval_service: RetrievalService) -> None:
+    """Hot-swap the index on SIGUSR1 (`pkill -USR1 -P <supervisor pid>` after ingestion)."""
+    loop = asyncio.get_running_loop()
+
+    async def reload():
+        try:
+            await retrieval_service.reload()
+        except Exception as e:
+            logger.error(f"Index reload on signal failed: {e}")
+
+    try:
+        loop.add_signal_handler(
+            signal.SIGUSR1, lambda: spawn(reload(), name="index-reload")
+        )
+    except (NotImplementedError, AttributeError, RuntimeError) as e:
+        logger.warning(f"Signal-triggered index reload unavailable: {e}")
+
+
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     setup_logging()
 
     redis_client = redis.from_url(
-        "redis://redis:6379",
+        settings.REDIS_URL,
         encoding="utf-8",
         decode_responses=True,
     )
     await FastAPILimiter.init(redis=redis_client)
 
+    stream_buffer = create_stream_buffer()
+    set_stream_buffer(stream_buffer)
+
+    token_cache = create_token_cache()
+    set_token_cache(token_cache)
+    write_queue = None
+    if settings.WRITE_BEHIND_ENABLED:
+        write_queue = create_write_queue()
+        write_queue.start()
+        set_write_queue(write_queue)
+
+    last_used_recorder = LastUsedRecorder()
+    last_used_recorder.start()
+    set_last_used_recorder(last_used_recorder)
+
     llm_client = await LLMClientFactory.create()
     set_llm_client(llm_client)
+    if settings.LLM_MAX_CONCURRENT > 0:
+        set_admission_controller(AdmissionController())
 
-    try:
-        retrieval_service = RetrievalService()
-        set_retrieval_service(retrieval_service)
-    except FileNotFoundError as e:
-        logger.warning(f"RAG disabled: {e}")
-        set_retrieval_service(None)
+    # Load the tokenizer used for history budgeting off the event loop
+    spawn(asyncio.to_thread(get_tokenizer), name="tokenizer-load")
+
+    # Encoder and index load in the background; the app serves immediately
+    retrieval_service = RetrievalService()
+    retrieval_service.start()
+    set_retrieval_service(retrieval_service)
+    _install_reload_signal(retrieval_service)
+
+    if settings.ANSWER_CACHE_ENABLED:
+        answer_cache = AnswerCache()
+        set_answer_cache(answer_cache)
+        retrieval_service.add_swap_listener(lambda *_: answer_cache.invalidate())
 
     yield
 
+    await retrieval_service.close()
+    if isinstance(llm_client, LLMRouter):
+        await llm_client.close()
+    await stream_buffer.aclose()
+    if write_queue is not None:
+        await write_queue.close()
+    await last_used_recorder.close()
+    await token_cache.aclose()
     await FastAPILimiter.close()
 
 
@@ -55,12 +132,15 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Message-Id", "X-Next-Cursor", "Retry-After", "ETag"],
     )
 
     # Routers
     app.include_router(health_router)
     app.include_router(chats_router)
     app.include_router(auth_router)
+    app.include_router(search_router)
+    app.include_router(admin_router)
 
     return app
 
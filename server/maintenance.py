@@ -0,0 +1,242 @@
+"""
+Database maintenance: partitions of `messages` and archival of cold chats.
+
+    cd server
+    python -m maintenance                 # archive, then partitions (daily cron)
+    python -m maintenance partitions      # also run by the container entrypoint
+    python -m maintenance archive --days 365 --dry-run
+
+`partitions` creates the monthly partitions of the next
+MESSAGES_PARTITION_MONTHS_AHEAD months, so inserts never fall into
+`messages_default`, and drops past partitions that archival left empty.
+`archive` moves the messages of chats inactive for ARCHIVE_AFTER_DAYS into
+compressed `chat_archives` rows; they stay readable (repositories/archive.py).
+"""
+
+import argparse
+import logging
+from datetime import date, datetime, timedelta, UTC
+
+from sqlalchemy import or_, text, tuple_
+from sqlmodel import Session, select
+
+from core.db import engine
+from core.logging import setup_logging
+from core.settings import settings
+from models import Chat, Message
+from repositories.archive import archive_chat
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "messages_p"
+
+
+def month_start(day: date, offset: int = 0) -> date:
+    """First day of the month `offset` months after the month of `day`."""
+    index = day.year * 12 + day.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+def list_partitions(session: Session) -> list[str]:
+    return list(
+        session.exec(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'messages'::regclass ORDER BY c.relname"
+            )
+        ).scalars()
+    )
+
+
+def _stored_columns() -> str:
+    """Columns of `messages` that can be inserted (not generated)."""
+    return ", ".join(c.name for c in Message.__table__.columns if c.computed is None)
+
+
+def _month_range(start: date) -> tuple[str, str]:
+    """SQL literals bounding the month that starts at `start`."""
+    return f"'{start} 00:00:00+00'", f"'{month_start(start, 1)} 00:00:00+00'"
+
+
+def count_default_rows(session: Session, start: date) -> int:
+    """Rows of the month starting at `start` held by `messages_default`."""
+    lower, upper = _month_range(start)
+    return session.exec(
+        text(
+            "SELECT count(*) FROM messages_default "
+            f"WHERE created_at >= {lower} AND created_at < {upper}"
+        )
+    ).scalar()
+
+
+def create_partition(session: Session, start: date) -> int:
+    """
+    Create the partition of the month starting at `start`, in one
+    transaction. Rows of that month already in `messages_default` (which
+    would block the CREATE) are moved into it. Returns how many were moved.
+    """
+    name = partition_name(start)
+    lower, upper = _month_range(start)
+    in_month = f"created_at >= {lower} AND created_at < {upper}"
+    columns = _stored_columns()
+
+    session.exec(
+        text(
+            f"CREATE TEMP TABLE partition_stash ON COMMIT DROP AS "
+            f"SELECT {columns} FROM messages_default WHERE {in_month}"
+        )
+    )
+    moved = session.exec(
+        text(f"DELETE FROM messages_default WHERE {in_month}")
+    ).rowcount
+    session.exec(
+        text(
+            f"CREATE TABLE {name} PARTITION OF messages "
+            f"FOR VALUES FROM ({lower}) TO ({upper})"
+        )
+    )
+    if moved:
+        session.exec(
+            text(
+                f"INSERT INTO messages ({columns}) "
+                f"SELECT {columns} FROM partition_stash"
+            )
+        )
+    session.commit()
+    return moved
+
+
+def create_partitions(session: Session, months_ahead: int) -> list[str]:
+    """
+    Create the missing partitions from this month to `months_ahead` later.
+    A month that fails is logged and skipped; the others are still created.
+    """
+    existing = set(list_partitions(session))
+    this_month = month_start(datetime.now(UTC).date())
+    created = []
+    for offset in range(months_ahead + 1):
+        start = month_start(this_month, offset)
+        name = partition_name(start)
+        if name in existing:
+            continue
+        try:
+            moved = create_partition(session, start)
+        except Exception as e:
+            session.rollback()
+            logger.error(
+                f"Creating partition {name} failed "
+                f"({count_default_rows(session, start)} rows of that month "
+                f"in messages_default): {e}"
+            )
+            continue
+        if moved:
+            logger.warning(f"Moved {moved} rows from messages_default into {name}")
+        created.append(name)
+    return created
+
+
+def drop_empty_partitions(session: Session, before: date) -> list[str]:
+    """Drop the monthly partitions that end before `before` and hold no rows."""
+    dropped = []
+    for name in list_partitions(session):
+        if not name.startswith(PARTITION_PREFIX):
+            continue
+        month = datetime.strptime(name[len(PARTITION_PREFIX) :], "%Y%m").date()
+        if month_start(month, 1) > before:
+            continue
+        if session.exec(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar():
+            continue
+        session.exec(text(f"DROP TABLE {name}"))
+        session.commit()
+        dropped.append(name)
+    return dropped
+
+
+def archive_cold_chats(
+    session: Session, days: int, batch_size: int, dry_run: bool = False
+) -> int:
+    """
+    Archive the chats without activity for `days` days that still have live
+    messages. Each chat is moved in its own transaction. Returns the number
+    of chats archived (or that would be, with `dry_run`).
+    """
+    cutoff = datetime.now(UTC) - timedelta(days=days)
+    candidates = select(Chat.id, Chat.last_message_at).where(
+        Chat.last_message_at < cutoff,
+        Chat.message_count > 0,
+        # Never archived, or written to since
+        or_(Chat.archived_at.is_(None), Chat.archived_at < Chat.last_message_at),
+    )
+
+    archived, moved, last = 0, 0, None
+    while True:
+        statement = candidates
+        if last is not None:
+            statement = statement.where(
+                tuple_(Chat.last_message_at, Chat.id) > tuple_(*last)
+            )
+        batch = session.exec(
+            statement.order_by(Chat.last_message_at, Chat.id).limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        for chat_id, last_message_at in batch:
+            last = (last_message_at, chat_id)
+            if dry_run:
+                archived += 1
+                continue
+            try:
+                count = archive_chat(session, chat_id)
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Archiving chat {chat_id} failed: {e}")
+                continue
+            if count:
+                archived += 1
+                moved += count
+
+    logger.info(
+        f"{'Would archive' if dry_run else 'Archived'} {archived} chats "
+        f"inactive since {cutoff:%Y-%m-%d} ({moved} messages moved)"
+    )
+    return archived
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "command", nargs="?", choices=["all", "partitions", "archive"], default="all"
+    )
+    parser.add_argument("--days", type=int, default=settings.ARCHIVE_AFTER_DAYS)
+    parser.add_argument(
+        "--months-ahead", type=int, default=settings.MESSAGES_PARTITION_MONTHS_AHEAD
+    )
+    parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true")
+    return parser.parse_args()
+
+
+def main() -> None:
+    setup_logging()
+    args = parse_args()
+    with Session(engine) as session:
+        if args.command in ("all", "archive"):
+            archive_cold_chats(session, args.days, args.batch_size, args.dry_run)
+
+        if args.command in ("all", "partitions") and not args.dry_run:
+            created = create_partitions(session, args.months_ahead)
+            cutoff = (datetime.now(UTC) - timedelta(days=args.days)).date()
+            dropped = drop_empty_partitions(session, before=cutoff)
+            logger.info(
+                f"Message partitions: created {created or 'none'}, "
+                f"dropped {dropped or 'none'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
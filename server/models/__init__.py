@@ -1,5 +1,6 @@
 from sqlmodel import SQLModel
 from .chat import Chat
-from .message import Message, MessageRole
+from .chat_archive import ChatArchive
+from .message import Message, MessageRole, SEARCH_CONFIG
 from .user import User
 from .token import UserToken
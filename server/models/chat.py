@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime, UTC
 from typing import List, TYPE_CHECKING
 
-from sqlalchemy import Column, DateTime
+from sqlalchemy import Column, DateTime, Index, Text
 from sqlmodel import Field, Relationship, SQLModel
 
 if TYPE_CHECKING:
@@ -11,14 +11,42 @@ if TYPE_CHECKING:
 
 class Chat(SQLModel, table=True):
     __tablename__ = "chats"
+    # Chat lists: one range scan per page, most recently active first
+    __table_args__ = (
+        Index("ix_chats_user_id_last_message_at", "user_id", "last_message_at", "id"),
+    )
 
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     title: str | None = Field(default=None, nullable=True)
-    user_id: uuid.UUID = Field(index=True, nullable=False)
+    user_id: uuid.UUID = Field(nullable=False)
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(UTC),
         sa_column=Column(DateTime(timezone=True), nullable=False),
     )
 
+    # Activity, maintained on message insert (see repositories.message_repo)
+    message_count: int = Field(default=0, nullable=False)
+    last_message_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+    total_prompt_tokens: int = Field(default=0, nullable=False)
+    total_completion_tokens: int = Field(default=0, nullable=False)
+    # Bumped on any visible change to the chat (ETags of GET /chat/{id})
+    revision: int = Field(default=0, nullable=False)
+
+    # Rolling summary of the messages up to summary_until (history budgeting)
+    summary: str | None = Field(default=None, sa_column=Column(Text, nullable=True))
+    summary_until: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True),
+    )
+
+    # Set once older messages were moved to chat_archives (cold chats)
+    archived_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True),
+    )
+
     # Relationships
     messages: List["Message"] = Relationship(back_populates="chat", cascade_delete=True)
@@ -0,0 +1,24 @@
+import uuid
+from datetime import datetime, UTC
+
+from sqlalchemy import Column, DateTime, ForeignKey, LargeBinary, Uuid
+from sqlmodel import Field, SQLModel
+
+
+class ChatArchive(SQLModel, table=True):
+    """Messages of a cold chat, moved out of `messages` (see maintenance.py)."""
+
+    __tablename__ = "chat_archives"
+
+    chat_id: uuid.UUID = Field(
+        sa_column=Column(
+            Uuid, ForeignKey("chats.id", ondelete="CASCADE"), primary_key=True
+        ),
+    )
+    archived_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+    message_count: int = Field(default=0, nullable=False)
+    # zlib-compressed JSON array of the messages, oldest first
+    payload: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
@@ -3,7 +3,8 @@ from datetime import datetime, UTC
 from enum import Enum
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Column, DateTime
+from sqlalchemy import Column, Computed, DateTime, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -11,6 +12,10 @@ if TYPE_CHECKING:
     from .chat import Chat
 
 
+# Text search configuration of messages.search_vector (and of its queries)
+SEARCH_CONFIG = "english"
+
+
 class MessageRole(str, Enum):
     USER = "user"
     ASSISTANT = "assistant"
@@ -19,20 +24,37 @@ class MessageRole(str, Enum):
 
 class Message(SQLModel, table=True):
     __tablename__ = "messages"
+    # Keyset pagination and recent-history windows within a chat
+    __table_args__ = (
+        Index("ix_messages_chat_id_created_at", "chat_id", "created_at", "id"),
+        # Full-text search, generated by Postgres so every write path keeps
+        # it current; not mapped on the model (never loaded with messages)
+        Column(
+            "search_vector",
+            TSVECTOR,
+            Computed(f"to_tsvector('{SEARCH_CONFIG}', content)", persisted=True),
+        ),
+        Index("ix_messages_search_vector", "search_vector", postgresql_using="gin"),
+        # Monthly range partitions (see maintenance.py), so the key is in the PK
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
 
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    chat_id: uuid.UUID = Field(foreign_key="chats.id", index=True, nullable=False)
+    chat_id: uuid.UUID = Field(foreign_key="chats.id", nullable=False)
     role: MessageRole = Field(nullable=False)
     content: str = Field(nullable=False)
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(UTC),
-        sa_column=Column(DateTime(timezone=True), nullable=False),
+        sa_column=Column(DateTime(timezone=True), primary_key=True, nullable=False),
     )
 
     # Metrics (assistant messages only)
     latency_ms: int | None = Field(default=None, nullable=True)
     prompt_tokens: int | None = Field(default=None, nullable=True)
     completion_tokens: int | None = Field(default=None, nullable=True)
+    # Generation stopped early (client disconnected mid-answer)
+    truncated: bool = Field(default=False, nullable=False)
 
     # Relationships
     chat: "Chat" = Relationship(back_populates="messages")
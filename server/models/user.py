@@ -10,4 +10,6 @@ class User(SQLModel, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     first_name: str = Field(index=True)
     last_name: str = Field(index=True)
-    email: str = Field(index=True, unique=True)
\ No newline at end of file
+    email: str = Field(index=True, unique=True)
+    # Bumped on any change to the user's chat list (ETags of GET /chats)
+    chats_revision: int = Field(default=0, nullable=False)
\ No newline at end of file
@@ -1,3 +1,18 @@
-from .base import ChatRepository, MessageRepository
-from .chat_repo import SQLChatRepository, get_chat_repo
-from .message_repo import SQLMessageRepository, get_message_repo
+from .base import (
+    AsyncChatRepository,
+    AsyncMessageRepository,
+    ChatRepository,
+    MessageRepository,
+)
+from .chat_repo import (
+    AsyncSQLChatRepository,
+    SQLChatRepository,
+    get_async_chat_repo,
+    get_chat_repo,
+)
+from .message_repo import (
+    AsyncSQLMessageRepository,
+    SQLMessageRepository,
+    get_async_message_repo,
+    get_message_repo,
+)
@@ -0,0 +1,93 @@
+"""
+Compressed storage of cold chats.
+
+`maintenance.py archive` moves the messages of chats inactive for
+ARCHIVE_AFTER_DAYS out of the partitioned `messages` table into one
+`chat_archives` row per chat (a zlib-compressed JSON array). The chat row
+stays, with `archived_at` set, and the repositories merge the archived
+messages back in on read. A new message in an archived chat is a normal
+live row; the next archival run folds it into the archive.
+"""
+
+import zlib
+from datetime import datetime, UTC
+from uuid import UUID
+
+import orjson
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+
+from models import Chat, ChatArchive, Message
+
+
+def pack_messages(messages: list[Message]) -> bytes:
+    return zlib.compress(orjson.dumps([m.model_dump() for m in messages]))
+
+
+def unpack_messages(payload: bytes) -> list[Message]:
+    return [Message.model_validate(m) for m in orjson.loads(zlib.decompress(payload))]
+
+
+def merge_archived(
+    archived: list[Message], live: list[Message], limit: int | None = None
+) -> list[Message]:
+    """
+    Archived messages followed by the live ones (oldest first), keeping the
+    latest `limit`. Archived messages always predate the live ones.
+    """
+    if limit is None:
+        return archived + live
+    missing = limit - len(live)
+    if missing <= 0:
+        return live[len(live) - limit :]
+    return archived[-missing:] + live
+
+
+def archived_page(
+    archived: list[Message], limit: int, before: tuple[datetime, UUID] | None
+) -> list[Message]:
+    """The latest `limit` archived messages strictly older than `before`."""
+    if before is not None:
+        archived = [m for m in archived if (m.created_at, m.id) < before]
+    return archived[-limit:] if limit else []
+
+
+def archive_chat(session: Session, chat_id: UUID) -> int:
+    """
+    Move the live messages of a chat into its archive, in one transaction.
+    Returns how many messages were moved.
+    """
+    messages = session.exec(
+        select(Message)
+        .where(Message.chat_id == chat_id)
+        .order_by(Message.created_at, Message.id)
+    ).all()
+    if not messages:
+        return 0
+
+    existing = session.get(ChatArchive, chat_id)
+    archived = unpack_messages(existing.payload) if existing else []
+    known = {m.id for m in archived}
+    archived += [m for m in messages if m.id not in known]
+
+    now = datetime.now(UTC)
+    values = {
+        "archived_at": now,
+        "message_count": len(archived),
+        "payload": pack_messages(archived),
+    }
+    session.exec(
+        insert(ChatArchive)
+        .values(chat_id=chat_id, **values)
+        .on_conflict_do_update(index_elements=["chat_id"], set_=values)
+    )
+    # Only the rows read above: a message posted meanwhile stays live
+    session.exec(
+        delete(Message).where(
+            Message.chat_id == chat_id, Message.id.in_([m.id for m in messages])
+        )
+    )
+    session.exec(update(Chat).where(Chat.id == chat_id).values(archived_at=now))
+    session.commit()
+    return len(messages)
@@ -1,19 +1,30 @@
+from datetime import datetime
 from typing import Protocol
 from uuid import UUID
 
 from schemas import ChatDetail, ChatOut
-from schemas import MessageOut
+from schemas import MessageOut, MessageSearchHit
 from models import MessageRole
 
 
 class ChatRepository(Protocol):
     def list_chats(
-        self, user_id: UUID, limit: int = 50, offset: int = 0
+        self,
+        user_id: UUID,
+        limit: int = 50,
+        before: tuple[datetime, UUID] | None = None,
     ) -> list[ChatOut]: ...
-    def get_chat(self, user_id: UUID, chat_id: UUID) -> ChatDetail | None: ...
+    def get_chat(
+        self, user_id: UUID, chat_id: UUID, messages_limit: int | None = None
+    ) -> ChatDetail | None: ...
+    def get_chat_revision(self, user_id: UUID, chat_id: UUID) -> int | None: ...
+    def get_chats_revision(self, user_id: UUID) -> int: ...
     def create_chat(self, user_id: UUID, title: str | None) -> ChatOut: ...
     def update_chat(self, chat_id: UUID, title: str) -> ChatOut: ...
     def delete_chat(self, chat_id: UUID) -> None: ...
+    def update_summary(
+        self, chat_id: UUID, summary: str, summary_until: datetime
+    ) -> None: ...
 
 
 class MessageRepository(Protocol):
@@ -25,9 +36,76 @@ class MessageRepository(Protocol):
         latency_ms: int | None = None,
         prompt_tokens: int | None = None,
         completion_tokens: int | None = None,
+        truncated: bool = False,
+        message_id: UUID | None = None,
     ) -> MessageOut: ...
+    def list_messages(
+        self,
+        chat_id: UUID,
+        limit: int = 50,
+        before: tuple[datetime, UUID] | None = None,
+    ) -> list[MessageOut]: ...
+    def search_messages(
+        self,
+        user_id: UUID,
+        query: str,
+        limit: int = 20,
+        after: tuple[float, datetime, UUID] | None = None,
+    ) -> list[MessageSearchHit]: ...
     def update_message_content(
         self,
         message_id: UUID,
         new_content: str,
     ) -> MessageOut: ...
+
+
+class AsyncChatRepository(Protocol):
+    async def list_chats(
+        self,
+        user_id: UUID,
+        limit: int = 50,
+        before: tuple[datetime, UUID] | None = None,
+    ) -> list[ChatOut]: ...
+    async def get_chat(
+        self, user_id: UUID, chat_id: UUID, messages_limit: int | None = None
+    ) -> ChatDetail | None: ...
+    async def get_chat_revision(self, user_id: UUID, chat_id: UUID) -> int | None: ...
+    async def get_chats_revision(self, user_id: UUID) -> int: ...
+    async def create_chat(self, user_id: UUID, title: str | None) -> ChatOut: ...
+    async def update_chat(self, chat_id: UUID, title: str) -> ChatOut: ...
+    async def delete_chat(self, chat_id: UUID) -> None: ...
+    async def update_summary(
+        self, chat_id: UUID, summary: str, summary_until: datetime
+    ) -> None: ...
+
+
+class AsyncMessageRepository(Protocol):
+    async def insert_message(
+        self,
+        chat_id: UUID,
+        content: str,
+        role: MessageRole = "user",
+        latency_ms: int | None = None,
+        prompt_tokens: int | None = None,
+        completion_tokens: int | None = None,
+        truncated: bool = False,
+        message_id: UUID | None = None,
+    ) -> MessageOut: ...
+    async def list_messages(
+        self,
+        chat_id: UUID,
+        limit: int = 50,
+        before: tuple[datetime, UUID] | None = None,
+    ) -> list[MessageOut]: ...
+    async def search_messages(
+        self,
+        user_id: UUID,
+        query: str,
+        limit: int = 20,
+        after: tuple[float, datetime, UUID] | None = None,
+    ) -> list[MessageSearchHit]: ...
+    async def update_message_content(
+        self,
+        message_id: UUID,
+        new_content: str,
+    ) -> MessageOut: ...
@@ -0,0 +1,352 @@
+"""
+Bulk export and import of chats as NDJSON.
+
+An export is a stream of lines, each chat followed by its messages:
+
+    {"type": "chat", "id": ..., "title": ..., "userId": ..., "createdAt": ...}
+    {"type": "message", "id": ..., "chatId": ..., "role": ..., "content": ...}
+
+Exports read chats, messages and archives through one server-side cursor
+each (BULK_EXPORT_FETCH_SIZE rows at a time), all ordered by chat id and
+merge-joined, in one REPEATABLE READ transaction, so memory stays flat, the
+query count does not grow with the chat count, and the export is a
+consistent snapshot. Archived messages are included.
+
+Imports COPY batches of BULK_IMPORT_BATCH_SIZE rows into temporary staging
+tables, then insert them with ON CONFLICT DO NOTHING and update the chat
+counters from the rows actually inserted, one transaction per batch.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta, UTC
+from typing import AsyncIterator
+from uuid import UUID, uuid4
+
+import orjson
+from pydantic import ValidationError
+from sqlmodel import select
+
+from core.db import async_engine
+from core.ndjson import ndjson_line
+from core.settings import settings
+from models import Chat, ChatArchive, Message, MessageRole
+from repositories.archive import unpack_messages
+from schemas import ChatOut, MessageOut
+
+logger = logging.getLogger(__name__)
+
+# User imports: roles a user may import, and tolerated clock skew on dates
+USER_IMPORT_ROLES = (MessageRole.USER, MessageRole.ASSISTANT)
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+# Archive rows hold a whole chat's messages, so fewer are fetched at a time
+ARCHIVE_FETCH_SIZE = 50
+
+_STAGING_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS import_chats (
+    id uuid, user_id uuid, title text, created_at timestamptz
+) ON COMMIT DELETE ROWS;
+CREATE TEMP TABLE IF NOT EXISTS import_messages (
+    id uuid, chat_id uuid, role text, content text, created_at timestamptz,
+    latency_ms integer, prompt_tokens integer, completion_tokens integer,
+    truncated boolean
+) ON COMMIT DELETE ROWS;
+"""
+
+_INSERT_CHATS = """
+INSERT INTO chats (
+    id, user_id, title, created_at, last_message_at, message_count,
+    total_prompt_tokens, total_completion_tokens, revision
+)
+SELECT id, user_id, title, created_at, created_at, 0, 0, 0, 0 FROM import_chats
+ON CONFLICT (id) DO NOTHING
+"""
+
+# Counters only include the rows actually inserted, as in the write-behind
+_INSERT_MESSAGES = """
+WITH inserted AS (
+    INSERT INTO messages (
+        id, chat_id, role, content, created_at, latency_ms, prompt_tokens,
+        completion_tokens, truncated
+    )
+    SELECT id, chat_id, role::messagerole, content, created_at, latency_ms,
+        prompt_tokens, completion_tokens, truncated
+    FROM import_messages
+    ON CONFLICT DO NOTHING
+    RETURNING chat_id, created_at, prompt_tokens, completion_tokens
+), activity AS (
+    SELECT chat_id, count(*) AS n, max(created_at) AS last_at,
+        coalesce(sum(prompt_tokens), 0) AS prompt_tokens,
+        coalesce(sum(completion_tokens), 0) AS completion_tokens
+    FROM inserted GROUP BY chat_id
+), updated AS (
+    UPDATE chats SET
+        message_count = chats.message_count + activity.n,
+        last_message_at = greatest(chats.last_message_at, activity.last_at),
+        total_prompt_tokens = chats.total_prompt_tokens + activity.prompt_tokens,
+        total_completion_tokens =
+            chats.total_completion_tokens + activity.completion_tokens,
+        revision = chats.revision + 1
+    FROM activity WHERE chats.id = activity.chat_id
+)
+SELECT coalesce(sum(n), 0) FROM activity
+"""
+
+_BUMP_USER_REVISIONS = """
+UPDATE users SET chats_revision = chats_revision + 1
+WHERE id IN (
+    SELECT user_id FROM import_chats
+    UNION
+    SELECT chats.user_id FROM chats
+    WHERE chats.id IN (SELECT DISTINCT chat_id FROM import_messages)
+)
+"""
+
+
+class ChatImportError(ValueError):
+    """A line that cannot be imported; earlier batches stay committed."""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"Line {line}: {message}")
+        self.line = line
+        # (chats, messages) committed before the failure
+        self.imported = (0, 0)
+
+
+def _chat_line(chat: ChatOut) -> bytes:
+    return ndjson_line({"type": "chat", **chat.model_dump(mode="json")})
+
+
+def _message_line(message: MessageOut) -> bytes:
+    return ndjson_line({"type": "message", **message.model_dump(mode="json")})
+
+
+class _ChatRows:
+    """
+    Rows of a result ordered by chat id, taken one chat at a time.
+
+    `take` must be called with ascending chat ids; rows of chat ids never
+    taken are dropped. Python orders UUIDs bytewise, as Postgres does.
+    """
+
+    def __init__(self, result):
+        self._rows = aiter(result)
+        self._next = None
+        self._done = False
+
+    async def take(self, chat_id: UUID) -> AsyncIterator:
+        while True:
+            if self._next is None:
+                if self._done:
+                    return
+                try:
+                    self._next = await anext(self._rows)
+                except StopAsyncIteration:
+                    self._done = True
+                    return
+            if self._next.chat_id > chat_id:
+                return
+            row, self._next = self._next, None
+            if row.chat_id == chat_id:
+                yield row
+
+
+async def export_chats(user_id: UUID | None = None) -> AsyncIterator[bytes]:
+    """NDJSON lines of every chat (of `user_id` if given) and its messages."""
+    fetch_size = settings.BULK_EXPORT_FETCH_SIZE
+    chats_statement = select(Chat).order_by(Chat.id)
+    messages_statement = select(Message).order_by(
+        Message.chat_id, Message.created_at, Message.id
+    )
+    archives_statement = select(ChatArchive.chat_id, ChatArchive.payload).order_by(
+        ChatArchive.chat_id
+    )
+    if user_id is not None:
+        user_chats = select(Chat.id).where(Chat.user_id == user_id)
+        chats_statement = chats_statement.where(Chat.user_id == user_id)
+        messages_statement = messages_statement.where(Message.chat_id.in_(user_chats))
+        archives_statement = archives_statement.where(
+            ChatArchive.chat_id.in_(user_chats)
+        )
+
+    # One cursor per table, merge-joined on the chat id they are all ordered by
+    async with async_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="REPEATABLE READ")
+        chats = await conn.stream(
+            chats_statement.execution_options(yield_per=fetch_size)
+        )
+        messages = _ChatRows(
+            await conn.stream(
+                messages_statement.execution_options(yield_per=fetch_size)
+            )
+        )
+        archives = _ChatRows(
+            await conn.stream(
+                archives_statement.execution_options(
+                    yield_per=min(fetch_size, ARCHIVE_FETCH_SIZE)
+                )
+            )
+        )
+        async for chat in chats:
+            yield _chat_line(ChatOut.model_validate(chat))
+
+            async for archive in archives.take(chat.id):
+                for message in unpack_messages(archive.payload):
+                    yield _message_line(MessageOut.model_validate(message))
+
+            async for message in messages.take(chat.id):
+                yield _message_line(MessageOut.model_validate(message))
+
+
+class ChatImporter:
+    """
+    Imports NDJSON export lines in batches.
+
+    With `user_id`, chats are imported for that user under new ids (a user
+    import never touches existing rows); future dates and roles other than
+    user/assistant are rejected. Without it (admin restore), ids, owners,
+    dates and roles are kept as is and rows that already exist are skipped,
+    so a failed restore can be re-run.
+    """
+
+    def __init__(self, conn, user_id: UUID | None = None):
+        self.conn = conn
+        self.user_id = user_id
+        self.batch_size = settings.BULK_IMPORT_BATCH_SIZE
+        self.chats = 0
+        self.messages = 0
+        self._chat_ids: dict[UUID, UUID] = {}
+        self._chat_rows: list[tuple] = []
+        self._message_rows: list[tuple] = []
+
+    async def add(self, line_number: int, line: bytes) -> None:
+        try:
+            document = orjson.loads(line)
+            kind = document.get("type")
+            if kind == "chat":
+                self._add_chat(ChatOut.model_validate(document), line_number)
+            elif kind == "message":
+                self._add_message(MessageOut.model_validate(document), line_number)
+            else:
+                raise ChatImportError(line_number, f"Unknown line type: {kind!r}")
+        except (orjson.JSONDecodeError, AttributeError) as e:
+            raise ChatImportError(line_number, f"Invalid JSON object: {e}") from e
+        except ValidationError as e:
+            raise ChatImportError(line_number, str(e)) from e
+
+        if len(self._chat_rows) + len(self._message_rows) >= self.batch_size:
+            await self.flush()
+
+    def _check_date(self, created_at: datetime, line_number: int) -> None:
+        # A future date would land in messages_default and pin the chat on top
+        if self.user_id is None:
+            return
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=UTC)
+        if created_at > datetime.now(UTC) + MAX_CLOCK_SKEW:
+            raise ChatImportError(line_number, f"Date in the future: {created_at}")
+
+    def _add_chat(self, chat: ChatOut, line_number: int) -> None:
+        self._check_date(chat.created_at, line_number)
+        if self.user_id is None:
+            chat_id, user_id = chat.id, chat.user_id
+        else:
+            chat_id, user_id = uuid4(), self.user_id
+        self._chat_ids[chat.id] = chat_id
+        self._chat_rows.append((chat_id, user_id, chat.title, chat.created_at))
+
+    def _add_message(self, message: MessageOut, line_number: int) -> None:
+        self._check_date(message.created_at, line_number)
+        if self.user_id is not None and message.role not in USER_IMPORT_ROLES:
+            raise ChatImportError(
+                line_number, f"Role not allowed: {message.role.value}"
+            )
+        chat_id = self._chat_ids.get(message.chat_id)
+        if chat_id is None:
+            if self.user_id is not None:
+                raise ChatImportError(line_number, "Message before its chat")
+            # Admin restore into a chat imported earlier
+            chat_id = message.chat_id
+        self._message_rows.append(
+            (
+                message.id if self.user_id is None else uuid4(),
+                chat_id,
+                MessageRole(message.role).name,
+                message.content,
+                message.created_at,
+                message.latency_ms,
+                message.prompt_tokens,
+                message.completion_tokens,
+                message.truncated,
+            )
+        )
+
+    async def flush(self) -> None:
+        if not self._chat_rows and not self._message_rows:
+            return
+        async with self.conn.transaction():
+            async with self.conn.cursor() as cur:
+                await cur.execute(_STAGING_DDL)
+                await self._copy(cur, "import_chats", self._chat_rows)
+                await self._copy(cur, "import_messages", self._message_rows)
+
+                await cur.execute(_INSERT_CHATS)
+                chats = cur.rowcount
+                await cur.execute(_INSERT_MESSAGES)
+                messages = (await cur.fetchone())[0]
+                await cur.execute(_BUMP_USER_REVISIONS)
+
+        self.chats += chats
+        self.messages += messages
+        self._chat_rows.clear()
+        self._message_rows.clear()
+
+    @staticmethod
+    async def _copy(cur, table: str, rows: list[tuple]) -> None:
+        if not rows:
+            return
+        async with cur.copy(f"COPY {table} FROM STDIN") as copy:
+            for row in rows:
+                await copy.write_row(row)
+
+
+async def import_chats(
+    lines: AsyncIterator[bytes], user_id: UUID | None = None
+) -> tuple[int, int]:
+    """
+    Import NDJSON export lines; returns the (chats, messages) inserted.
+
+    Raises:
+        ChatImportError: Invalid line, unreadable input stream, or rows
+            rejected by the database (e.g. a message of an unknown chat).
+            Earlier batches stay imported, see `imported`.
+    """
+    start = time.perf_counter()
+    async with async_engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        importer = ChatImporter(raw.driver_connection, user_id=user_id)
+        line_number = 0
+        try:
+            async for line in lines:
+                line_number += 1
+                await importer.add(line_number, line)
+            await importer.flush()
+        except ChatImportError as e:
+            e.imported = (importer.chats, importer.messages)
+            raise
+        except ValueError as e:
+            error = ChatImportError(line_number + 1, str(e))
+            error.imported = (importer.chats, importer.messages)
+            raise error from e
+        except Exception as e:
+            logger.error(f"Import failed near line {line_number}: {e}")
+            error = ChatImportError(line_number, "Rows rejected by the database")
+            error.imported = (importer.chats, importer.messages)
+            raise error from e
+        finally:
+            logger.info(
+                f"Imported {importer.chats} chats and {importer.messages} messages "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+    return importer.chats, importer.messages
@@ -1,13 +1,39 @@
+from datetime import datetime
 from typing import List
 from uuid import UUID
 
 from fastapi import Depends
-from sqlmodel import Session, select
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import Session, delete, select
 
-from models import Chat
-from schemas import ChatDetail, ChatOut
-from core.db import get_session
-from repositories.base import ChatRepository
+from models import Chat, ChatArchive, Message, User
+from repositories.archive import merge_archived, unpack_messages
+from repositories.message_repo import recent_messages_statement
+from repositories.revisions import bump_user_revision
+from repositories.write_behind import flush_pending
+from schemas import ChatDetail, ChatOut, MessageOut
+from core.db import async_session_factory, get_session
+from repositories.base import AsyncChatRepository, ChatRepository
+
+
+def recent_chats_statement(
+    user_id: UUID, limit: int, before: tuple[datetime, UUID] | None = None
+):
+    """A user's chats, most recently active first, strictly after `before`."""
+    statement = select(Chat).where(Chat.user_id == user_id)
+    if before is not None:
+        statement = statement.where(
+            tuple_(Chat.last_message_at, Chat.id) < tuple_(*before)
+        )
+    return statement.order_by(Chat.last_message_at.desc(), Chat.id.desc()).limit(limit)
+
+
+def _needs_archive(chat: Chat, live: list, messages_limit: int | None) -> bool:
+    """Whether archived messages are part of the requested window."""
+    if chat.archived_at is None:
+        return False
+    return messages_limit is None or len(live) < messages_limit
 
 
 class SQLChatRepository(ChatRepository):
@@ -15,28 +41,66 @@ class SQLChatRepository(ChatRepository):
         self.session = session
 
     def list_chats(
-        self, user_id: UUID, limit: int = 50, offset: int = 0
+        self,
+        user_id: UUID,
+        limit: int = 50,
+        before: tuple[datetime, UUID] | None = None,
     ) -> List[ChatOut]:
-        statement = (
-            select(Chat)
-            .where(Chat.user_id == user_id)
-            .order_by(Chat.created_at.desc())
-            .offset(offset)
-            .limit(limit)
-        )
-        chats = self.session.exec(statement).all()
+        chats = self.session.exec(recent_chats_statement(user_id, limit, before)).all()
         return [ChatOut.model_validate(c) for c in chats]
 
-    def get_chat(self, user_id: UUID, chat_id: UUID) -> ChatDetail | None:
+    def get_chat(
+        self, user_id: UUID, chat_id: UUID, messages_limit: int | None = None
+    ) -> ChatDetail | None:
+        """
+        Args:
+            messages_limit: Only load the latest messages (all if None).
+        """
         statement = select(Chat).where(Chat.id == chat_id, Chat.user_id == user_id)
         chat = self.session.exec(statement).first()
         if not chat:
             return None
-        return ChatDetail.model_validate(chat)
+        if messages_limit is None:
+            messages = self.session.exec(
+                select(Message)
+                .where(Message.chat_id == chat_id)
+                .order_by(Message.created_at, Message.id)
+            ).all()
+        else:
+            messages = self.session.exec(
+                recent_messages_statement(chat_id, messages_limit)
+            ).all()[::-1]
+        if _needs_archive(chat, messages, messages_limit):
+            archive = self.session.get(ChatArchive, chat_id)
+            if archive is not None:
+                messages = merge_archived(
+                    unpack_messages(archive.payload), list(messages), messages_limit
+                )
+        return ChatDetail(
+            **chat.model_dump(),
+            messages=[MessageOut.model_validate(m) for m in messages],
+        )
+
+    def get_chat_revision(self, user_id: UUID, chat_id: UUID) -> int | None:
+        """Version stamp of a chat, None if the user has no such chat."""
+        return self.session.exec(
+            select(Chat.revision).where(Chat.id == chat_id, Chat.user_id == user_id)
+        ).first()
+
+    def get_chats_revision(self, user_id: UUID) -> int:
+        """Version stamp of the user's chat list."""
+        return (
+            self.session.exec(
+                select(User.chats_revision).where(User.id == user_id)
+            ).first()
+            or 0
+        )
 
     def create_chat(self, user_id: UUID, title: str | None = None) -> ChatOut:
         chat = Chat(user_id=user_id, title=title or "New Chat")
+        chat.last_message_at = chat.created_at
         self.session.add(chat)
+        self.session.exec(bump_user_revision(user_id))
         self.session.commit()
         self.session.refresh(chat)
         return ChatOut.model_validate(chat)
@@ -46,7 +110,9 @@ class SQLChatRepository(ChatRepository):
         if not chat:
             raise ValueError("Chat not found")
         chat.title = title
+        chat.revision += 1
         self.session.add(chat)
+        self.session.exec(bump_user_revision(chat.user_id))
         self.session.commit()
         self.session.refresh(chat)
         return ChatOut.model_validate(chat)
@@ -55,9 +121,151 @@ class SQLChatRepository(ChatRepository):
         chat = self.session.get(Chat, chat_id)
         if not chat:
             raise ValueError("Chat not found")
+        self.session.exec(bump_user_revision(chat.user_id))
         self.session.delete(chat)
         self.session.commit()
 
+    def update_summary(
+        self, chat_id: UUID, summary: str, summary_until: datetime
+    ) -> None:
+        chat = self.session.get(Chat, chat_id)
+        if not chat:
+            raise ValueError("Chat not found")
+        chat.summary = summary
+        chat.summary_until = summary_until
+        self.session.add(chat)
+        self.session.commit()
+
 
 def get_chat_repo(session: Session = Depends(get_session)) -> ChatRepository:
     return SQLChatRepository(session)
+
+
+class AsyncSQLChatRepository(AsyncChatRepository):
+    """
+    Async counterpart of SQLChatRepository for the streaming routes.
+
+    Each call runs in its own short session: a reply keeps writing after the
+    request returned, possibly from several tasks, and must not hold a pooled
+    connection for the whole stream.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker) -> None:
+        self.session_factory = session_factory
+
+    async def list_chats(
+        self,
+        user_id: UUID,
+        limit: int = 50,
+        before: tuple[datetime, UUID] | None = None,
+    ) -> List[ChatOut]:
+        statement = recent_chats_statement(user_id, limit, before)
+        async with self.session_factory() as session:
+            chats = (await session.exec(statement)).all()
+        return [ChatOut.model_validate(c) for c in chats]
+
+    async def get_chat(
+        self, user_id: UUID, chat_id: UUID, messages_limit: int | None = None
+    ) -> ChatDetail | None:
+        """
+        Args:
+            messages_limit: Only load the latest messages (all if None).
+        """
+        await flush_pending(chat_id)
+        async with self.session_factory() as session:
+            statement = select(Chat).where(Chat.id == chat_id, Chat.user_id == user_id)
+            chat = (await session.exec(statement)).first()
+            if not chat:
+                return None
+            # Explicit query: relationships cannot lazy-load on an async session
+            if messages_limit is None:
+                messages = (
+                    await session.exec(
+                        select(Message)
+                        .where(Message.chat_id == chat_id)
+                        .order_by(Message.created_at, Message.id)
+                    )
+                ).all()
+            else:
+                messages = (
+                    await session.exec(
+                        recent_messages_statement(chat_id, messages_limit)
+                    )
+                ).all()[::-1]
+            if _needs_archive(chat, messages, messages_limit):
+                archive = await session.get(ChatArchive, chat_id)
+                if archive is not None:
+                    messages = merge_archived(
+                        unpack_messages(archive.payload), list(messages), messages_limit
+                    )
+        return ChatDetail(
+            **chat.model_dump(),
+            messages=[MessageOut.model_validate(m) for m in messages],
+        )
+
+    async def get_chat_revision(self, user_id: UUID, chat_id: UUID) -> int | None:
+        """Version stamp of a chat, None if the user has no such chat."""
+        await flush_pending(chat_id)
+        statement = select(Chat.revision).where(
+            Chat.id == chat_id, Chat.user_id == user_id
+        )
+        async with self.session_factory() as session:
+            return (await session.exec(statement)).first()
+
+    async def get_chats_revision(self, user_id: UUID) -> int:
+        """Version stamp of the user's chat list."""
+        statement = select(User.chats_revision).where(User.id == user_id)
+        async with self.session_factory() as session:
+            return (await session.exec(statement)).first() or 0
+
+    async def create_chat(self, user_id: UUID, title: str | None = None) -> ChatOut:
+        chat = Chat(user_id=user_id, title=title or "New Chat")
+        chat.last_message_at = chat.created_at
+        async with self.session_factory() as session:
+            session.add(chat)
+            await session.exec(bump_user_revision(user_id))
+            await session.commit()
+            await session.refresh(chat)
+        return ChatOut.model_validate(chat)
+
+    async def update_chat(self, chat_id: UUID, title: str) -> ChatOut:
+        async with self.session_factory() as session:
+            chat = await session.get(Chat, chat_id)
+            if not chat:
+                raise ValueError("Chat not found")
+            chat.title = title
+            chat.revision += 1
+            session.add(chat)
+            await session.exec(bump_user_revision(chat.user_id))
+            await session.commit()
+            await session.refresh(chat)
+        return ChatOut.model_validate(chat)
+
+    async def delete_chat(self, chat_id: UUID) -> None:
+        # Queued rows of the chat would otherwise fail once it is gone
+        await flush_pending(chat_id)
+        async with self.session_factory() as session:
+            chat = await session.get(Chat, chat_id)
+            if not chat:
+                raise ValueError("Chat not found")
+            # The ORM cascade would lazy-load the messages, delete them in SQL
+            await session.exec(delete(Message).where(Message.chat_id == chat_id))
+            await session.exec(bump_user_revision(chat.user_id))
+            await session.delete(chat)
+            await session.commit()
+
+    async def update_summary(
+        self, chat_id: UUID, summary: str, summary_until: datetime
+    ) -> None:
+        async with self.session_factory() as session:
+            chat = await session.get(Chat, chat_id)
+            if not chat:
+                raise ValueError("Chat not found")
+            chat.summary = summary
+            chat.summary_until = summary_until
+            session.add(chat)
+            await session.commit()
+
+
+def get_async_chat_repo() -> AsyncChatRepository:
+    return AsyncSQLChatRepository(async_session_factory)
@@ -1,12 +1,100 @@
+from datetime import datetime
 from uuid import UUID
 
 from fastapi import Depends
-from sqlmodel import Session
+from sqlalchemy import func, tuple_, update
+from sqlalchemy.dialects.postgresql import ts_headline, websearch_to_tsquery
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import Session, select
 
-from models import Message, MessageRole
-from schemas import MessageOut
-from repositories import MessageRepository
-from core.db import get_session
+from models import Chat, ChatArchive, Message, MessageRole, SEARCH_CONFIG
+from schemas import MessageOut, MessageSearchHit
+from repositories.archive import archived_page, unpack_messages
+from repositories.base import AsyncMessageRepository, MessageRepository
+from repositories.revisions import bump_chat_revision, bump_user_revision_for_chats
+from repositories.write_behind import flush_pending, get_write_queue
+from core.db import async_session_factory, get_session
+
+
+def recent_messages_statement(
+    chat_id: UUID, limit: int, before: tuple[datetime, UUID] | None = None
+):
+    """Newest-first messages of a chat, strictly older than the `before` key."""
+    statement = select(Message).where(Message.chat_id == chat_id)
+    if before is not None:
+        statement = statement.where(
+            tuple_(Message.created_at, Message.id) < tuple_(*before)
+        )
+    return statement.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit)
+
+
+# Matches are wrapped in ** (markdown bold), never in HTML
+SEARCH_HEADLINE_OPTIONS = (
+    "StartSel=**, StopSel=**, MaxFragments=2, MaxWords=20, MinWords=5"
+)
+
+
+def search_messages_statement(
+    user_id: UUID,
+    query: str,
+    limit: int,
+    after: tuple[float, datetime, UUID] | None = None,
+):
+    """
+    The user's messages matching `query` (web search syntax), best first,
+    strictly after the `after` key. Snippets are only built for the page.
+    """
+    search_vector = Message.__table__.c.search_vector
+    tsquery = websearch_to_tsquery(SEARCH_CONFIG, query)
+    rank = func.ts_rank_cd(search_vector, tsquery)
+
+    page = (
+        select(
+            Message.id.label("message_id"),
+            Message.chat_id,
+            Chat.title.label("chat_title"),
+            Message.role,
+            Message.created_at,
+            Message.content,
+            rank.label("rank"),
+        )
+        .join(Chat, Chat.id == Message.chat_id)
+        .where(Chat.user_id == user_id, search_vector.bool_op("@@")(tsquery))
+    )
+    if after is not None:
+        page = page.where(tuple_(rank, Message.created_at, Message.id) < tuple_(*after))
+    page = (
+        page.order_by(rank.desc(), Message.created_at.desc(), Message.id.desc())
+        .limit(limit)
+        .subquery()
+    )
+    return select(
+        page.c.message_id,
+        page.c.chat_id,
+        page.c.chat_title,
+        page.c.role,
+        page.c.created_at,
+        page.c.rank,
+        ts_headline(
+            SEARCH_CONFIG, page.c.content, tsquery, SEARCH_HEADLINE_OPTIONS
+        ).label("snippet"),
+    ).order_by(page.c.rank.desc(), page.c.created_at.desc(), page.c.message_id.desc())
+
+
+def chat_activity_statement(message: Message):
+    """Keep the chat's denormalized activity columns in step with an insert."""
+    return (
+        update(Chat)
+        .where(Chat.id == message.chat_id)
+        .values(
+            message_count=Chat.message_count + 1,
+            revision=Chat.revision + 1,
+            last_message_at=func.greatest(Chat.last_message_at, message.created_at),
+            total_prompt_tokens=Chat.total_prompt_tokens + (message.prompt_tokens or 0),
+            total_completion_tokens=Chat.total_completion_tokens
+            + (message.completion_tokens or 0),
+        )
+    )
 
 
 class SQLMessageRepository(MessageRepository):
@@ -21,6 +109,8 @@ class SQLMessageRepository(MessageRepository):
         latency_ms: int | None = None,
         prompt_tokens: int | None = None,
         completion_tokens: int | None = None,
+        truncated: bool = False,
+        message_id: UUID | None = None,
     ) -> MessageOut:
         message = Message(
             chat_id=chat_id,
@@ -29,21 +119,64 @@ class SQLMessageRepository(MessageRepository):
             latency_ms=latency_ms,
             prompt_tokens=prompt_tokens,
             completion_tokens=completion_tokens,
+            truncated=truncated,
         )
+        if message_id is not None:
+            message.id = message_id
         self.session.add(message)
+        self.session.exec(chat_activity_statement(message))
+        self.session.exec(bump_user_revision_for_chats([chat_id]))
         self.session.commit()
         self.session.refresh(message)
         return MessageOut.model_validate(message)
 
+    def list_messages(
+        self,
+        chat_id: UUID,
+        limit: int = 50,
+        before: tuple[datetime, UUID] | None = None,
+    ) -> list[MessageOut]:
+        messages = self.session.exec(
+            recent_messages_statement(chat_id, limit, before)
+        ).all()[::-1]
+        if len(messages) < limit:
+            # The live rows ran out, continue into the archive if any
+            archive = self.session.get(ChatArchive, chat_id)
+            if archive is not None:
+                oldest = (
+                    (messages[0].created_at, messages[0].id) if messages else before
+                )
+                older = archived_page(
+                    unpack_messages(archive.payload), limit - len(messages), oldest
+                )
+                messages = older + list(messages)
+        return [MessageOut.model_validate(m) for m in messages]
+
+    def search_messages(
+        self,
+        user_id: UUID,
+        query: str,
+        limit: int = 20,
+        after: tuple[float, datetime, UUID] | None = None,
+    ) -> list[MessageSearchHit]:
+        rows = self.session.exec(
+            search_messages_statement(user_id, query, limit, after)
+        ).all()
+        return [MessageSearchHit.model_validate(r) for r in rows]
+
     def update_message_content(
         self,
         message_id: UUID,
         new_content: str,
     ) -> MessageOut:
-        message = self.session.get(Message, message_id)
+        # The primary key also holds the partition key, look up by id
+        message = self.session.exec(
+            select(Message).where(Message.id == message_id)
+        ).first()
         if not message:
             raise ValueError("Message not found")
         message.content = new_content
+        self.session.exec(bump_chat_revision(message.chat_id))
         self.session.commit()
         self.session.refresh(message)
         return MessageOut.model_validate(message)
@@ -51,3 +184,107 @@ class SQLMessageRepository(MessageRepository):
 
 def get_message_repo(session: Session = Depends(get_session)) -> MessageRepository:
     return SQLMessageRepository(session)
+
+
+class AsyncSQLMessageRepository(AsyncMessageRepository):
+    """
+    Async counterpart of SQLMessageRepository, one session per call.
+    Inserts go through the write-behind queue when one is configured.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker) -> None:
+        self.session_factory = session_factory
+
+    async def insert_message(
+        self,
+        chat_id: UUID,
+        content: str,
+        role: MessageRole = "user",
+        latency_ms: int | None = None,
+        prompt_tokens: int | None = None,
+        completion_tokens: int | None = None,
+        truncated: bool = False,
+        message_id: UUID | None = None,
+    ) -> MessageOut:
+        message = Message(
+            chat_id=chat_id,
+            role=role,
+            content=content,
+            latency_ms=latency_ms,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            truncated=truncated,
+        )
+        if message_id is not None:
+            message.id = message_id
+
+        write_queue = get_write_queue()
+        if write_queue is not None:
+            await write_queue.enqueue(message)
+            return MessageOut.model_validate(message)
+
+        async with self.session_factory() as session:
+            session.add(message)
+            await session.exec(chat_activity_statement(message))
+            await session.exec(bump_user_revision_for_chats([chat_id]))
+            await session.commit()
+            await session.refresh(message)
+        return MessageOut.model_validate(message)
+
+    async def list_messages(
+        self,
+        chat_id: UUID,
+        limit: int = 50,
+        before: tuple[datetime, UUID] | None = None,
+    ) -> list[MessageOut]:
+        await flush_pending(chat_id)
+        async with self.session_factory() as session:
+            messages = (
+                await session.exec(recent_messages_statement(chat_id, limit, before))
+            ).all()[::-1]
+            if len(messages) < limit:
+                # The live rows ran out, continue into the archive if any
+                archive = await session.get(ChatArchive, chat_id)
+                if archive is not None:
+                    oldest = (
+                        (messages[0].created_at, messages[0].id) if messages else before
+                    )
+                    older = archived_page(
+                        unpack_messages(archive.payload), limit - len(messages), oldest
+                    )
+                    messages = older + list(messages)
+        return [MessageOut.model_validate(m) for m in messages]
+
+    async def search_messages(
+        self,
+        user_id: UUID,
+        query: str,
+        limit: int = 20,
+        after: tuple[float, datetime, UUID] | None = None,
+    ) -> list[MessageSearchHit]:
+        """Rows still in the write-behind queue are not searchable yet."""
+        statement = search_messages_statement(user_id, query, limit, after)
+        async with self.session_factory() as session:
+            rows = (await session.exec(statement)).all()
+        return [MessageSearchHit.model_validate(r) for r in rows]
+
+    async def update_message_content(
+        self,
+        message_id: UUID,
+        new_content: str,
+    ) -> MessageOut:
+        async with self.session_factory() as session:
+            # The primary key also holds the partition key, look up by id
+            statement = select(Message).where(Message.id == message_id)
+            message = (await session.exec(statement)).first()
+            if not message:
+                raise ValueError("Message not found")
+            message.content = new_content
+            await session.exec(bump_chat_revision(message.chat_id))
+            await session.commit()
+            await session.refresh(message)
+        return MessageOut.model_validate(message)
+
+
+def get_async_message_repo() -> AsyncMessageRepository:
+    return AsyncSQLMessageRepository(async_session_factory)
@@ -0,0 +1,33 @@
+"""
+Version stamps behind the ETags of chat reads. Every write that changes what
+GET /chat/{id} or GET /chats returns bumps `chats.revision` and/or
+`users.chats_revision` in the same transaction.
+"""
+
+from uuid import UUID
+
+from sqlalchemy import select, update
+
+from models import Chat, User
+
+
+def bump_chat_revision(chat_id: UUID):
+    return update(Chat).where(Chat.id == chat_id).values(revision=Chat.revision + 1)
+
+
+def bump_user_revision(user_id: UUID):
+    return (
+        update(User)
+        .where(User.id == user_id)
+        .values(chats_revision=User.chats_revision + 1)
+    )
+
+
+def bump_user_revision_for_chats(chat_ids: list[UUID]):
+    """Bump the chat-list revision of the owners of `chat_ids`."""
+    owners = select(Chat.user_id).where(Chat.id.in_(chat_ids))
+    return (
+        update(User)
+        .where(User.id.in_(owners))
+        .values(chats_revision=User.chats_revision + 1)
+    )
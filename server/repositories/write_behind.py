@@ -0,0 +1,309 @@
+"""
+Write-behind persistence for chat messages.
+
+Message inserts are enqueued (no database round-trip on the request path)
+and written by a background worker in batches: one multi-row INSERT plus one
+activity UPDATE per chat, retried with backoff on failure.
+
+With the Redis backend every queued row is first journaled in a per-chat
+Redis hash, so rows survive a worker crash and any worker can write them:
+on startup, periodically, and before reading the chat. Inserts are
+idempotent (ON CONFLICT DO NOTHING on the primary key, which a replayed row
+matches since it keeps its created_at), and chat counters only count the rows
+actually inserted, so a row written twice is harmless.
+
+Read-your-writes: repository reads of a chat call `flush_pending(chat_id)`
+first, which writes that chat's queued rows (local or journaled) before the
+SELECT.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from uuid import UUID
+
+import orjson
+import redis.asyncio as redis
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+
+from core.db import async_engine
+from core.metrics import metrics
+from core.settings import settings
+from models import Chat, Message
+from repositories.revisions import bump_user_revision_for_chats
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_PREFIX = "docstral:write_behind"
+
+# HDEL the written rows and drop the chat from the index once its hash is empty
+_RELEASE_SCRIPT = """
+redis.call('HDEL', KEYS[1], unpack(ARGV, 2))
+if redis.call('HLEN', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], ARGV[1])
+end
+return 1
+"""
+
+
+class MessageWriteQueue:
+    def __init__(
+        self,
+        redis_url: str | None = None,
+        batch_size: int | None = None,
+        flush_interval: float | None = None,
+    ):
+        self.redis = redis.from_url(redis_url) if redis_url else None
+        self.batch_size = batch_size or settings.WRITE_BEHIND_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.WRITE_BEHIND_FLUSH_INTERVAL
+        # Message id -> (enqueued at, message), in enqueue order
+        self._pending: dict[UUID, tuple[float, Message]] = {}
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._release = (
+            self.redis.register_script(_RELEASE_SCRIPT) if self.redis else None
+        )
+
+        metrics.register_gauge("write_behind.pending", lambda: len(self._pending))
+        metrics.register_gauge("write_behind.lag_ms", self.lag_ms)
+
+    @staticmethod
+    def _journal_key(chat_id: UUID | str) -> str:
+        return f"{JOURNAL_PREFIX}:chat:{chat_id}"
+
+    @staticmethod
+    def _index_key() -> str:
+        return f"{JOURNAL_PREFIX}:chats"
+
+    def lag_ms(self) -> float:
+        """Age of the oldest row not yet written."""
+        if not self._pending:
+            return 0.0
+        enqueued_at, _ = next(iter(self._pending.values()))
+        return (time.monotonic() - enqueued_at) * 1000
+
+    async def enqueue(self, message: Message) -> None:
+        """Queue a message insert; journaled first when Redis is configured."""
+        if self.redis is not None:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(
+                    self._journal_key(message.chat_id),
+                    str(message.id),
+                    orjson.dumps(message.model_dump()),
+                )
+                pipe.sadd(self._index_key(), str(message.chat_id))
+                await pipe.execute()
+        self._pending[message.id] = (time.monotonic(), message)
+        metrics.incr("write_behind.enqueued")
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="write-behind-flush")
+
+    async def _run(self) -> None:
+        await self._recover()
+        failures = 0
+        last_recovery = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                while self._pending:
+                    await self.flush()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                metrics.incr("write_behind.failures")
+                delay = min(
+                    settings.WRITE_BEHIND_RETRY_MAX_DELAY,
+                    self.flush_interval * 2**failures,
+                )
+                logger.error(
+                    f"Write-behind flush failed ({len(self._pending)} pending), "
+                    f"retrying in {delay:.1f}s: {e}"
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            # Rows journaled by workers that died are written by the others
+            if (
+                time.monotonic() - last_recovery
+                > settings.WRITE_BEHIND_RECOVERY_INTERVAL
+            ):
+                last_recovery = time.monotonic()
+                await self._recover()
+
+    async def flush(self) -> int:
+        """Write the oldest batch of queued rows; returns how many were written."""
+        async with self._flush_lock:
+            batch = [m for _, m in list(self._pending.values())[: self.batch_size]]
+            if not batch:
+                return 0
+            await self._write(batch)
+            for message in batch:
+                self._pending.pop(message.id, None)
+            return len(batch)
+
+    async def flush_chat(self, chat_id: UUID) -> None:
+        """Write every queued row of a chat, from this worker or the journal."""
+        if any(m.chat_id == chat_id for _, m in self._pending.values()):
+            async with self._flush_lock:
+                batch = [m for _, m in self._pending.values() if m.chat_id == chat_id]
+                if batch:
+                    await self._write(batch)
+                    for message in batch:
+                        self._pending.pop(message.id, None)
+
+        if self.redis is not None:
+            await self._flush_journal(chat_id)
+
+    async def _flush_journal(self, chat_id: UUID | str) -> None:
+        rows = await self.redis.hgetall(self._journal_key(chat_id))
+        if not rows:
+            return
+        batch = [Message.model_validate(orjson.loads(raw)) for raw in rows.values()]
+        batch.sort(key=lambda m: m.created_at)
+        await self._write(batch, journaled=False)
+        await self._release(
+            keys=[self._journal_key(chat_id), self._index_key()],
+            args=[str(chat_id), *rows.keys()],
+        )
+        for message in batch:
+            self._pending.pop(message.id, None)
+
+    async def _recover(self) -> None:
+        if self.redis is None:
+            return
+        try:
+            chat_ids = await self.redis.smembers(self._index_key())
+            for chat_id in chat_ids:
+                await self._flush_journal(chat_id.decode())
+            if chat_ids:
+                metrics.incr("write_behind.recovered_chats", len(chat_ids))
+        except Exception as e:
+            logger.error(f"Write-behind journal recovery failed: {e}")
+
+    async def _write(self, batch: list[Message], journaled: bool = True) -> None:
+        start = time.perf_counter()
+        try:
+            inserted = await self._insert(batch)
+        except IntegrityError:
+            if len(batch) == 1:
+                # e.g. the chat was deleted meanwhile: the row can never be written
+                logger.error(f"Dropping unwritable message {batch[0].id}")
+                metrics.incr("write_behind.dropped")
+                inserted = 0
+            else:
+                # Isolate the offending row(s) and write the others
+                inserted = 0
+                for message in batch:
+                    await self._write([message], journaled=False)
+        else:
+            metrics.observe("write_behind.batch_size", len(batch))
+            metrics.observe(
+                "write_behind.flush_ms", (time.perf_counter() - start) * 1000
+            )
+            metrics.incr("write_behind.written", inserted)
+
+        if journaled and self.redis is not None:
+            by_chat = defaultdict(list)
+            for message in batch:
+                by_chat[message.chat_id].append(str(message.id))
+            for chat_id, ids in by_chat.items():
+                await self._release(
+                    keys=[self._journal_key(chat_id), self._index_key()],
+                    args=[str(chat_id), *ids],
+                )
+
+    @staticmethod
+    async def _insert(batch: list[Message]) -> int:
+        """One multi-row INSERT and one activity UPDATE per chat, in a transaction."""
+        table = Message.__table__
+        statement = (
+            insert(table)
+            .values([m.model_dump() for m in batch])
+            .on_conflict_do_nothing(index_elements=["id", "created_at"])
+            .returning(table.c.id)
+        )
+        async with async_engine.begin() as conn:
+            inserted_ids = set((await conn.execute(statement)).scalars().all())
+
+            # Counters only include rows this statement actually inserted
+            activity = defaultdict(list)
+            for message in batch:
+                if message.id in inserted_ids:
+                    activity[message.chat_id].append(message)
+            for chat_id, messages in activity.items():
+                await conn.execute(
+                    update(Chat)
+                    .where(Chat.id == chat_id)
+                    .values(
+                        message_count=Chat.message_count + len(messages),
+                        revision=Chat.revision + 1,
+                        last_message_at=func.greatest(
+                            Chat.last_message_at, max(m.created_at for m in messages)
+                        ),
+                        total_prompt_tokens=Chat.total_prompt_tokens
+                        + sum(m.prompt_tokens or 0 for m in messages),
+                        total_completion_tokens=Chat.total_completion_tokens
+                        + sum(m.completion_tokens or 0 for m in messages),
+                    )
+                )
+            if activity:
+                await conn.execute(bump_user_revision_for_chats(list(activity)))
+        return len(inserted_ids)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        try:
+            while self._pending:
+                await self.flush()
+        except Exception as e:
+            # Journaled rows are written by the next worker to start
+            logger.error(
+                f"Final write-behind flush failed, {len(self._pending)} rows left: {e}"
+            )
+        if self.redis is not None:
+            await self.redis.aclose()
+
+
+def create_write_queue() -> MessageWriteQueue:
+    if settings.WRITE_BEHIND_BACKEND == "redis":
+        logger.info("Message write-behind queue: Redis journal")
+        return MessageWriteQueue(redis_url=settings.REDIS_URL)
+    logger.warning(
+        "Message write-behind queue: in-memory. Queued messages are lost if "
+        "the worker dies and are not visible to other workers until written"
+    )
+    return MessageWriteQueue()
+
+
+_write_queue_instance: MessageWriteQueue | None = None
+
+
+def set_write_queue(queue: MessageWriteQueue | None):
+    global _write_queue_instance
+    _write_queue_instance = queue
+
+
+def get_write_queue() -> MessageWriteQueue | None:
+    return _write_queue_instance
+
+
+async def flush_pending(chat_id: UUID) -> None:
+    """Read barrier: make queued writes of a chat visible before reading it."""
+    queue = get_write_queue()
+    if queue is not None:
+        await queue.flush_chat(chat_id)
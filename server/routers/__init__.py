@@ -1,3 +1,5 @@
 from .chats import router as chats_router
 from .health import router as health_router
 from .auth import router as auth_router
+from .search import router as search_router
+from .admin import router as admin_router
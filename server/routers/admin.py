@@ -0,0 +1,97 @@
+import logging
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from core.auth import verify_admin_token
+from core.ndjson import ndjson_response, request_lines
+from repositories.bulk import ChatImportError, export_chats, import_chats
+from schemas import ChatImportOut
+from schemas.search import IndexReloadOut
+from scraper.retrieval import get_retrieval_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(verify_admin_token)],
+)
+
+
+@router.post(
+    "/retrieval/reload",
+    summary="Hot-swap the documentation index to the current version (Admin only)",
+    operation_id="reload_retrieval_index",
+    response_model=IndexReloadOut,
+)
+async def reload_retrieval_index(
+    force: bool = Query(False, description="Reload even if the version is unchanged"),
+) -> IndexReloadOut:
+    """
+    Load the index version the CURRENT pointer refers to, warm it up and swap
+    it in. In-flight searches finish on the previous version. Only affects the
+    worker serving this request; use SIGUSR1 to reach every worker.
+    """
+    retrieval_service = get_retrieval_service()
+    if not retrieval_service or not retrieval_service.is_ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Documentation search is not ready",
+        )
+
+    previous = retrieval_service.version
+    try:
+        reloaded = await retrieval_service.reload(force=force)
+    except FileNotFoundError as e:
+        logger.error(f"Index reload failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Index version is incomplete: {e}",
+        )
+
+    return IndexReloadOut(
+        reloaded=reloaded,
+        version=retrieval_service.version,
+        previous_version=previous,
+    )
+
+
+@router.get(
+    "/chats/export",
+    summary="Export all chats as NDJSON (Admin only)",
+    operation_id="admin_export_chats",
+)
+async def admin_export_chats(
+    user_id: UUID | None = Query(None, description="Only the chats of this user"),
+    gzip: bool = Query(False, description="Compress the export with gzip"),
+) -> StreamingResponse:
+    """
+    Stream every chat (or every chat of `user_id`) with its messages,
+    archived ones included, from one consistent snapshot of the database.
+    """
+    return ndjson_response(export_chats(user_id=user_id), "chats", gzip)
+
+
+@router.post(
+    "/chats/import",
+    summary="Restore chats from an NDJSON export (Admin only)",
+    operation_id="admin_import_chats",
+    response_model=ChatImportOut,
+)
+async def admin_import_chats(request: Request) -> ChatImportOut:
+    """
+    Restore an export with its ids and owners; the users must exist. Chats
+    and messages already present are skipped, so an interrupted restore can
+    be sent again. The counts only include the rows actually inserted.
+    """
+    try:
+        chats, messages = await import_chats(request_lines(request))
+    except ChatImportError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{e} (imported before the error: {e.imported[0]} chats, "
+            f"{e.imported[1]} messages)",
+        )
+    return ChatImportOut(chats=chats, messages=messages)
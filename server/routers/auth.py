@@ -1,17 +1,19 @@
 import secrets
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
 from fastapi_limiter.depends import RateLimiter
 from pydantic import EmailStr, BaseModel
-from sqlmodel import Session, select
+from sqlmodel import Session, delete, select
 from starlette import status
 
-from core.auth import get_current_user, verify_admin_token, hash_token
-from core.db import get_session
+from core.auth import bearer_scheme, get_current_user, verify_admin_token, hash_token
+from core.db import async_session_factory, get_session
 from core.rate_limiter import AUTH_REQUESTS, AUTH_WINDOW
 from models import User, UserToken
 from schemas import UserOut
 from schemas.user import UserCreatedOut
+from core.token_cache import get_last_used_recorder, get_token_cache
 
 router = APIRouter(tags=["auth"])
 
@@ -26,6 +28,27 @@ def verify_token(current_user: User = Depends(get_current_user)) -> UserOut:
     return UserOut.model_validate(current_user)
 
 
+@router.post(
+    "/auth/revoke",
+    summary="Revoke the token used for this request",
+    operation_id="revoke_token",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(RateLimiter(times=AUTH_REQUESTS, seconds=AUTH_WINDOW))],
+)
+async def revoke_token(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    _: User = Depends(get_current_user),
+):
+    hashed = hash_token(credentials.credentials)
+    async with async_session_factory() as session:
+        await session.exec(delete(UserToken).where(UserToken.token == hashed))
+        await session.commit()
+
+    # Cached lookups would keep the token valid until they expire
+    await get_token_cache().invalidate(hashed)
+    get_last_used_recorder().discard(hashed)
+
+
 class CreateUserRequest(BaseModel):
     email: EmailStr
     first_name: str
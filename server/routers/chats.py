@@ -1,22 +1,97 @@
+import asyncio
 import logging
-import json
-from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+import time
+from contextlib import aclosing
+from datetime import datetime, UTC
+from typing import AsyncGenerator
+from uuid import UUID, uuid4
+
+import orjson
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
 from core.auth import get_current_user
-from llm import SYSTEM_PROMPT, get_llm_client, get_mistral_tools
+from core.http_cache import etag_matches, get_response_cache, make_etag
+from core.metrics import metrics
+from core.ndjson import ndjson_response, request_lines
+from core.pagination import (
+    decode_cursor,
+    decode_rank_cursor,
+    encode_cursor,
+    encode_rank_cursor,
+)
+from core.sse import SSEEncoder, coalesce
+from core.stream_buffer import (
+    StreamBuffer,
+    StreamExpired,
+    StreamNotFound,
+    cancel_when_abandoned,
+    follow,
+    get_stream_buffer,
+)
+from core.settings import settings
+from core.tasks import spawn
+from llm import (
+    AdmissionRejected,
+    HistoryManager,
+    SYSTEM_PROMPT,
+    StreamOrchestrator,
+    get_admission_controller,
+    get_answer_cache,
+    get_llm_client,
+    count_tokens,
+)
 from models import User
-from repositories import get_chat_repo, get_message_repo
-from repositories import ChatRepository
-from schemas import ChatDetail, ChatOut, MessageCreate, ChatCreate
-from repositories import MessageRepository
+from repositories import (
+    AsyncChatRepository,
+    AsyncMessageRepository,
+    ChatRepository,
+    get_async_chat_repo,
+    get_async_message_repo,
+    get_chat_repo,
+)
+from repositories.bulk import ChatImportError, export_chats, import_chats
+from schemas import (
+    ChatDetail,
+    ChatImportOut,
+    ChatOut,
+    MessageCreate,
+    MessageOut,
+    MessageSearchHit,
+    ChatCreate,
+)
+from schemas.sse import (
+    SSEEvent,
+    SSEDoneEvent,
+    SSEErrorEvent,
+    SSESourcesEvent,
+    SSETokenEvent,
+    SSEUsageEvent,
+)
 from models import MessageRole
-from scraper.retrieval import get_retrieval_service
+from scraper.retrieval import get_ready_retrieval_service
 from fastapi.responses import StreamingResponse
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["chats"])
 
+# Always revalidate, a 304 costs one indexed lookup
+CACHE_HEADERS = {"Cache-Control": "private, no-cache"}
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
 
 @router.get(
     "/chats",
@@ -24,13 +99,120 @@ router = APIRouter(tags=["chats"])
     operation_id="list_chats",
     response_model=list[ChatOut],
 )
-def list_chats(
+async def list_chats(
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
-    repo: ChatRepository = Depends(get_chat_repo),
+    cursor: str | None = Query(None, description="X-Next-Cursor of the previous page"),
+    if_none_match: str | None = Header(None, alias="If-None-Match"),
+    repo: AsyncChatRepository = Depends(get_async_chat_repo),
     current_user: User = Depends(get_current_user),
-) -> list[ChatOut]:
-    return repo.list_chats(user_id=current_user.id, limit=limit, offset=offset)
+) -> Response:
+    """
+    Chats by most recent activity, with keyset pagination on
+    (last_message_at, id). `X-Next-Cursor` is set while more chats may remain.
+    Answers 304 when `If-None-Match` holds the current `ETag`.
+    """
+    try:
+        before = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    revision = await repo.get_chats_revision(current_user.id)
+    etag = make_etag("chats", current_user.id, revision, limit, cursor)
+    cached = _conditional_response(etag, if_none_match)
+    if cached is not None:
+        return cached
+
+    chats = await repo.list_chats(user_id=current_user.id, limit=limit, before=before)
+    headers = {}
+    if len(chats) == limit:
+        last = chats[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last.last_message_at, last.id)
+    return _cached_json_response(
+        etag, [c.model_dump(mode="json", by_alias=True) for c in chats], headers
+    )
+
+
+@router.get(
+    "/chats/search",
+    summary="Search the user's messages",
+    operation_id="search_chats",
+    response_model=list[MessageSearchHit],
+)
+async def search_chats(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Search terms"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None, description="X-Next-Cursor of the previous page"),
+    repo: AsyncMessageRepository = Depends(get_async_message_repo),
+    current_user: User = Depends(get_current_user),
+) -> list[MessageSearchHit]:
+    """
+    Full-text search over all the user's chats, best matches first, with a
+    highlighted snippet per message. `q` accepts web search syntax (quoted
+    phrases, `or`, `-word`). `X-Next-Cursor` is set while more hits may remain.
+    """
+    try:
+        after = decode_rank_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    start = time.perf_counter()
+    hits = await repo.search_messages(
+        user_id=current_user.id, query=q, limit=limit, after=after
+    )
+    metrics.observe("search.latency_ms", (time.perf_counter() - start) * 1000)
+    if len(hits) == limit:
+        last = hits[-1]
+        response.headers["X-Next-Cursor"] = encode_rank_cursor(
+            last.rank, last.created_at, last.message_id
+        )
+    return hits
+
+
+@router.get(
+    "/chats/export",
+    summary="Export the user's chats as NDJSON",
+    operation_id="export_chats",
+)
+async def export_user_chats(
+    gzip: bool = Query(False, description="Compress the export with gzip"),
+    current_user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    """
+    Stream every chat of the user, each followed by its messages, one JSON
+    document per line. The response is read from server-side cursors as it
+    is sent, so exports of any size use constant memory.
+    """
+    return ndjson_response(export_chats(user_id=current_user.id), "chats", gzip)
+
+
+@router.post(
+    "/chats/import",
+    summary="Import chats from an NDJSON export",
+    operation_id="import_chats",
+    response_model=ChatImportOut,
+)
+async def import_user_chats(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+) -> ChatImportOut:
+    """
+    Import the NDJSON body of `GET /chats/export` (gzip-compressed if sent
+    with `Content-Encoding: gzip`). Chats are added to the user's chats under
+    new ids. The body is streamed and inserted in batches; on an invalid line
+    the earlier batches stay imported.
+    """
+    try:
+        chats, messages = await import_chats(
+            request_lines(request), user_id=current_user.id
+        )
+    except ChatImportError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{e} (imported before the error: {e.imported[0]} chats, "
+            f"{e.imported[1]} messages)",
+        )
+    return ChatImportOut(chats=chats, messages=messages)
 
 
 @router.get(
@@ -39,17 +221,109 @@ def list_chats(
     operation_id="get_chat_by_id",
     response_model=ChatDetail,
 )
-def get_chat(
+async def get_chat(
     chat_id: UUID,
-    repo: ChatRepository = Depends(get_chat_repo),
+    messages_limit: int | None = Query(
+        None, ge=1, le=200, description="Only return the latest messages"
+    ),
+    if_none_match: str | None = Header(None, alias="If-None-Match"),
+    repo: AsyncChatRepository = Depends(get_async_chat_repo),
     current_user: User = Depends(get_current_user),
-) -> ChatDetail:
-    chat = repo.get_chat(user_id=current_user.id, chat_id=chat_id)
+) -> Response:
+    """
+    With `messages_limit`, only the latest messages are returned; when older
+    ones exist, `X-Next-Cursor` pages back through `GET /chat/{chat_id}/messages`.
+    Answers 304 when `If-None-Match` holds the current `ETag`, without
+    loading the messages.
+    """
+    revision = await repo.get_chat_revision(user_id=current_user.id, chat_id=chat_id)
+    if revision is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Chat not found"
+        )
+    cached = _conditional_response(
+        make_etag("chat", chat_id, revision, messages_limit), if_none_match
+    )
+    if cached is not None:
+        return cached
+
+    chat = await repo.get_chat(
+        user_id=current_user.id, chat_id=chat_id, messages_limit=messages_limit
+    )
     if not chat:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Chat not found"
         )
-    return chat
+    headers = {}
+    if messages_limit is not None and len(chat.messages) == messages_limit:
+        oldest = chat.messages[0]
+        headers["X-Next-Cursor"] = encode_cursor(oldest.created_at, oldest.id)
+    # Keyed by the revision actually loaded, in case a write landed meanwhile
+    etag = make_etag("chat", chat_id, chat.revision, messages_limit)
+    return _cached_json_response(
+        etag, chat.model_dump(mode="json", by_alias=True), headers
+    )
+
+
+def _conditional_response(etag: str, if_none_match: str | None) -> Response | None:
+    """304 if the client's copy is current, the cached body if we have it."""
+    if etag_matches(if_none_match, etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, **CACHE_HEADERS},
+        )
+    cached = get_response_cache().get(etag)
+    if cached is None:
+        return None
+    body, headers = cached
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _cached_json_response(etag: str, payload, headers: dict[str, str]) -> Response:
+    body = orjson.dumps(payload)
+    headers = {**headers, "ETag": etag, **CACHE_HEADERS}
+    get_response_cache().set(etag, body, headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get(
+    "/chat/{chat_id}/messages",
+    summary="List a chat's messages, newest page first",
+    operation_id="list_messages",
+    response_model=list[MessageOut],
+)
+async def list_messages(
+    chat_id: UUID,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = Query(
+        None, description="X-Next-Cursor of the previous page (older messages)"
+    ),
+    chat_repo: AsyncChatRepository = Depends(get_async_chat_repo),
+    message_repo: AsyncMessageRepository = Depends(get_async_message_repo),
+    current_user: User = Depends(get_current_user),
+) -> list[MessageOut]:
+    """
+    Keyset pagination on (created_at, id): each page holds the `limit`
+    messages preceding the cursor, in chronological order. `X-Next-Cursor`
+    is set while older messages may remain.
+    """
+    try:
+        before = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    chat = await chat_repo.get_chat(
+        user_id=current_user.id, chat_id=chat_id, messages_limit=0
+    )
+    if not chat:
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    messages = await message_repo.list_messages(chat_id, limit=limit, before=before)
+    if len(messages) == limit:
+        oldest = messages[0]
+        response.headers["X-Next-Cursor"] = encode_cursor(oldest.created_at, oldest.id)
+    return messages
 
 
 @router.put(
@@ -64,7 +338,7 @@ def update_chat(
     repo: ChatRepository = Depends(get_chat_repo),
     current_user: User = Depends(get_current_user),
 ) -> ChatOut:
-    chat = repo.get_chat(user_id=current_user.id, chat_id=chat_id)
+    chat = repo.get_chat(user_id=current_user.id, chat_id=chat_id, messages_limit=0)
     if not chat or chat.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Chat not found")
 
@@ -78,16 +352,18 @@ def update_chat(
     operation_id="delete_chat",
     status_code=status.HTTP_204_NO_CONTENT,
 )
-def delete_chat(
+async def delete_chat(
     chat_id: UUID,
-    repo: ChatRepository = Depends(get_chat_repo),
+    repo: AsyncChatRepository = Depends(get_async_chat_repo),
     current_user: User = Depends(get_current_user),
 ):
-    chat = repo.get_chat(user_id=current_user.id, chat_id=chat_id)
+    chat = await repo.get_chat(
+        user_id=current_user.id, chat_id=chat_id, messages_limit=0
+    )
     if not chat or chat.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Chat not found")
 
-    repo.delete_chat(chat_id=chat_id)
+    await repo.delete_chat(chat_id=chat_id)
     return
 
 
@@ -114,24 +390,42 @@ def create_chat(
 async def stream_message(
     chat_id: UUID,
     payload: MessageCreate,
+    request: Request,
     retry: bool = Query(
         False, description="Allow retry without consecutive user message check"
     ),
-    chat_repo: ChatRepository = Depends(get_chat_repo),
-    message_repo: MessageRepository = Depends(get_message_repo),
+    chat_repo: AsyncChatRepository = Depends(get_async_chat_repo),
+    message_repo: AsyncMessageRepository = Depends(get_async_message_repo),
     current_user: User = Depends(get_current_user),
 ):
     """
     Stream assistant response with automatic tool call handling.
 
     Flow:
-    1. Save user message (or reuse last one if retry=true)
-    2. Check for tool calls (non-streaming invoke)
-    3. If tool call: execute retrieval, add context, stream final response
-    4. If no tool call: stream response directly
+    1. Build the history: chat summary + most recent messages within the token budget
+       (a first-turn question close to a cached one is answered from the answer cache)
+    2. Wait for an LLM slot, then save the user message (or reuse the last one
+       if retry=true)
+    3. Stream with tools enabled, forwarding content tokens immediately
+    4. If a tool call is assembled: execute retrieval, add context, stream final response
     5. Save assistant message with usage metrics
+    6. If older messages overflowed the budget, fold them into the summary
+
+    Events (SSE, with increasing ids): `token` (coalesced text), `sources`,
+    `usage`, then `done` with the saved message id; `error` if it fails.
+
+    Generation is buffered server-side under the assistant message id
+    (`X-Message-Id` header): a client that drops can resume with
+    `GET /chat/{chat_id}/stream/{message_id}` and `Last-Event-ID`. If no
+    client is connected for STREAM_RESUME_GRACE seconds, the upstream stream
+    is closed and the partial answer is saved with `truncated=True`.
     """
-    chat = chat_repo.get_chat(user_id=current_user.id, chat_id=chat_id)
+    # Only the recent window is needed to build the prompt
+    chat = await chat_repo.get_chat(
+        user_id=current_user.id,
+        chat_id=chat_id,
+        messages_limit=settings.HISTORY_MAX_MESSAGES,
+    )
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
 
@@ -144,129 +438,286 @@ async def stream_message(
                 detail="Cannot send multiple user messages in a row",
             )
 
-    # Handle user message: reuse last if retry, or insert new
-    if retry and chat.messages and chat.messages[-1].role == MessageRole.USER:
+    # Reuse the last user message if retry, or prepare a new one. Nothing is
+    # written before admission, so a rejected turn leaves no trace
+    reuse_last = bool(
+        retry and chat.messages and chat.messages[-1].role == MessageRole.USER
+    )
+    if reuse_last:
         user_message = chat.messages[-1]
-        if user_message.content != payload.content:
-            message_repo.update_message_content(
-                user_message.id, new_content=payload.content
-            )
-            user_message.content = payload.content
+        edited = user_message.content != payload.content
+        user_message.content = payload.content
     else:
-        user_message = message_repo.insert_message(
+        user_message = MessageOut(
+            id=uuid4(),
             chat_id=chat_id,
             role=MessageRole.USER,
             content=payload.content,
+            created_at=datetime.now(UTC),
         )
         chat.messages.append(user_message)
 
-    # Build conversation history
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-    messages.extend(
-        [{"role": msg.role.value, "content": msg.content} for msg in chat.messages]
-    )
-
+    # Build conversation history within the token budget
     llm_client = get_llm_client()
-    retrieval_service = get_retrieval_service()
-    tools = get_mistral_tools() if retrieval_service else None
-
-    async def generate():
-        full_response = []
-        usage_data = None
+    history = HistoryManager(llm_client)
+    window = history.build(
+        SYSTEM_PROMPT, chat.messages, chat.summary, chat.summary_until
+    )
+    messages = window.messages
+
+    # Answer without documentation search if retrieval is still loading
+    retrieval_service = await get_ready_retrieval_service(settings.RAG_READY_TIMEOUT)
+    orchestrator = StreamOrchestrator(llm_client, retrieval_service)
+
+    # Standalone first-turn questions may be answered from the answer cache
+    answer_cache = get_answer_cache()
+    question_embedding = None
+    cached_answer = None
+    index_version = retrieval_service.version if retrieval_service else None
+    if answer_cache and retrieval_service and len(chat.messages) == 1:
+        try:
+            question_embedding = (await retrieval_service.embed([payload.content]))[0]
+            cached_answer = answer_cache.lookup(question_embedding, index_version)
+        except Exception as e:
+            logger.warning(f"Answer cache lookup failed: {e}")
 
+    # Wait for an LLM slot before saving anything or opening the stream
+    admission = get_admission_controller()
+    ticket = None
+    if admission and cached_answer is None:
         try:
-            # Check for tool calls first (non-streaming)
-            content, usage, tool_calls = await llm_client.invoke(messages, tools=tools)
-
-            if tool_calls and retrieval_service:
-                logger.info(f"Tool calls detected: {len(tool_calls)}")
-
-                # Execute all tool calls
-                for tool_call in tool_calls:
-                    if tool_call["function"]["name"] == "search_documentation":
-                        args = json.loads(tool_call["function"]["arguments"])
-                        query = args.get("query", "")
-
-                        logger.debug(f"Searching docs: {query}")
-                        docs = await retrieval_service.search(query, top_k=3)
-
-                        context = "\n\n".join(
-                            [
-                                f"**{doc.title}**\n{doc.chunk}\nSource: {doc.url}"
-                                for doc in docs
-                            ]
-                        )
-
-                        # Append assistant message with tool call
-                        messages.append(
-                            {
-                                "role": "assistant",
-                                "content": "",
-                                "tool_calls": [
-                                    {
-                                        "id": tool_call["id"],
-                                        "type": "function",
-                                        "function": {
-                                            "name": tool_call["function"]["name"],
-                                            "arguments": tool_call["function"][
-                                                "arguments"
-                                            ],
-                                        },
-                                    }
-                                ],
-                            }
-                        )
-                        # Append tool result
-                        messages.append(
-                            {
-                                "role": "tool",
-                                "tool_call_id": tool_call["id"],
-                                "content": context,
-                            }
-                        )
-
-                # Stream final response with context
-                async for chunk, usage in llm_client.stream(messages, tools=None):
-                    if chunk:
-                        full_response.append(chunk)
-                        yield chunk
-                    if usage:
-                        usage_data = usage
-
-            else:
-                # No tool calls - stream directly
-                async for chunk, usage in llm_client.stream(messages, tools=tools):
-                    if chunk:
-                        full_response.append(chunk)
-                        yield chunk
-                    if usage:
-                        usage_data = usage
-
-            final_content = "".join(full_response)
-            if not final_content:
-                final_content = "No response generated"
-
-            message_repo.insert_message(
+            ticket = await admission.acquire(
+                str(current_user.id), prompt_tokens=window.prompt_tokens
+            )
+        except AdmissionRejected as e:
+            raise HTTPException(
+                status_code=e.status_code,
+                detail=e.detail,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+
+    # Generation runs in the background and writes its events to the stream
+    # buffer; this response and any resumed one are readers of that buffer
+    stream_buffer = get_stream_buffer()
+    assistant_message_id = uuid4()
+    stream_id = f"{chat_id}:{assistant_message_id}"
+    try:
+        if not reuse_last:
+            await message_repo.insert_message(
                 chat_id=chat_id,
-                role=MessageRole.ASSISTANT,
-                content=final_content,
-                latency_ms=usage_data["latency_ms"] if usage_data else None,
-                prompt_tokens=usage_data["prompt_tokens"] if usage_data else None,
-                completion_tokens=(
-                    usage_data["completion_tokens"] if usage_data else None
-                ),
+                role=MessageRole.USER,
+                content=payload.content,
+                message_id=user_message.id,
+            )
+        elif edited:
+            await message_repo.update_message_content(
+                user_message.id, new_content=payload.content
             )
+        await stream_buffer.open(stream_id)
+    except Exception:
+        if ticket:
+            ticket.release()
+        raise
+
+    async def refresh_summary(pending: list):
+        to_fold = history.messages_to_fold(pending)
+        if not to_fold:
+            return
+        summary = await history.summarize(chat.summary, to_fold)
+        if summary:
+            await chat_repo.update_summary(chat_id, summary, to_fold[-1].created_at)
+
+    async def save_truncated(started_at: float) -> bool:
+        """Persist the partial answer of a turn every client walked away from."""
+        partial = orchestrator.content
+        completion_tokens = count_tokens(partial)
+        metrics.incr("llm.stream.cancelled")
+        metrics.observe("llm.stream.cancelled_completion_tokens", completion_tokens)
+        logger.info(
+            f"Client disconnected from chat {chat_id}, "
+            f"generation cancelled after {completion_tokens} tokens"
+        )
+        if not partial:
+            return False
+        await message_repo.insert_message(
+            chat_id=chat_id,
+            role=MessageRole.ASSISTANT,
+            content=partial,
+            latency_ms=int((time.perf_counter() - started_at) * 1000),
+            prompt_tokens=(
+                orchestrator.usage["prompt_tokens"] if orchestrator.usage else None
+            ),
+            completion_tokens=completion_tokens,
+            truncated=True,
+            message_id=assistant_message_id,
+        )
+        return True
+
+    assistant_saved = False
+
+    async def generate_events(started_at: float) -> AsyncGenerator[SSEEvent, None]:
+        if cached_answer is not None:
+            final_content = cached_answer.answer
+            usage_data = None
+            yield SSETokenEvent(text=final_content)
+        else:
+            tokens = coalesce(
+                orchestrator.run(messages),
+                window_ms=settings.SSE_COALESCE_MS,
+                max_chars=settings.SSE_COALESCE_MAX_CHARS,
+                max_pending=settings.SSE_MAX_PENDING_CHUNKS,
+            )
+            async with aclosing(tokens) as batches:
+                async for text in batches:
+                    yield SSETokenEvent(text=text)
+
+            final_content = orchestrator.content
+            usage_data = orchestrator.usage
+            # Only complete model answers: never the outage fallback. A turn
+            # cut short is cancelled before reaching this point
+            if (
+                question_embedding is not None
+                and final_content.strip()
+                and not orchestrator.degraded
+            ):
+                answer_cache.store(
+                    payload.content,
+                    question_embedding,
+                    final_content,
+                    index_version,
+                )
+
+        if orchestrator.sources:
+            yield SSESourcesEvent(
+                sources=[s.model_dump() for s in orchestrator.sources]
+            )
+
+        if not final_content:
+            final_content = "No response generated"
 
+        # From here on a cancel must not save the reply a second time
+        nonlocal assistant_saved
+        assistant_saved = True
+        assistant_message = await message_repo.insert_message(
+            chat_id=chat_id,
+            role=MessageRole.ASSISTANT,
+            content=final_content,
+            latency_ms=usage_data["latency_ms"] if usage_data else None,
+            prompt_tokens=usage_data["prompt_tokens"] if usage_data else None,
+            completion_tokens=(usage_data["completion_tokens"] if usage_data else None),
+            message_id=assistant_message_id,
+        )
+
+        if window.needs_summary:
+            spawn(
+                refresh_summary(window.pending + [assistant_message]),
+                name=f"summarize-chat-{chat_id}",
+            )
+
+        yield SSEUsageEvent(
+            prompt_tokens=usage_data["prompt_tokens"] if usage_data else None,
+            completion_tokens=(usage_data["completion_tokens"] if usage_data else None),
+            latency_ms=int((time.perf_counter() - started_at) * 1000),
+            ttft_ms=orchestrator.ttft_ms,
+            cached=cached_answer is not None,
+        )
+        yield SSEDoneEvent(message_id=assistant_message.id)
+
+    async def produce():
+        encoder = SSEEncoder()
+        started_at = time.perf_counter()
+
+        async def publish(event: SSEEvent):
+            frame = encoder.encode(event)
+            await stream_buffer.append(stream_id, encoder.last_id, frame)
+
+        watchdog = asyncio.create_task(
+            cancel_when_abandoned(stream_buffer, stream_id, asyncio.current_task())
+        )
+        try:
+            # Leaving the block closes the upstream stream
+            async with aclosing(generate_events(started_at)) as events:
+                async for event in events:
+                    await publish(event)
+        except asyncio.CancelledError:
+            # No client came back within the resume grace window
+            if (
+                cached_answer is None
+                and not assistant_saved
+                and await save_truncated(started_at)
+            ):
+                await publish(
+                    SSEDoneEvent(message_id=assistant_message_id, truncated=True)
+                )
+            raise
         except Exception as e:
+            # Headers are already sent: report the failure in-band
             logger.error(f"Stream failed: {e}", exc_info=True)
-            raise
+            await publish(SSEErrorEvent(detail="Stream failed"))
+        finally:
+            watchdog.cancel()
+            if ticket:
+                ticket.release()
+            await stream_buffer.close(stream_id)
+
+    spawn(produce(), name=f"stream-{stream_id}")
+
+    return StreamingResponse(
+        _read_stream(request, stream_buffer, stream_id),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Message-Id": str(assistant_message_id)},
+    )
+
+
+async def _read_stream(
+    request: Request, stream_buffer: StreamBuffer, stream_id: str, after_id: int = 0
+) -> AsyncGenerator[bytes, None]:
+    """Forward buffered frames to one client until the stream or client ends."""
+    try:
+        async with aclosing(follow(stream_buffer, stream_id, after_id)) as frames:
+            async for frame in frames:
+                if await request.is_disconnected():
+                    return
+                yield frame
+    except StreamExpired:
+        yield SSEEncoder(after_id).encode(
+            SSEErrorEvent(detail="Stream events expired, reload the chat")
+        )
+    except StreamNotFound:
+        return
+
+
+@router.get(
+    "/chat/{chat_id}/stream/{message_id}",
+    summary="Resume an assistant reply stream",
+    operation_id="resume_stream",
+)
+async def resume_stream(
+    chat_id: UUID,
+    message_id: UUID,
+    request: Request,
+    last_event_id: int = Header(0, alias="Last-Event-ID", ge=0),
+    chat_repo: AsyncChatRepository = Depends(get_async_chat_repo),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Replay the events after `Last-Event-ID` of a reply that is still being
+    generated (or finished recently), then follow its live tail.
+    No new generation is started.
+    """
+    chat = await chat_repo.get_chat(
+        user_id=current_user.id, chat_id=chat_id, messages_limit=0
+    )
+    if not chat:
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    stream_buffer = get_stream_buffer()
+    stream_id = f"{chat_id}:{message_id}"
+    if not await stream_buffer.exists(stream_id):
+        raise HTTPException(status_code=404, detail="Stream not found")
 
     return StreamingResponse(
-        generate(),
+        _read_stream(request, stream_buffer, stream_id, last_event_id),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        },
+        headers=SSE_HEADERS,
     )
@@ -1,8 +1,11 @@
 from datetime import datetime, timezone
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
+from core.auth import verify_admin_token
+from core.metrics import metrics
 from llm import LLMClientFactory, get_llm_client
-from schemas.health import HealthOut
+from schemas.health import HealthOut, MetricsOut, RetrievalState
+from scraper.retrieval import get_retrieval_service
 
 router = APIRouter(tags=["health"])
 
@@ -16,11 +19,29 @@ router = APIRouter(tags=["health"])
 def health() -> HealthOut:
     now = datetime.now(timezone.utc).isoformat()
     mode = get_llm_client().mode
+    retrieval_service = get_retrieval_service()
 
     return HealthOut.model_validate(
         {
             "status": "ok",
             "time": now,
             "mode": mode,
+            "retrieval": (
+                retrieval_service.state
+                if retrieval_service
+                else RetrievalState.DISABLED
+            ),
+            "index_version": retrieval_service.version if retrieval_service else None,
         }
     )
+
+
+@router.get(
+    "/metrics",
+    summary="Get in-process service metrics (Admin only)",
+    operation_id="metrics_get",
+    response_model=MetricsOut,
+    dependencies=[Depends(verify_admin_token)],
+)
+def get_metrics() -> MetricsOut:
+    return MetricsOut.model_validate(metrics.snapshot())
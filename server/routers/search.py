@@ -0,0 +1,69 @@
+import logging
+import time
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from core.auth import get_current_user
+from core.settings import settings
+from models import User
+from schemas.search import (
+    SearchHitOut,
+    SearchRequest,
+    SearchResponse,
+    SearchResultOut,
+)
+from scraper.retrieval import get_retrieval_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["search"])
+
+
+@router.post(
+    "/search",
+    summary="Search the documentation index with a batch of queries",
+    operation_id="search_documentation",
+    response_model=SearchResponse,
+)
+async def search(
+    payload: SearchRequest,
+    _: User = Depends(get_current_user),
+) -> SearchResponse:
+    """
+    Run every query through a single encode call and a single vectorized
+    index search. Results are returned in the order of `queries`.
+    """
+    retrieval_service = get_retrieval_service()
+    if not retrieval_service:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Documentation search is disabled",
+        )
+    if not await retrieval_service.wait_ready(settings.RAG_READY_TIMEOUT):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Documentation search unavailable ({retrieval_service.state.value})",
+            headers={"Retry-After": str(int(settings.RAG_READY_TIMEOUT))},
+        )
+
+    start = time.perf_counter()
+    batch = await retrieval_service.search_batch(payload.queries, top_k=payload.top_k)
+    total_ms = (time.perf_counter() - start) * 1000
+
+    logger.debug(
+        f"Batch search: {len(payload.queries)} queries, "
+        f"encode={batch.encode_ms:.1f}ms search={batch.search_ms:.1f}ms"
+    )
+
+    return SearchResponse(
+        results=[
+            SearchResultOut(
+                query=query,
+                results=[SearchHitOut.model_validate(hit) for hit in hits],
+            )
+            for query, hits in zip(payload.queries, batch.results)
+        ],
+        encode_ms=batch.encode_ms,
+        search_ms=batch.search_ms,
+        total_ms=total_ms,
+    )
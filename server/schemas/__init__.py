@@ -1,3 +1,3 @@
-from .message import MessageOut, MessageCreate
-from .chat import ChatCreate, ChatDetail, ChatOut
+from .message import MessageOut, MessageCreate, MessageSearchHit
+from .chat import ChatCreate, ChatDetail, ChatImportOut, ChatOut
 from .user import UserOut
@@ -9,6 +9,8 @@ class ChatOut(BaseModel):
     title: str
     user_id: UUID = Field(alias="userId")
     created_at: datetime = Field(alias="createdAt")
+    message_count: int = Field(default=0, alias="messageCount")
+    last_message_at: datetime | None = Field(default=None, alias="lastMessageAt")
 
     model_config = ConfigDict(
         populate_by_name=True,
@@ -20,6 +22,17 @@ class ChatOut(BaseModel):
 class ChatDetail(ChatOut):
     messages: list[MessageOut] = []
 
+    # Internal: used to build prompts, not part of the API response
+    summary: str | None = Field(default=None, exclude=True)
+    summary_until: datetime | None = Field(default=None, exclude=True)
+    # Internal: version stamp the ETag is built from
+    revision: int = Field(default=0, exclude=True)
+
 
 class ChatCreate(BaseModel):
     title: str | None = None
+
+
+class ChatImportOut(BaseModel):
+    chats: int
+    messages: int
@@ -9,7 +9,32 @@ class LLMMode(str, Enum):
     SELF_HOSTED = "Self-hosted"
 
 
+class RetrievalState(str, Enum):
+    LOADING = "loading"
+    WARMING = "warming"
+    READY = "ready"
+    DISABLED = "disabled"
+    FAILED = "failed"
+
+
 class HealthOut(BaseModel):
     status: str = "ok"
     time: datetime
     mode: LLMMode
+    retrieval: RetrievalState = RetrievalState.DISABLED
+    index_version: str | None = None
+
+
+class MetricSummaryOut(BaseModel):
+    count: int
+    sum: float
+    avg: float
+    p50: float | None = None
+    p95: float | None = None
+    p99: float | None = None
+
+
+class MetricsOut(BaseModel):
+    counters: dict[str, float] = Field(default_factory=dict)
+    gauges: dict[str, float] = Field(default_factory=dict)
+    summaries: dict[str, MetricSummaryOut] = Field(default_factory=dict)
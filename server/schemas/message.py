@@ -16,6 +16,25 @@ class MessageOut(BaseModel):
     latency_ms: int | None = Field(default=None, alias="latencyMs")
     prompt_tokens: int | None = Field(default=None, alias="promptTokens")
     completion_tokens: int | None = Field(default=None, alias="completionTokens")
+    truncated: bool = False
+
+    model_config = ConfigDict(
+        populate_by_name=True,
+        serialize_by_alias=True,
+        from_attributes=True,
+    )
+
+
+class MessageSearchHit(BaseModel):
+    """A message matching a search; matched words are wrapped in ** in `snippet`."""
+
+    message_id: UUID = Field(alias="messageId")
+    chat_id: UUID = Field(alias="chatId")
+    chat_title: str = Field(alias="chatTitle")
+    role: MessageRole
+    created_at: datetime = Field(alias="createdAt")
+    snippet: str
+    rank: float
 
     model_config = ConfigDict(
         populate_by_name=True,
@@ -0,0 +1,45 @@
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class SearchRequest(BaseModel):
+    queries: list[str] = Field(min_length=1, max_length=64)
+    top_k: int = Field(default=5, ge=1, le=50, alias="topK")
+
+    model_config = ConfigDict(populate_by_name=True, extra="forbid")
+
+
+class SearchHitOut(BaseModel):
+    chunk: str
+    url: str
+    title: str
+    # Cosine similarity, higher is better
+    distance: float
+    chunk_id: int = Field(alias="chunkId")
+
+    model_config = ConfigDict(
+        populate_by_name=True,
+        serialize_by_alias=True,
+        from_attributes=True,
+    )
+
+
+class SearchResultOut(BaseModel):
+    query: str
+    results: list[SearchHitOut]
+
+
+class SearchResponse(BaseModel):
+    results: list[SearchResultOut]
+    encode_ms: float = Field(alias="encodeMs")
+    search_ms: float = Field(alias="searchMs")
+    total_ms: float = Field(alias="totalMs")
+
+    model_config = ConfigDict(populate_by_name=True, serialize_by_alias=True)
+
+
+class IndexReloadOut(BaseModel):
+    reloaded: bool
+    version: str
+    previous_version: str = Field(alias="previousVersion")
+
+    model_config = ConfigDict(populate_by_name=True, serialize_by_alias=True)
@@ -0,0 +1,50 @@
+from uuid import UUID
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class SSEEvent(BaseModel):
+    """Base of the typed events sent on /chat/{chat_id}/stream."""
+
+    event: str = Field(exclude=True)
+
+    model_config = ConfigDict(
+        populate_by_name=True,
+        serialize_by_alias=True,
+    )
+
+
+class SSETokenEvent(SSEEvent):
+    event: str = Field(default="token", exclude=True)
+    text: str
+
+
+class SSESource(BaseModel):
+    title: str
+    url: str
+    score: float
+
+
+class SSESourcesEvent(SSEEvent):
+    event: str = Field(default="sources", exclude=True)
+    sources: list[SSESource]
+
+
+class SSEUsageEvent(SSEEvent):
+    event: str = Field(default="usage", exclude=True)
+    prompt_tokens: int | None = Field(default=None, alias="promptTokens")
+    completion_tokens: int | None = Field(default=None, alias="completionTokens")
+    latency_ms: int | None = Field(default=None, alias="latencyMs")
+    ttft_ms: int | None = Field(default=None, alias="ttftMs")
+    cached: bool = False
+
+
+class SSEDoneEvent(SSEEvent):
+    event: str = Field(default="done", exclude=True)
+    message_id: UUID = Field(alias="messageId")
+    truncated: bool = False
+
+
+class SSEErrorEvent(SSEEvent):
+    event: str = Field(default="error", exclude=True)
+    detail: str
@@ -0,0 +1,134 @@
+import logging
+
+from pydantic import BaseModel
+
+from core.metrics import metrics
+from core.settings import settings
+from llm.tokens import count_tokens
+from scraper.retrieval import RetrievedChunk
+
+logger = logging.getLogger(__name__)
+
+NO_RESULTS_CONTEXT = "No relevant documentation found."
+MIN_OVERLAP_CHARS = 20
+MAX_OVERLAP_CHARS = 400
+
+
+class ContextSource(BaseModel):
+    title: str
+    url: str
+    score: float
+
+
+class PackedContext(BaseModel):
+    text: str
+    sources: list[ContextSource] = []
+    tokens: int = 0
+    naive_tokens: int = 0
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(0, self.naive_tokens - self.tokens)
+
+
+def format_chunk(doc: RetrievedChunk) -> str:
+    """Legacy one-block-per-hit formatting, used as the savings baseline."""
+    return f"**{doc.title}**\n{doc.chunk}\nSource: {doc.url}"
+
+
+def _stitch(left: str, right: str) -> str:
+    """Join two adjacent chunks, dropping the splitter overlap between them."""
+    max_k = min(len(left), len(right), MAX_OVERLAP_CHARS)
+    for k in range(max_k, MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:k]):
+            return left + right[k:]
+    return f"{left}\n{right}"
+
+
+class ContextBuilder:
+    """
+    Turns raw search hits into the tool message sent to the LLM.
+
+    Hits are filtered by an absolute score threshold and a gap to the best
+    hit, chunks of the same page are grouped under a single header (adjacent
+    chunks are stitched back together), and blocks are packed by best score
+    until the token budget is used up.
+    """
+
+    def __init__(
+        self,
+        min_score: float | None = None,
+        score_gap: float | None = None,
+        token_budget: int | None = None,
+    ):
+        self.min_score = settings.RAG_MIN_SCORE if min_score is None else min_score
+        self.score_gap = settings.RAG_SCORE_GAP if score_gap is None else score_gap
+        self.token_budget = token_budget or settings.RAG_CONTEXT_TOKEN_BUDGET
+
+    def select(self, hits: list[RetrievedChunk]) -> list[RetrievedChunk]:
+        """Apply score threshold and gap cutoff. Scores are inner products (higher is better)."""
+        if not hits:
+            return []
+        ranked = sorted(hits, key=lambda h: h.distance, reverse=True)
+        best = ranked[0].distance
+        return [
+            h
+            for h in ranked
+            if h.distance >= self.min_score and best - h.distance <= self.score_gap
+        ]
+
+    def build(self, hits: list[RetrievedChunk]) -> PackedContext:
+        naive_tokens = sum(count_tokens(format_chunk(h)) for h in hits)
+        if hits:
+            naive_tokens += count_tokens("\n\n") * (len(hits) - 1)
+
+        selected = self.select(hits)
+
+        # Greedy packing by score; a page header is paid once per URL.
+        used = 0
+        kept: dict[str, list[RetrievedChunk]] = {}
+        for hit in selected:
+            cost = count_tokens(hit.chunk)
+            if hit.url not in kept:
+                cost += count_tokens(f"**{hit.title}**\nSource: {hit.url}\n\n")
+            if used + cost > self.token_budget:
+                continue
+            kept.setdefault(hit.url, []).append(hit)
+            used += cost
+
+        blocks = []
+        sources = []
+        for url, page_hits in kept.items():
+            page_hits.sort(key=lambda h: h.chunk_id)
+            body = page_hits[0].chunk
+            for prev, hit in zip(page_hits, page_hits[1:]):
+                if hit.chunk_id == prev.chunk_id + 1:
+                    body = _stitch(body, hit.chunk)
+                else:
+                    body = f"{body}\n\n[...]\n\n{hit.chunk}"
+
+            title = page_hits[0].title
+            blocks.append(f"**{title}**\n{body}\nSource: {url}")
+            sources.append(
+                ContextSource(
+                    title=title, url=url, score=max(h.distance for h in page_hits)
+                )
+            )
+
+        text = "\n\n".join(blocks) if blocks else NO_RESULTS_CONTEXT
+        packed = PackedContext(
+            text=text,
+            sources=sources,
+            tokens=count_tokens(text),
+            naive_tokens=naive_tokens,
+        )
+
+        metrics.incr("rag.context.requests")
+        metrics.incr("rag.context.saved_tokens_total", packed.saved_tokens)
+        metrics.observe("rag.context.saved_tokens", packed.saved_tokens)
+        metrics.observe("rag.context.hits_kept", sum(len(v) for v in kept.values()))
+        logger.debug(
+            f"Context packed: {len(hits)} hits -> {len(blocks)} blocks, "
+            f"{packed.tokens}/{naive_tokens} tokens (saved {packed.saved_tokens})"
+        )
+        return packed
@@ -11,7 +11,15 @@ from langchain_text_splitters import (
     RecursiveCharacterTextSplitter,
 )
 
-from core import settings
+from core.index_store import (
+    CHUNKS_FILE,
+    INDEX_FILE,
+    METADATA_FILE,
+    new_version_dir,
+    prune_versions,
+    publish_version,
+)
+from core.settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -23,9 +31,12 @@ class DocumentEmbedder:
         chunk_size: int = 2000,
         small_chunk_size: int = 200,
         data_dir: Path | None = None,
+        model: SentenceTransformer | None = None,
     ):
-        logger.info(f"Loading embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+        if model is None:
+            logger.info(f"Loading embedding model: {model_name}")
+            model = SentenceTransformer(model_name)
+        self.model = model
         self.index = None
         self.chunks = []
         self.metadata = []
@@ -54,18 +65,6 @@ class DocumentEmbedder:
     def docs_path(self) -> Path:
         return self.data_dir / "mistral_docs.json"
 
-    @property
-    def index_path(self) -> Path:
-        return self.data_dir / "faiss_index.bin"
-
-    @property
-    def chunks_path(self) -> Path:
-        return self.data_dir / "chunks.json"
-
-    @property
-    def metadata_path(self) -> Path:
-        return self.data_dir / "metadata.json"
-
     def _log_statistics(self):
         logger.info(f"Index created with {len(self.chunks)} chunks")
 
@@ -204,25 +203,39 @@ class DocumentEmbedder:
         self.index.add(embeddings_array)
         self._log_statistics()
 
-    def save_index(self):
-        """Save index and metadata"""
+    def save_index(self) -> str:
+        """
+        Save index and metadata as a new version, then point CURRENT at it.
+        Running API workers pick it up on reload without a restart.
+
+        Returns:
+            The published version name.
+        """
         if self.index is None:
             raise ValueError("No index to save. Run create_embeddings() first.")
 
-        logger.info(f"Saving FAISS index to {self.index_path}")
-        faiss.write_index(self.index, str(self.index_path))
+        version, target = new_version_dir(self.data_dir)
 
-        logger.info(f"Saving {len(self.chunks)} chunks to {self.chunks_path}")
-        with open(self.chunks_path, "w", encoding="utf-8") as f:
+        logger.info(f"Saving FAISS index to {target / INDEX_FILE}")
+        faiss.write_index(self.index, str(target / INDEX_FILE))
+
+        logger.info(f"Saving {len(self.chunks)} chunks to {target / CHUNKS_FILE}")
+        with open(target / CHUNKS_FILE, "w", encoding="utf-8") as f:
             json.dump(self.chunks, f, ensure_ascii=False, indent=2)
 
         logger.info(
-            f"Saving {len(self.metadata)} metadata entries to {self.metadata_path}"
+            f"Saving {len(self.metadata)} metadata entries to {target / METADATA_FILE}"
         )
-        with open(self.metadata_path, "w", encoding="utf-8") as f:
+        with open(target / METADATA_FILE, "w", encoding="utf-8") as f:
             json.dump(self.metadata, f, ensure_ascii=False, indent=2)
 
-        logger.info("All files saved successfully")
+        publish_version(self.data_dir, version)
+        removed = prune_versions(self.data_dir, keep=settings.RAG_INDEX_KEEP_VERSIONS)
+        logger.info(
+            f"All files saved successfully, published version {version}"
+            + (f" (pruned {len(removed)} old versions)" if removed else "")
+        )
+        return version
 
 
 if __name__ == "__main__":
@@ -1,77 +1,353 @@
+import asyncio
+import contextlib
 import logging
+import time
 from pathlib import Path
+from typing import Callable
 import json
 
 import faiss
+import numpy as np
 from sentence_transformers import SentenceTransformer
 from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from core.index_store import CHUNKS_FILE, INDEX_FILE, METADATA_FILE, resolve_current
+from core.metrics import metrics
 from core.settings import settings
+from core.tasks import spawn
+from schemas.health import RetrievalState
 
 logger = logging.getLogger(__name__)
 
+WARMUP_QUERIES = [
+    "How do I authenticate with the Mistral API?",
+    "streaming chat completion python",
+    "function calling parameters",
+]
+
 
 class RetrievedChunk(BaseModel):
     chunk: str
     url: str
     title: str
+    # Inner product on normalized embeddings (cosine similarity, higher is better)
     distance: float
+    # Position in chunks.json; consecutive ids from the same URL are adjacent
+    chunk_id: int
 
 
-class RetrievalService:
-    """
-    Handles FAISS-based semantic search over documentation chunks.
-    Singleton pattern: expensive resources loaded once at startup.
-    """
+class BatchSearchResult(BaseModel):
+    results: list[list[RetrievedChunk]]
+    encode_ms: float
+    search_ms: float
 
-    def __init__(self, data_dir: Path | None = None):
-        self.data_dir = Path(data_dir or settings.DATA_DIR)
 
-        index_path = self.data_dir / "faiss_index.bin"
+class IndexSnapshot:
+    """Immutable view of one index version (FAISS index + chunk mappings)."""
+
+    def __init__(self, version: str, index, chunks: list[str], metadata: list[dict]):
+        self.version = version
+        self.index = index
+        self.chunks = chunks
+        self.metadata = metadata
+
+    @classmethod
+    def load(cls, version: str, directory: Path) -> "IndexSnapshot":
+        index_path = directory / INDEX_FILE
         if not index_path.exists():
             raise FileNotFoundError(f"FAISS index not found: {index_path}")
-        self.index = faiss.read_index(str(index_path))
+        index = faiss.read_index(str(index_path))
 
-        chunks_path = self.data_dir / "chunks.json"
+        chunks_path = directory / CHUNKS_FILE
         if not chunks_path.exists():
             raise FileNotFoundError(f"Chunks file not found: {chunks_path}")
         with open(chunks_path, "r", encoding="utf-8") as f:
-            self.chunks = json.load(f)
+            chunks = json.load(f)
 
-        metadata_path = self.data_dir / "metadata.json"
+        metadata_path = directory / METADATA_FILE
         if not metadata_path.exists():
             raise FileNotFoundError(f"Metadata file not found: {metadata_path}")
         with open(metadata_path, "r", encoding="utf-8") as f:
-            self.metadata = json.load(f)
+            metadata = json.load(f)
+
+        return cls(version=version, index=index, chunks=chunks, metadata=metadata)
+
+
+class RetrievalService:
+    """
+    Handles FAISS-based semantic search over documentation chunks.
+    Singleton pattern: expensive resources loaded once per worker.
+
+    Construction is cheap: `start()` loads the encoder and index in the
+    background and runs warm-up queries, moving through LOADING -> WARMING ->
+    READY. Callers check `is_ready` or `wait_ready()` before searching.
 
-        self.embedder = SentenceTransformer("BAAI/bge-small-en-v1.5")
+    The index lives in an immutable IndexSnapshot. `reload()` loads and warms
+    up a new version next to the current one and swaps the reference; searches
+    already running keep the snapshot they started with.
+    """
+
+    def __init__(
+        self,
+        data_dir: Path | None = None,
+        embedder: SentenceTransformer | None = None,
+    ):
+        self.data_dir = Path(data_dir or settings.DATA_DIR)
+        self.state: RetrievalState = RetrievalState.LOADING
+        self.embedder: SentenceTransformer | None = embedder
+        self._snapshot: IndexSnapshot | None = None
+        # Set once loading ends, whether READY, DISABLED or FAILED
+        self._loaded = asyncio.Event()
+        self._reload_lock = asyncio.Lock()
+        self._load_task: asyncio.Task | None = None
+        self._pending: list[tuple[str, int, asyncio.Future]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._swap_listeners: list[Callable[[str | None, str], None]] = []
+
+    def add_swap_listener(self, listener: Callable[[str | None, str], None]) -> None:
+        """Call `listener(previous_version, version)` after each index swap."""
+        self._swap_listeners.append(listener)
+
+    def start(self) -> None:
+        """Schedule background loading on the running event loop."""
+        if self._load_task is None:
+            self._load_task = asyncio.create_task(self._load())
+
+    async def close(self) -> None:
+        if self._load_task and not self._load_task.done():
+            self._load_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._load_task
+
+    async def _load(self) -> None:
+        try:
+            await self._load_snapshot()
+        finally:
+            self._loaded.set()
+
+    async def _load_snapshot(self) -> None:
+        start = time.perf_counter()
+        try:
+            version, directory = resolve_current(self.data_dir)
+            self._snapshot = await run_in_threadpool(
+                IndexSnapshot.load, version, directory
+            )
+            if self.embedder is None:
+                self.embedder = await run_in_threadpool(
+                    SentenceTransformer, settings.SENTENCE_TRANSFORMER_MODEL
+                )
+            loaded = time.perf_counter()
+
+            self.state = RetrievalState.WARMING
+            await run_in_threadpool(self._warm_up, self._snapshot)
+        except FileNotFoundError as e:
+            self.state = RetrievalState.DISABLED
+            logger.warning(f"RAG disabled: {e}")
+            return
+        except Exception as e:
+            self.state = RetrievalState.FAILED
+            logger.error(f"RetrievalService failed to load: {e}", exc_info=True)
+            return
+
+        self.state = RetrievalState.READY
+        done = time.perf_counter()
+
+        metrics.observe("rag.startup.load_ms", (loaded - start) * 1000)
+        metrics.observe("rag.startup.warmup_ms", (done - loaded) * 1000)
         logger.info(
-            f"RetrievalService initialized with {len(self.chunks)} chunks from {self.data_dir}"
+            f"RetrievalService ready with {len(self.chunks)} chunks "
+            f"from {directory} (version={version}, load={loaded - start:.1f}s, "
+            f"warm-up={done - loaded:.1f}s)"
         )
 
+    @property
+    def is_ready(self) -> bool:
+        return self.state == RetrievalState.READY
+
+    async def wait_ready(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for READY. Returns readiness."""
+        if self.is_ready:
+            return True
+        if self.state in (RetrievalState.DISABLED, RetrievalState.FAILED):
+            return False
+        try:
+            await asyncio.wait_for(self._loaded.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return self.is_ready
+
+    @property
+    def version(self) -> str | None:
+        return self._snapshot.version if self._snapshot else None
+
+    @property
+    def chunks(self) -> list[str]:
+        return self._snapshot.chunks if self._snapshot else []
+
+    @property
+    def metadata(self) -> list[dict]:
+        return self._snapshot.metadata if self._snapshot else []
+
+    async def reload(self, force: bool = False) -> bool:
+        """
+        Load the version CURRENT points to and swap it in.
+
+        Returns:
+            True if a new snapshot was swapped in, False if already current.
+
+        Raises:
+            RuntimeError: If the service has not finished its initial load.
+            FileNotFoundError: If the target version is incomplete.
+        """
+        if not self.is_ready:
+            raise RuntimeError(f"RetrievalService not ready (state={self.state})")
+
+        async with self._reload_lock:
+            version, directory = resolve_current(self.data_dir)
+            if version == self.version and not force:
+                logger.info(f"Index version {version} already loaded")
+                return False
+
+            start = time.perf_counter()
+            snapshot = await run_in_threadpool(IndexSnapshot.load, version, directory)
+            await run_in_threadpool(self._warm_up, snapshot)
+
+            previous = self.version
+            self._snapshot = snapshot
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            metrics.incr("rag.index.reloads")
+            metrics.observe("rag.index.reload_ms", elapsed_ms)
+            logger.info(
+                f"Index swapped {previous} -> {version} "
+                f"({len(snapshot.chunks)} chunks, {elapsed_ms:.0f}ms)"
+            )
+            for listener in self._swap_listeners:
+                try:
+                    listener(previous, version)
+                except Exception as e:
+                    logger.error(f"Index swap listener failed: {e}", exc_info=True)
+            return True
+
+    def _warm_up(self, snapshot: IndexSnapshot) -> None:
+        # Single queries first (the chat path shape), then one batch
+        for query in WARMUP_QUERIES:
+            self._search_snapshot(snapshot, [query], top_k=1)
+        self._search_snapshot(snapshot, WARMUP_QUERIES, top_k=1)
+
     async def search(self, query: str, top_k: int = 3) -> list[RetrievedChunk]:
         """
         Retrieve top_k most relevant chunks for the query.
         Returns typed list of RetrievedChunk.
+
+        Concurrent calls arriving within RAG_BATCH_WINDOW_MS are coalesced
+        into one search_batch (one encode call, one index search).
         """
-        query_embedding = await run_in_threadpool(
-            lambda: self.embedder.encode([query]).astype("float32")
+        window_ms = settings.RAG_BATCH_WINDOW_MS
+        if window_ms <= 0:
+            batch = await self.search_batch([query], top_k=top_k)
+            return batch.results[0]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, top_k, future))
+        if len(self._pending) >= settings.RAG_BATCH_MAX_SIZE:
+            self._flush_pending()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(window_ms / 1000, self._flush_pending)
+        return await future
+
+    def _flush_pending(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if pending:
+            spawn(self._run_pending(pending), name="rag-search-batch")
+
+    async def _run_pending(
+        self, pending: list[tuple[str, int, asyncio.Future]]
+    ) -> None:
+        # Callers that timed out or were cancelled meanwhile are skipped
+        pending = [p for p in pending if not p[2].done()]
+        if not pending:
+            return
+
+        metrics.observe("rag.search.batch_size", len(pending))
+        try:
+            batch = await self.search_batch(
+                [query for query, _, _ in pending],
+                top_k=max(top_k for _, top_k, _ in pending),
+            )
+            for (_, top_k, future), hits in zip(pending, batch.results):
+                if not future.done():
+                    future.set_result(hits[:top_k])
+        except Exception as e:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            # A cancelled flush must not leave its callers waiting forever
+            for _, _, future in pending:
+                if not future.done():
+                    future.cancel()
+
+    async def search_batch(
+        self, queries: list[str], top_k: int = 3
+    ) -> BatchSearchResult:
+        """
+        Retrieve top_k chunks for each query with one encode call and one
+        vectorized index search. Results keep the order of `queries`.
+        """
+        if not self.is_ready:
+            raise RuntimeError(f"RetrievalService not ready (state={self.state})")
+
+        # Pin the snapshot so a concurrent swap cannot change it mid-search
+        snapshot = self._snapshot
+        return await run_in_threadpool(self._search_snapshot, snapshot, queries, top_k)
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        """Normalized float32 embeddings of `texts` (same space as the index)."""
+        if not self.is_ready:
+            raise RuntimeError(f"RetrievalService not ready (state={self.state})")
+        embeddings = await run_in_threadpool(
+            self.embedder.encode, texts, normalize_embeddings=True
         )
-        distances, indices = self.index.search(query_embedding, top_k)
+        return embeddings.astype("float32")
+
+    def _search_snapshot(
+        self, snapshot: IndexSnapshot, queries: list[str], top_k: int
+    ) -> BatchSearchResult:
+        start = time.perf_counter()
+        query_embeddings = self.embedder.encode(
+            queries, normalize_embeddings=True
+        ).astype("float32")
+        encoded = time.perf_counter()
+        distances, indices = snapshot.index.search(query_embeddings, top_k)
+        searched = time.perf_counter()
 
         results = []
-        for idx, dist in zip(indices[0], distances[0]):
-            if idx < len(self.chunks):
-                meta = self.metadata[idx]
-                results.append(
-                    RetrievedChunk(
-                        chunk=self.chunks[idx],
-                        url=meta.get("url", ""),
-                        title=meta.get("title", "Unknown"),
-                        distance=float(dist),
+        for row_indices, row_distances in zip(indices, distances):
+            row = []
+            for idx, dist in zip(row_indices, row_distances):
+                if 0 <= idx < len(snapshot.chunks):
+                    meta = snapshot.metadata[idx]
+                    row.append(
+                        RetrievedChunk(
+                            chunk=snapshot.chunks[idx],
+                            url=meta.get("url", ""),
+                            title=meta.get("title", "Unknown"),
+                            distance=float(dist),
+                            chunk_id=int(idx),
+                        )
                     )
-                )
-        return results
+            results.append(row)
+
+        return BatchSearchResult(
+            results=results,
+            encode_ms=(encoded - start) * 1000,
+            search_ms=(searched - encoded) * 1000,
+        )
 
 
 _retrieval_service_instance: RetrievalService | None = None
@@ -84,3 +360,11 @@ def set_retrieval_service(service: RetrievalService | None):
 
 def get_retrieval_service() -> RetrievalService | None:
     return _retrieval_service_instance
+
+
+async def get_ready_retrieval_service(timeout: float) -> RetrievalService | None:
+    """Return the service once READY, or None if disabled or still loading after `timeout`."""
+    service = _retrieval_service_instance
+    if service and await service.wait_ready(timeout):
+        return service
+    return None
@@ -5,6 +5,7 @@ from sqlmodel import Session, select
 from core.db import engine
 from core.auth import hash_token
 from models import User, Chat, Message, MessageRole, UserToken
+from repositories import SQLMessageRepository
 
 
 def seed() -> None:
@@ -46,21 +47,18 @@ def seed() -> None:
                 .order_by(Message.created_at)
             ).all()
             if len(msgs) == 0:
-                session.add(
-                    Message(
-                        chat_id=first_chat.id,
-                        role=MessageRole.USER,
-                        content="Hello there!",
-                    )
+                # Through the repository so the chat's activity columns follow
+                message_repo = SQLMessageRepository(session)
+                message_repo.insert_message(
+                    chat_id=first_chat.id,
+                    role=MessageRole.USER,
+                    content="Hello there!",
                 )
-                session.add(
-                    Message(
-                        chat_id=first_chat.id,
-                        role=MessageRole.ASSISTANT,
-                        content="Hi! How can I help you today?",
-                    )
+                message_repo.insert_message(
+                    chat_id=first_chat.id,
+                    role=MessageRole.ASSISTANT,
+                    content="Hi! How can I help you today?",
                 )
-            session.commit()
 
         # Summary
         chats_count = session.exec(select(Chat).where(Chat.user_id == user.id)).all()